@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+# File: ipmi_lan_replay.py
+# Date: 2026-10-17
+#
+# Description:
+# Record and replay native IPMI LAN sessions (IPMI_BACKEND=lan).
+#
+# Requests are recorded after session setup, as the request and response
+# data of each IPMI command, so a recording doesn't depend on session IDs,
+# sequence numbers or authentication codes. ReplayLanSession answers from a
+# recording with the same interface as IPMILanSession, and can stand in for
+# it wherever the IOC creates one (see mtca_benchmark.py).
+#
+# Run as a script, this reads the SDR repository, sensors and thresholds of
+# a real MCH a number of times and writes the recording.
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'src'))
+from ipmi_lan import IPMILanSession, IPMIError, IPMITimeout
+
+def request_key(netfn, cmd, data, target, channel, lun):
+    """
+    Get the key a request is recorded under
+
+    Returns:
+        key (str)
+    """
+
+    return '{:02x} {:02x} {} {} {} {}'.format(netfn, cmd, bytes(data).hex(), target, channel, lun)
+
+class RecordingLanSession(IPMILanSession):
+    """
+    IPMI LAN session that records every request and response
+    """
+
+    def __init__(self, path, *args, **kwargs):
+        """
+        RecordingLanSession initializer
+
+        Args:
+            path (str): recording file, which is added to
+            args, kwargs: IPMILanSession arguments
+
+        Returns:
+            Nothing
+        """
+
+        IPMILanSession.__init__(self, *args, **kwargs)
+        self.path = path
+
+    def request(self, netfn, cmd, data = b'', target = None, channel = 0, lun = 0):
+        entry = {'request': request_key(netfn, cmd, data, target, channel, lun)}
+        start = time.time()
+        try:
+            response = IPMILanSession.request(self, netfn, cmd, data, target, channel, lun)
+            entry['response'] = bytes(response).hex()
+            return response
+        except IPMITimeout:
+            entry['timeout'] = True
+            raise
+        except IPMIError as e:
+            entry['cc'] = e.cc
+            raise
+        finally:
+            entry['time'] = round(time.time() - start, 6)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+
+
+class ReplayLanSession(IPMILanSession):
+    """
+    IPMI LAN session answered from a recording. No packets are sent.
+    """
+
+    def __init__(self, path, host, latency = None, speed = 1.0, **kwargs):
+        """
+        ReplayLanSession initializer
+
+        Args:
+            path (str): recording file
+            host (str): MCH host name, as for IPMILanSession
+            latency (float, optional): time taken by every request, instead
+                of the recorded times
+            speed (float): factor applied to the recorded times
+            kwargs: other IPMILanSession arguments
+
+        Returns:
+            Nothing
+        """
+
+        IPMILanSession.__init__(self, host, **kwargs)
+        self.latency = latency
+        self.speed = speed
+        self.opened = False
+
+        entries = {}
+        with open(path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    entries.setdefault(entry['request'], []).append(entry)
+        self.responses = dict((key, itertools.cycle(values))
+                for key, values in entries.items())
+
+    def open(self):
+        self.opened = True
+
+    def close(self):
+        self.opened = False
+
+    def request(self, netfn, cmd, data = b'', target = None, channel = 0, lun = 0):
+        if not self.opened:
+            raise IPMIError('session not open')
+
+        responses = self.responses.get(request_key(netfn, cmd, data, target, channel, lun))
+        if responses is None:
+            raise IPMITimeout('no recorded response to netfn 0x{:02x} cmd 0x{:02x}'.format(netfn, cmd))
+        entry = next(responses)
+
+        delay = self.latency if self.latency is not None else entry['time'] * self.speed
+        if delay > 0:
+            time.sleep(delay)
+        if entry.get('timeout'):
+            raise IPMITimeout('no response to netfn 0x{:02x} cmd 0x{:02x} from {}'.format(
+                netfn, cmd, self.host))
+        if 'cc' in entry:
+            raise IPMIError('cmd 0x{:02x} failed: 0x{:02x}'.format(cmd, entry['cc']), entry['cc'])
+        return bytes.fromhex(entry['response'])
+
+
+def main():
+    # Get the arguments
+    parser = argparse.ArgumentParser(description = 'Record an IPMI LAN session with an MCH')
+    parser.add_argument('--mch', required=True, help='MCH host name or IP address')
+    parser.add_argument('--out', required=True, help='recording file to write')
+    parser.add_argument('--scans', type=int, default=5, help='number of times to read every sensor')
+    parser.add_argument('--period', type=float, default=1.0, help='time between scans (s)')
+
+    args = parser.parse_args()
+
+    session = RecordingLanSession(args.out, args.mch)
+    session.open()
+    try:
+        # As the IOC does on connecting
+        session.get_sdr_repository_info()
+        records = session.read_sdr_repository()
+        sensors = [record for record in records if record.is_sensor]
+        print('{} SDR records, {} sensors'.format(len(records), len(sensors)))
+        for record in sensors:
+            if record.is_analog:
+                try:
+                    session.get_sensor_thresholds(record)
+                except IPMIError as e:
+                    print('{}: {}'.format(record.name, e))
+        for scan in range(args.scans):
+            for record in sensors:
+                try:
+                    session.read_sensor_raw(record)
+                except IPMIError:
+                    pass
+            session.get_sel_time()
+            time.sleep(args.period)
+    finally:
+        session.close()
+
+if __name__ == '__main__':
+    main()
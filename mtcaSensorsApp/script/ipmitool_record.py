@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+# File: ipmitool_record.py
+# Date: 2026-10-17
+#
+# Description:
+# Stand-in for the ipmitool binary that passes every command on to the
+# real ipmitool and records the command, the response and the time it
+# took, for replay with ipmitool_replay.py.
+#
+# Link this script into a directory as 'ipmitool', point the IPMITOOL
+# environment variable at that directory and run the IOC as usual.
+# IPMITOOL_REAL names the directory of the real ipmitool binary, and
+# IPMITOOL_RECORD the recording file, which is added to. Both one-off
+# commands and 'ipmitool shell' sessions are recorded. The IOC sees the
+# output of the real ipmitool unchanged.
+
+import fcntl
+import json
+import os
+import subprocess
+import sys
+import time
+
+from ipmitool_replay import PROMPT, split_command, command_key
+
+def record(words, response, seconds):
+    """
+    Add a command to the recording
+
+    Args:
+        words (list): command words
+        response (str): ipmitool output
+        seconds (float): time taken
+
+    Returns:
+        Nothing
+    """
+
+    entry = json.dumps({
+        'command': command_key(words)
+        ,'response': response
+        ,'time': round(seconds, 6)
+    })
+    with open(os.environ['IPMITOOL_RECORD'], 'a') as f:
+        # The IOC's shell sessions and one-off commands all add to the
+        # same file
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.write(entry + '\n')
+
+def read_to_prompt(process):
+    """
+    Read the output of the shell up to and including its next prompt
+
+    Args:
+        process (Popen): ipmitool shell
+
+    Returns:
+        output (bytes), which is empty if the shell has exited
+    """
+
+    output = b''
+    prompt = PROMPT.encode('ascii')
+    while not output.endswith(prompt):
+        data = os.read(process.stdout.fileno(), 65536)
+        if not data:
+            break
+        output += data
+    return output
+
+def run_shell(command):
+    """
+    Run an ipmitool shell, passing the commands on one at a time and
+    recording each response
+
+    Args:
+        command (list): real ipmitool command line
+
+    Returns:
+        exit status of the shell
+    """
+
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    stdout = sys.stdout.buffer
+
+    stdout.write(read_to_prompt(process))
+    stdout.flush()
+    for line in sys.stdin.buffer:
+        start = time.time()
+        process.stdin.write(line)
+        process.stdin.flush()
+        output = read_to_prompt(process)
+        seconds = time.time() - start
+        stdout.write(output)
+        stdout.flush()
+
+        words = line.decode('ascii', 'replace').split()
+        if words:
+            response = output.decode('ascii', 'replace')
+            # Leave out the echo of the command and the next prompt
+            echo = line.decode('ascii', 'replace')
+            if response.startswith(echo):
+                response = response[len(echo):]
+            if response.endswith(PROMPT):
+                response = response[:-len(PROMPT)]
+            record(words, response, seconds)
+        if not output:
+            break
+
+    process.stdin.close()
+    return process.wait()
+
+def main():
+    args = sys.argv[1:]
+    command = [os.path.join(os.environ['IPMITOOL_REAL'], 'ipmitool')] + args
+    words = split_command(args)
+
+    if words == ['shell']:
+        sys.exit(run_shell(command))
+
+    start = time.time()
+    process = subprocess.run(command, stdout=subprocess.PIPE)
+    seconds = time.time() - start
+    sys.stdout.buffer.write(process.stdout)
+    sys.stdout.flush()
+    if words != ['-V']:
+        record(words, process.stdout.decode('ascii', 'replace'), seconds)
+    sys.exit(process.returncode)
+
+if __name__ == '__main__':
+    main()
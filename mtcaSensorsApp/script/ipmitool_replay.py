@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+
+# File: ipmitool_replay.py
+# Date: 2026-10-17
+#
+# Description:
+# Stand-in for the ipmitool binary that replays a recorded MCH session, so
+# that the IOC can be run and timed without a crate.
+#
+# Link this script into a directory as 'ipmitool' and point the IPMITOOL
+# environment variable at that directory. It then answers the commands the
+# IOC sends, both as one-off commands and in 'ipmitool shell' mode, with
+# the responses in the recording named by IPMITOOL_REPLAY, and waits as
+# long as the MCH took. A command recorded more than once gets each of its
+# responses in turn. Commands that weren't recorded get an empty response.
+#
+# IPMITOOL_REPLAY_LATENCY sets a fixed time for every command instead of
+# the recorded times, and IPMITOOL_REPLAY_SPEED scales the recorded times
+# (0 to answer at once).
+#
+# Run under its own name, the script writes a synthetic recording of a
+# crate with any number of AMCs, or summarises a recording.
+#
+# Recordings are JSON lines, one per command, with the command (without
+# the connection options), the response text and the time taken:
+#   {"command": "sdr entity 193.101", "response": "...", "time": 0.012}
+# ipmitool_record.py makes them from a real crate.
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+PROMPT = 'ipmitool> '
+
+# ipmitool options that take a value, which come before the command
+VALUE_OPTIONS = ['-H', '-A', '-U', '-P', '-I', '-p', '-L', '-C', '-t', '-b',
+        '-T', '-B', '-y', '-k', '-K', '-f', '-R', '-N', '-m', '-O', '-E']
+
+# Sensors of each synthetic AMC: name, sensor number, status, value
+SYNTHETIC_SENSORS = [
+    ('12 V PP', '30h', 'ok', '12.03 Volts')
+    ,('3.3 V PP', '31h', 'ok', '3.31 Volts')
+    ,('Current 12 V', '32h', 'ok', '1.20 Amps')
+    ,('Temp 1 (inlet)', '33h', 'ok', '31 degrees C')
+    ,('Temp 2 (outlet)', '34h', 'ok', '38 degrees C')
+    ,('Hot Swap', '35h', 'lnc', '')
+]
+
+SYNTHETIC_THRESHOLDS = (
+    ' Lower Critical        : 10.000\n'
+    ' Lower Non-Critical    : 11.000\n'
+    ' Upper Non-Critical    : 13.000\n'
+    ' Upper Critical        : 14.000\n')
+
+def split_command(args):
+    """
+    Split an ipmitool command line into the connection options and the
+    command
+
+    Args:
+        args (list): command line arguments
+
+    Returns:
+        list of command words
+    """
+
+    args = list(args)
+    while args and args[0].startswith('-') and args[0] != '-V':
+        option = args.pop(0)
+        if option in VALUE_OPTIONS and args:
+            args.pop(0)
+    return args
+
+def command_key(words):
+    """
+    Get the key a command is recorded under
+
+    Args:
+        words (list): command words
+
+    Returns:
+        key (str)
+    """
+
+    return ' '.join(word.strip('"') for word in words)
+
+def load_recording(path):
+    """
+    Read a recording
+
+    Args:
+        path (str): recording file
+
+    Returns:
+        dict of (response, time) lists, keyed by command
+    """
+
+    entries = {}
+    with open(path, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            entries.setdefault(entry['command'], []).append(
+                    (entry['response'], entry.get('time', 0.0)))
+    return entries
+
+class Replay():
+    """
+    Answers commands from a recording
+    """
+
+    def __init__(self, entries, latency = None, speed = 1.0):
+        """
+        Replay initializer
+
+        Args:
+            entries (dict): recording, from load_recording
+            latency (float, optional): time taken by every command, instead
+                of the recorded times
+            speed (float): factor applied to the recorded times
+
+        Returns:
+            Nothing
+        """
+
+        self.responses = dict((key, itertools.cycle(values))
+                for key, values in entries.items())
+        self.latency = latency
+        self.speed = speed
+
+    def answer(self, words):
+        """
+        Wait as long as the MCH did, and get the response to a command
+
+        Args:
+            words (list): command words
+
+        Returns:
+            response (str)
+        """
+
+        responses = self.responses.get(command_key(words))
+        response, delay = next(responses) if responses is not None else ('', 0.0)
+        delay = self.latency if self.latency is not None else delay * self.speed
+        if delay > 0:
+            time.sleep(delay)
+        return response
+
+def run_shell(replay):
+    """
+    Act as 'ipmitool shell'. The prompt is followed by an echo of each
+    command, as ipmitool prints it.
+
+    Args:
+        replay (Replay): recording to answer from
+
+    Returns:
+        Nothing
+    """
+
+    while True:
+        sys.stdout.write(PROMPT)
+        sys.stdout.flush()
+        line = sys.stdin.readline()
+        if not line:
+            return
+        words = line.split()
+        if words in (['exit'], ['quit']):
+            return
+        sys.stdout.write(line)
+        if words:
+            sys.stdout.write(replay.answer(words))
+        sys.stdout.flush()
+
+def run_ipmitool(args):
+    """
+    Act as ipmitool
+
+    Args:
+        args (list): command line arguments
+
+    Returns:
+        exit status
+    """
+
+    words = split_command(args)
+    if words == ['-V']:
+        print('ipmitool version replay')
+        return 0
+
+    latency = os.environ.get('IPMITOOL_REPLAY_LATENCY')
+    replay = Replay(
+            load_recording(os.environ['IPMITOOL_REPLAY']),
+            latency = float(latency) if latency else None,
+            speed = float(os.environ.get('IPMITOOL_REPLAY_SPEED', 1.0)))
+
+    if words == ['shell']:
+        run_shell(replay)
+    else:
+        sys.stdout.write(replay.answer(words))
+        sys.stdout.flush()
+    return 0
+
+def synthetic_recording(cards, latency = 0.0):
+    """
+    Make a recording of a crate with two MCHs and a number of AMCs
+
+    Args:
+        cards (int): number of AMCs
+        latency (float): time taken by each command
+
+    Returns:
+        list of recording entries
+    """
+
+    entries = []
+    def add(command, response):
+        entries.append({'command': command, 'response': response, 'time': latency})
+
+    fru_list = 'MCH1             | 00h | ok  | 194.97 | MCH\n'
+    for card in range(cards):
+        fru_id = '193.{}'.format(101 + card)
+        fru_list += 'AMC{:<13d}| 00h | ok  | {} | AMC\n'.format(card + 1, fru_id)
+        add('sdr entity {}'.format(fru_id), ''.join(
+                '{:<17s}| {} | {:<3s} | {} | {}\n'.format(
+                    name, number, status, fru_id, value)
+                for name, number, status, value in SYNTHETIC_SENSORS))
+
+    add('sdr elist fru', fru_list)
+    add('sdr info', ' Most recent Addition  : 01/01/2026 00:00:00\n'
+            ' Most recent Erase     : Not Available\n')
+    add('mc info', 'Device ID                 : 3\n')
+    add('sel time get', '01/01/2026 00:00:00\n')
+    add('raw 0x06 0x03', '')
+    for mch in [1, 2]:
+        add('fru print {}'.format(mch + 2),
+                ' Product Extra         : MCH FW V2.18.8 Final (r14042) (Mar 31 2017 - 11:29)\n')
+    for name, number, status, value in SYNTHETIC_SENSORS:
+        add('sensor get {}'.format(name), SYNTHETIC_THRESHOLDS)
+    for slot in range(1, cards + 1):
+        for action in ['activate', 'deactivate']:
+            add('picmg {} {}'.format(action, slot + 4), '')
+    return entries
+
+def main():
+    if os.path.basename(sys.argv[0]) == 'ipmitool':
+        sys.exit(run_ipmitool(sys.argv[1:]))
+
+    # Get the arguments
+    parser = argparse.ArgumentParser(description = 'Make or summarise ipmitool session recordings')
+    parser.add_argument('--synthetic', type=int, help='write a recording of a crate with this many AMCs')
+    parser.add_argument('--latency', type=float, default=0.0, help='time taken by each synthetic command (s)')
+    parser.add_argument('--out', help='recording file to write')
+    parser.add_argument('recording', nargs='?', help='recording file to summarise')
+
+    args = parser.parse_args()
+
+    if args.synthetic is not None:
+        out = open(args.out, 'w') if args.out else sys.stdout
+        for entry in synthetic_recording(args.synthetic, args.latency):
+            out.write(json.dumps(entry) + '\n')
+        return
+
+    if args.recording is None:
+        parser.error('give a recording to summarise, or --synthetic')
+
+    # Print the number of times each command was recorded and its mean time
+    for command, values in sorted(load_recording(args.recording).items()):
+        print('{:40s} {:5d} {:8.3f} s'.format(command, len(values),
+                sum(t for response, t in values) / len(values)))
+
+if __name__ == '__main__':
+    main()
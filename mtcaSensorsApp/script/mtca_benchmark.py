@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+# File: mtca_benchmark.py
+# Date: 2026-10-17
+#
+# Description:
+# Time the MCH comms and parsing paths of the crate core offline.
+#
+# Each case runs mtca_core against a replayed MCH (ipmitool_replay.py, or
+# ipmi_lan_replay.py for the LAN backend) in its own process, outside an
+# IOC. The card list read, sensor scans, a reconnection and a crate reset
+# are timed, and the peak memory allocated by Python is measured, for a
+# range of crate sizes and command latencies. The fixed waits of reconnections and crate
+# resets, which are there to give the MCH time, are skipped.
+#
+# Example:
+#   mtca_benchmark.py --cards 2 6 12 --latency 0 0.005 0.02
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+SRC_DIR = os.path.join(SCRIPT_DIR, '..', 'src')
+TOP = os.path.realpath(os.path.join(SCRIPT_DIR, '..', '..'))
+
+RESULT_TAG = 'RESULT '
+
+# Longest time allowed for a crate reset, without its fixed waits (s)
+RESET_TIMEOUT = 60.0
+
+def run_case(scans, lan_recording, latency):
+    """
+    Time one case, in this process. The environment is set up by
+    start_case.
+
+    Args:
+        scans (int): number of full sensor scans to time
+        lan_recording (str): LAN recording file, or None for the shell
+            backend
+        latency (float): time taken by each LAN request
+
+    Returns:
+        dict of results
+    """
+
+    sys.path.insert(0, SRC_DIR)
+    import mtca_core
+
+    if lan_recording is not None:
+        from ipmi_lan_replay import ReplayLanSession
+        mtca_core.IPMILanSession = lambda host: ReplayLanSession(
+                lan_recording, host, latency = latency)
+        mtca_core.presence_ping = lambda host: True
+
+    results = {}
+    tracemalloc.start()
+
+    crate = mtca_core.get_crate()
+    crate.host = 'replay'
+    crate.user = 'root'
+    crate.password = ''
+
+    start = time.time()
+    if not crate.mch_comms.ipmitool_shell_connect():
+        raise RuntimeError('could not connect to the replayed MCH')
+    results['connect'] = time.time() - start
+
+    start = time.time()
+    crate.populate_fru_list()
+    results['populate'] = time.time() - start
+    results['frus'] = len(crate.frus)
+
+    # Every sensor is due on every scan
+    times = []
+    for scan in range(scans):
+        crate.scheduler.reset()
+        start = time.time()
+        crate.read_sensors()
+        crate.interrupt()
+        times.append(time.time() - start)
+    results['scan_mean'] = sum(times) / len(times)
+    results['scan_max'] = max(times)
+    results['sensors'] = len(crate.sensor_store)
+
+    # Skip the fixed waits for the MCH. A reset can still be cancelled.
+    crate.supervisor.wait = lambda seconds: False
+    reset_wait = crate.reset_sequence.wait
+    crate.reset_sequence.wait = lambda seconds: reset_wait(0)
+
+    start = time.time()
+    crate.mch_comms.ipmitool_shell_disconnect()
+    crate.mch_comms.ipmitool_shell_connect()
+    crate.connection_up()
+    results['reconnect'] = time.time() - start
+
+    start = time.time()
+    crate.reset()
+    crate.reset_sequence.thread.join(RESET_TIMEOUT)
+    if crate.reset_sequence.running():
+        crate.reset_sequence.cancel()
+        raise RuntimeError('crate reset did not finish')
+    results['reset'] = time.time() - start
+
+    results['peak_kb'] = tracemalloc.get_traced_memory()[1] / 1024.0
+    tracemalloc.stop()
+    mtca_core.stop()
+    return results
+
+def start_case(cards, latency, scans, recording = None, lan_recording = None):
+    """
+    Run one case in a new process, against a replayed MCH
+
+    Args:
+        cards (int): number of AMCs in the synthetic crate
+        latency (float): time taken by each command (s)
+        scans (int): number of full sensor scans to time
+        recording (str, optional): ipmitool recording to use instead of a
+            synthetic crate
+        lan_recording (str, optional): LAN recording, to use the LAN
+            backend
+
+    Returns:
+        dict of results, or None if the case failed
+    """
+
+    sys.path.insert(0, SCRIPT_DIR)
+    import ipmitool_replay
+
+    work = tempfile.mkdtemp(prefix='mtca_benchmark_')
+    try:
+        bin_dir = os.path.join(work, 'bin')
+        os.mkdir(bin_dir)
+        os.symlink(os.path.join(SCRIPT_DIR, 'ipmitool_replay.py'),
+                os.path.join(bin_dir, 'ipmitool'))
+
+        if recording is None and lan_recording is None:
+            recording = os.path.join(work, 'crate.jsonl')
+            with open(recording, 'w') as f:
+                for entry in ipmitool_replay.synthetic_recording(cards):
+                    f.write(json.dumps(entry) + '\n')
+
+        env = os.environ.copy()
+        env.update({
+            'IPMITOOL': bin_dir
+            ,'IPMITOOL_REPLAY': recording or ''
+            ,'IPMITOOL_REPLAY_LATENCY': str(latency)
+            ,'TOP': TOP
+            ,'MTCA_CACHE_DIR': work
+            ,'IPMI_BACKEND': 'lan' if lan_recording else 'shell'
+            # Every scan goes to the MCH
+            ,'MTCA_RESPONSE_CACHE': '0'
+        })
+        command = [sys.executable, os.path.realpath(__file__),
+                '--run-case', '--scans', str(scans), '--latency', str(latency)]
+        if lan_recording:
+            command.extend(['--lan-recording', lan_recording])
+
+        output = subprocess.run(command, env=env, stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT).stdout.decode('ascii', 'replace')
+        for line in output.splitlines():
+            if line.startswith(RESULT_TAG):
+                return json.loads(line[len(RESULT_TAG):])
+        print(output)
+        return None
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+def main():
+    # Get the arguments
+    parser = argparse.ArgumentParser(description = 'Benchmark the crate core against a replayed MCH')
+    parser.add_argument('--cards', type=int, nargs='+', default=[2, 6, 12], help='numbers of AMCs in the synthetic crates')
+    parser.add_argument('--latency', type=float, nargs='+', default=[0.0, 0.005, 0.02], help='time taken by each command (s)')
+    parser.add_argument('--scans', type=int, default=10, help='number of sensor scans to time')
+    parser.add_argument('--recording', help='ipmitool recording to replay instead of synthetic crates')
+    parser.add_argument('--lan-recording', help='IPMI LAN recording to replay with the LAN backend')
+    parser.add_argument('--run-case', action='store_true', help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.run_case:
+        sys.path.insert(0, SCRIPT_DIR)
+        results = run_case(args.scans, args.lan_recording, args.latency[0])
+        print(RESULT_TAG + json.dumps(results))
+        sys.stdout.flush()
+        # Don't wait for the background threads
+        os._exit(0)
+
+    # Recordings have a fixed crate size
+    sizes = args.cards
+    if args.recording or args.lan_recording:
+        sizes = [None]
+
+    columns = ['frus', 'sensors', 'connect', 'populate', 'scan_mean',
+            'scan_max', 'reconnect', 'reset', 'peak_kb']
+    print('{:>6s} {:>8s} '.format('cards', 'latency') + ' '.join('{:>9s}'.format(c) for c in columns))
+    for cards in sizes:
+        for latency in args.latency:
+            results = start_case(cards, latency, args.scans,
+                    args.recording, args.lan_recording)
+            if results is None:
+                print('{} cards, {} s latency: failed'.format(cards, latency))
+                continue
+            print('{:>6s} {:8.3f} '.format(str(cards) if cards else '-', latency)
+                    + ' '.join('{:9.3f}'.format(results[c])
+                        if isinstance(results[c], float) else '{:9d}'.format(results[c])
+                        for c in columns))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+
+# File: mtca_broker.py
+# Date: 2026-10-17
+#
+# Description:
+# MCH connection broker: one ipmitool shell session per MCH, shared by every
+# IOC and tool on the host.
+#
+# MCHs only allow a few sessions, and each IOC and tool would otherwise open
+# its own. The broker opens a session to an MCH the first time a client
+# asks for it, and keeps it up with the same reconnection and timeout
+# handling as the IOC (it uses the crate core). Clients connect to a Unix
+# socket (MTCA_BROKER_SOCKET) and send batches of ipmitool commands, see
+# broker_client.py. IOCs use it with IPMI_BACKEND=broker.
+#
+# Requests for the same commands that arrive while a batch is in progress
+# wait for it and share its responses, rather than being sent again. The
+# latest response to each read command is kept, and given to clients that
+# will take a response of that age. Any other command, such as setting
+# thresholds or activating a card, clears the responses kept for its MCH.
+#
+# Examples:
+#   mtca_broker.py
+#   mtca_broker.py --status
+#   mtca_broker.py --mch mch1 sdr entity 193.101
+
+import argparse
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'src'))
+import mtca_core
+from mtca_core import BACKEND_SHELL, SHELL_TIMEOUT, command_timeout
+from broker_client import BrokerClient, BrokerError, BROKER_SOCKET
+
+# Read commands whose latest response is kept, by their first two words
+CACHED_COMMANDS = [
+    ('sdr', 'entity')
+    ,('sdr', 'elist')
+    ,('sdr', 'list')
+    ,('sdr', 'info')
+    ,('sdr', 'type')
+    ,('sensor', 'get')
+    ,('sensor', 'list')
+    ,('mc', 'info')
+    ,('fru', 'print')
+]
+
+class PendingBatch():
+    """
+    Batch of commands in progress, for requests that arrive meanwhile to
+    wait on
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+
+
+class MCHBroker():
+    """
+    Sessions to the MCHs, and the responses kept for each
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Batches in progress, keyed by (host, commands)
+        self.in_flight = {}
+        # Latest response to each read command, keyed by (host, command),
+        # as (time, response)
+        self.responses = {}
+        # Lock per MCH, so that its batches are sent in turn
+        self.host_locks = {}
+        # Request counts per MCH
+        self.counts = {}
+
+    def session(self, host):
+        """
+        Get the crate that holds the session to an MCH, connecting to it
+        the first time
+
+        Args:
+            host (str): MCH host name or address
+
+        Returns:
+            MTCACrate object
+        """
+
+        crate = mtca_core.get_crate(host)
+        if crate.host is None:
+            # The broker always talks to the MCH through ipmitool
+            for mch_comms in crate.comms_pool:
+                mch_comms.backend = BACKEND_SHELL
+            crate.supervisor.on_connect = lambda: self.connection_up(crate)
+            crate.host = host
+            crate.user = ''
+            crate.password = ''
+            mtca_core.connect(host)
+        return crate
+
+    def connection_up(self, crate):
+        """
+        Called when the session to an MCH has been made again. The clients
+        read the crate contents themselves, so only the flags set when it
+        was lost are cleared.
+
+        Args:
+            crate (MTCACrate): crate of the session
+
+        Returns:
+            Nothing
+        """
+
+        crate.crate_resetting = False
+        crate.mch_comms.comms_timeout = False
+
+    def count(self, host, name):
+        """
+        Count a request for the status
+        """
+
+        with self.lock:
+            counts = self.counts.setdefault(host,
+                    {'requests': 0, 'cached': 0, 'coalesced': 0})
+            counts[name] += 1
+
+    def call(self, host, commands, max_age):
+        """
+        Run a batch of commands on an MCH, or answer it from the kept
+        responses or a batch in progress
+
+        Args:
+            host (str): MCH host name or address
+            commands (list): commands, each a list of words
+            max_age (float): age of kept responses that will do (s)
+
+        Returns:
+            response (dict), see BrokerClient.call
+        """
+
+        commands = tuple(tuple(command) for command in commands)
+        self.count(host, 'requests')
+
+        if max_age > 0:
+            now = time.time()
+            with self.lock:
+                kept = [self.responses.get((host, command)) for command in commands]
+            if all(entry is not None and now - entry[0] <= max_age for entry in kept):
+                self.count(host, 'cached')
+                return {'results': [entry[1] for entry in kept], 'timed_out': None, 'connected': True}
+
+        key = (host, commands)
+        with self.lock:
+            pending = self.in_flight.get(key)
+            owner = pending is None
+            if owner:
+                pending = PendingBatch()
+                self.in_flight[key] = pending
+            host_lock = self.host_locks.setdefault(host, threading.Lock())
+
+        if not owner:
+            self.count(host, 'coalesced')
+            pending.done.wait()
+            return pending.response
+
+        try:
+            with host_lock:
+                pending.response = self.send(host, commands)
+        except Exception as e:
+            print('call: caught {}'.format(e))
+            pending.response = {'error': 'broker: {}'.format(e)}
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            pending.done.set()
+        return pending.response
+
+    def send(self, host, commands):
+        """
+        Send a batch of commands to an MCH, and keep the responses to read
+        commands
+
+        Args:
+            host (str): MCH host name or address
+            commands (tuple): commands, each a tuple of words
+
+        Returns:
+            response (dict), see BrokerClient.call
+        """
+
+        crate = self.session(host)
+        mch_comms = crate.mch_comms
+        mch_comms.ipmitool_shell_reconnect()
+        if not mch_comms.connected:
+            return {'results': [""] * len(commands), 'timed_out': None, 'connected': False}
+
+        results, timed_out = mch_comms.shell_batch([list(command) for command in commands])
+        now = time.time()
+
+        with self.lock:
+            if all(command[:2] in CACHED_COMMANDS for command in commands):
+                for command, result in zip(commands, results):
+                    if result:
+                        self.responses[(host, command)] = (now, result)
+            else:
+                # The MCH may have changed
+                for key in [key for key in self.responses if key[0] == host]:
+                    del self.responses[key]
+
+        return {'results': results, 'timed_out': timed_out, 'connected': mch_comms.connected}
+
+    def status(self):
+        """
+        Get the state of the sessions
+
+        Args:
+            None
+
+        Returns:
+            dict of session details, keyed by MCH host
+        """
+
+        sessions = {}
+        for host, crate in list(mtca_core._crates.items()):
+            with self.lock:
+                details = dict(self.counts.get(host, {}))
+            details['connected'] = crate.mch_comms.connected
+            details['timeouts'] = crate.stats.timeouts
+            sessions[host] = details
+        return sessions
+
+    def handle(self, message):
+        """
+        Answer one request
+
+        Args:
+            message (dict): request
+
+        Returns:
+            response (dict)
+        """
+
+        if message.get('status'):
+            return {'sessions': self.status()}
+
+        host = message.get('host')
+        commands = message.get('commands')
+        if (not isinstance(host, str)
+                or not isinstance(commands, list)
+                or not all(isinstance(command, list) and len(command) > 0 for command in commands)):
+            return {'error': 'bad request'}
+        return self.call(host, commands, float(message.get('max_age', 0.0)))
+
+
+class BrokerHandler(socketserver.StreamRequestHandler):
+    """
+    Connection from one client. Requests are answered in turn.
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                message = json.loads(line.decode('utf-8'))
+                if not isinstance(message, dict):
+                    raise ValueError('not an object')
+            except ValueError:
+                response = {'error': 'bad request'}
+            else:
+                response = self.server.broker.handle(message)
+            try:
+                self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            except OSError:
+                # The client has gone
+                return
+
+
+class BrokerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Unix socket server with a thread per client
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path, broker):
+        self.broker = broker
+        socketserver.UnixStreamServer.__init__(self, path, BrokerHandler)
+
+
+def serve(path):
+    """
+    Run the broker until it is stopped
+
+    Args:
+        path (str): socket path
+
+    Returns:
+        Nothing
+    """
+
+    if os.path.exists(path):
+        # Leave a running broker alone, but clear up after one that died
+        try:
+            BrokerClient(path).status()
+            print('mtca_broker: a broker is already running on {}'.format(path))
+            sys.exit(1)
+        except BrokerError:
+            os.unlink(path)
+
+    server = BrokerServer(path, MCHBroker())
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print('mtca_broker: listening on {}'.format(path))
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.server_close()
+        os.unlink(path)
+        mtca_core.stop()
+
+def main():
+    # Get the arguments
+    parser = argparse.ArgumentParser(description = 'Share MCH sessions between IOCs and tools')
+    parser.add_argument('--socket', default=BROKER_SOCKET, help='broker socket (MTCA_BROKER_SOCKET)')
+    parser.add_argument('--status', action='store_true', help='print the state of the broker sessions')
+    parser.add_argument('--mch', help='send an ipmitool command to this MCH through the broker')
+    parser.add_argument('--max-age', type=float, default=0.0, help='age of a kept response that will do (s)')
+    parser.add_argument('command', nargs='*', help='ipmitool command')
+
+    args = parser.parse_args()
+
+    if args.status:
+        print(json.dumps(BrokerClient(args.socket).status(), indent=4, sort_keys=True))
+    elif args.mch:
+        results, timed_out, connected = BrokerClient(args.socket).call(
+                args.mch, [args.command], args.max_age,
+                command_timeout(args.command, SHELL_TIMEOUT))
+        if not connected:
+            print('mtca_broker: no connection to {}'.format(args.mch))
+            sys.exit(1)
+        if timed_out is not None:
+            print('mtca_broker: {} timed out'.format(' '.join(args.command)))
+            sys.exit(1)
+        sys.stdout.write(results[0])
+    else:
+        serve(args.socket)
+
+if __name__ == '__main__':
+    main()
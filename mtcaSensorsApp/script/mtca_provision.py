@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+# File: mtca_provision.py
+# Date: 2026-10-17
+#
+# Description:
+# Set the sensor thresholds of MTCA crates from a threshold policy.
+#
+# The policy (see threshold_policy.py) gives the thresholds wanted for each
+# type of sensor and card. The thresholds of every crate are read over one
+# session to its MCH, and only those that differ from the policy are set
+# and then checked. Crates are provisioned in parallel. IPMI_BACKEND selects
+# the session, as for the IOC. mch_thresholds.json holds the fan and power
+# module thresholds that fan_set_alarms.py and power_module_set_alarms.py
+# used to set.
+#
+# Examples:
+#   mtca_provision.py --mch mch1 mch2 mch3
+#   mtca_provision.py --mch mch1 --policy my_thresholds.json --dry-run
+
+import argparse
+import os
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..', 'src'))
+# For the inputrc used by the ipmitool shell
+os.environ.setdefault('TOP', os.path.realpath(os.path.join(SCRIPT_DIR, '..', '..')))
+
+import mtca_core
+from mtca_core import BUS_IDS
+from threshold_policy import load_policy, PolicyError
+from provisioning import provision, SENSOR_OK, SENSOR_FAILED, SENSOR_UNREACHABLE
+
+def main():
+    # Get the arguments
+    parser = argparse.ArgumentParser(description = 'Set MTCA sensor thresholds from a policy')
+    parser.add_argument('--mch', required=True, nargs='+', help='MCH host names or IP addresses')
+    parser.add_argument('--policy', default=os.path.join(SCRIPT_DIR, 'mch_thresholds.json'), help='threshold policy file')
+    parser.add_argument('--user', default='', help='MCH user name')
+    parser.add_argument('--password', default='', help='MCH password')
+    parser.add_argument('--dry-run', action='store_true', help='only show the thresholds that would be set')
+    parser.add_argument('--retries', type=int, default=1, help='times to set thresholds again that the MCH did not take')
+    parser.add_argument('--workers', type=int, default=None, help='most crates provisioned at the same time')
+    parser.add_argument('--verbose', action='store_true', help='also list the sensors already set')
+
+    args = parser.parse_args()
+
+    try:
+        policy = load_policy(args.policy, BUS_IDS)
+    except PolicyError as e:
+        print('mtca_provision: {}'.format(e))
+        sys.exit(2)
+
+    try:
+        results = provision(args.mch, policy, args.user, args.password,
+                args.dry_run, args.retries, args.workers)
+    finally:
+        mtca_core.stop()
+
+    failed = False
+    for host in args.mch:
+        plans = results[host]
+        if plans is None:
+            print('{}: no connection'.format(host))
+            failed = True
+            continue
+        counts = {}
+        for plan in plans:
+            counts[plan.state] = counts.get(plan.state, 0) + 1
+            if plan.state != SENSOR_OK or args.verbose:
+                print('{}: {}'.format(host, plan))
+            if plan.state in (SENSOR_FAILED, SENSOR_UNREACHABLE):
+                failed = True
+        print('{}: {} sensors: {}'.format(host, len(plans),
+                ', '.join('{} {}'.format(count, state) for state, count in sorted(counts.items()))))
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+# File: pet_send.py
+# Date: 2026-10-17
+#
+# Description:
+# Capture, replay and fake the Platform Event Traps (PET) an MCH sends, to
+# test the IOC's PET listener (MTCA_PET_PORT) without pulling cards.
+#
+# Captured traps are stored one per line, as the hex of the UDP payload.
+#
+# Examples:
+#   pet_send.py --listen 16200 --out traps.txt
+#   pet_send.py --replay traps.txt --port 16200
+#   pet_send.py --agent 192.168.1.41 --entity 193.101 --sensor-type 0xf2 \
+#       --event-type 0x6f --offset 1 --port 16200
+
+import argparse
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'src'))
+from pet_listener import decode_pet, encode_pet, MAX_PACKET
+
+def describe(packet, source = None):
+    """
+    Describe a trap
+
+    Args:
+        packet (bytes): UDP payload
+        source (str, optional): address it came from
+
+    Returns:
+        description (str)
+    """
+
+    alert = decode_pet(packet, source)
+    if alert is None:
+        return 'not a PET ({} bytes)'.format(len(packet))
+    return 'from {} entity {} sensor 0x{:02x}/0x{:02x}: {}'.format(
+            alert.agent, alert.fru_id, alert.generator, alert.sensor_number,
+            alert.description())
+
+def listen(port, path):
+    """
+    Print the traps received on a port, and append them to a file
+
+    Args:
+        port (int): UDP port
+        path (str): capture file, or None to only print them
+
+    Returns:
+        Nothing
+    """
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('', port))
+    while True:
+        packet, source = sock.recvfrom(MAX_PACKET)
+        print(describe(packet, source[0]))
+        if path is not None:
+            with open(path, 'a') as f:
+                f.write(packet.hex() + '\n')
+
+def replay(path, host, port, interval):
+    """
+    Send captured traps
+
+    Args:
+        path (str): capture file
+        host (str): IOC host
+        port (int): IOC PET port
+        interval (float): time between traps (s)
+
+    Returns:
+        Nothing
+    """
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if len(line) == 0 or line.startswith('#'):
+                continue
+            packet = bytes.fromhex(line)
+            print(describe(packet))
+            sock.sendto(packet, (host, port))
+            time.sleep(interval)
+
+def main():
+    # Get the arguments
+    parser = argparse.ArgumentParser(description = 'Capture, replay and fake MCH Platform Event Traps')
+    parser.add_argument('--host', default='127.0.0.1', help='host of the IOC')
+    parser.add_argument('--port', type=int, default=162, help='PET port of the IOC (MTCA_PET_PORT)')
+    parser.add_argument('--listen', type=int, metavar='PORT', help='capture traps sent to this port')
+    parser.add_argument('--out', help='capture file')
+    parser.add_argument('--replay', metavar='FILE', help='send the traps captured in a file')
+    parser.add_argument('--interval', type=float, default=0.1, help='time between replayed traps (s)')
+    parser.add_argument('--agent', default='127.0.0.1', help='MCH address given in a fake trap')
+    parser.add_argument('--entity', default='193.101', help='entity ID and instance of the card')
+    parser.add_argument('--sensor-device', type=lambda x: int(x, 0), default=0x20, help='IPMB address of the sensor owner')
+    parser.add_argument('--sensor-number', type=lambda x: int(x, 0), default=0, help='sensor number')
+    parser.add_argument('--sensor-type', type=lambda x: int(x, 0), default=0xf2, help='sensor type (default module hot swap)')
+    parser.add_argument('--event-type', type=lambda x: int(x, 0), default=0x6f, help='event/reading type')
+    parser.add_argument('--offset', type=lambda x: int(x, 0), default=1, help='event offset')
+    parser.add_argument('--deassert', action='store_true', help='send a deassertion event')
+
+    args = parser.parse_args()
+
+    if args.listen:
+        listen(args.listen, args.out)
+    elif args.replay:
+        replay(args.replay, args.host, args.port, args.interval)
+    else:
+        packet = encode_pet(args.agent, args.sensor_type, args.event_type,
+                args.offset, asserted = not args.deassert,
+                sensor_device = args.sensor_device,
+                sensor_number = args.sensor_number, entity = args.entity,
+                timestamp = int(time.time()))
+        print(describe(packet))
+        socket.socket(socket.AF_INET, socket.SOCK_DGRAM).sendto(packet, (args.host, args.port))
+        if args.out:
+            with open(args.out, 'a') as f:
+                f.write(packet.hex() + '\n')
+
+if __name__ == '__main__':
+    main()
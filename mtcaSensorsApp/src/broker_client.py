@@ -0,0 +1,171 @@
+# File: broker_client.py
+# Date: 2026-10-17
+#
+# Description:
+# Client for the MCH connection broker (script/mtca_broker.py).
+#
+# The broker is a daemon that owns one ipmitool shell session per MCH and
+# serves any number of IOCs and command line tools on the same host over a
+# Unix socket, so they don't each take one of the MCH's few session slots.
+# Requests and responses are single lines of JSON. A request carries the
+# MCH host and a batch of ipmitool commands, and the response the output of
+# each command, as MCH_comms.shell_batch returns it.
+#
+# This module only needs the standard library, so tools can use it without
+# the crate core.
+
+import json
+import os
+import socket
+import tempfile
+import threading
+
+# Broker socket, set with MTCA_BROKER_SOCKET
+BROKER_SOCKET = os.environ.get('MTCA_BROKER_SOCKET',
+        os.path.join(tempfile.gettempdir(), 'mtca_broker.sock'))
+
+# Time allowed for the broker to answer, on top of the time allowed for the
+# commands themselves (s)
+BROKER_MARGIN = 5.0
+
+# Longest request or response line accepted
+MAX_LINE = 16 * 1024 * 1024
+
+class BrokerError(Exception):
+    """
+    No answer from the broker, or an error reported by it
+    """
+    pass
+
+
+class BrokerClient():
+    """
+    Connection to the MCH connection broker, shared by the threads of one
+    process. Requests are answered in turn.
+    """
+
+    def __init__(self, path = None):
+        """
+        BrokerClient initializer
+
+        Args:
+            path (str, optional): broker socket. BROKER_SOCKET by default.
+
+        Returns:
+            Nothing
+        """
+
+        self.path = path or BROKER_SOCKET
+        self.sock = None
+        self.reader = None
+        self.lock = threading.Lock()
+
+    def close(self):
+        """
+        Close the connection to the broker. The next request opens it
+        again.
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        with self.lock:
+            self.close_locked()
+
+    def close_locked(self):
+        """
+        Close the connection, with the lock held
+        """
+
+        if self.reader is not None:
+            self.reader.close()
+        if self.sock is not None:
+            self.sock.close()
+        self.sock = None
+        self.reader = None
+
+    def request(self, message, timeout):
+        """
+        Send one request to the broker and wait for the response
+
+        Args:
+            message (dict): request
+            timeout (float): time allowed for the response (s)
+
+        Returns:
+            response (dict)
+
+        Raises:
+            BrokerError: no answer from the broker, or an error reported
+                by it
+        """
+
+        with self.lock:
+            try:
+                if self.sock is None:
+                    self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    self.sock.connect(self.path)
+                    self.reader = self.sock.makefile('rb')
+                self.sock.settimeout(timeout)
+                self.sock.sendall(json.dumps(message).encode('utf-8') + b'\n')
+                line = self.reader.readline(MAX_LINE)
+                if not line.endswith(b'\n'):
+                    raise BrokerError('connection to the broker closed')
+                response = json.loads(line.decode('utf-8'))
+            except (OSError, ValueError) as e:
+                # Start again on a new connection, as a late response would
+                # be taken for the next one
+                self.close_locked()
+                raise BrokerError('broker {}: {}'.format(self.path, e))
+            except BrokerError:
+                self.close_locked()
+                raise
+
+        if 'error' in response:
+            raise BrokerError(response['error'])
+        return response
+
+    def call(self, host, commands, max_age = 0.0, timeout = 60.0):
+        """
+        Run a batch of ipmitool commands on an MCH through the broker
+
+        Args:
+            host (str): MCH host name or address
+            commands (list): commands, each a list of words
+            max_age (float, optional): age of cached responses that will
+                do instead of sending a command (s). 0 to always send it.
+            timeout (float, optional): time allowed for the commands (s)
+
+        Returns:
+            (results, timed_out, connected): response to each command, or
+            None for the commands after one that timed out, the index of
+            the command that timed out, or None, and whether the broker is
+            connected to the MCH. The commands aren't run when it isn't.
+
+        Raises:
+            BrokerError: no answer from the broker, or an error reported
+                by it
+        """
+
+        response = self.request({
+            'host': host
+            ,'commands': [[str(e) for e in command] for command in commands]
+            ,'max_age': max_age
+        }, timeout + BROKER_MARGIN)
+        return response['results'], response['timed_out'], response['connected']
+
+    def status(self):
+        """
+        Get the state of the broker's MCH sessions
+
+        Args:
+            None
+
+        Returns:
+            dict of session details, keyed by MCH host
+        """
+
+        return self.request({'status': True}, BROKER_MARGIN)['sessions']
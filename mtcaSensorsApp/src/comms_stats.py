@@ -0,0 +1,213 @@
+# File: comms_stats.py
+# Date: 2026-10-17
+#
+# Description:
+# Timing and traffic statistics for the comms with one MCH.
+#
+# Latencies are counted in fixed histogram bins rather than kept as samples,
+# so the statistics take the same small amount of memory however long the
+# IOC runs. They are published through records, to help choose scan periods
+# and to spot an MCH that is getting slower before it stops answering.
+
+import threading
+import numpy
+
+# Upper edges of the latency histogram bins (s). The last bin counts
+# anything slower.
+LATENCY_BINS = [0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0]
+
+class LatencyHistogram():
+    """
+    Histogram of durations, with their count, mean and maximum
+    """
+
+    def __init__(self):
+        """
+        LatencyHistogram initializer
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        self.counts = numpy.zeros(len(LATENCY_BINS) + 1, dtype=numpy.int64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        """
+        Count a duration
+
+        Args:
+            seconds (float): duration
+
+        Returns:
+            Nothing
+        """
+
+        self.counts[numpy.searchsorted(LATENCY_BINS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+
+    def mean(self):
+        """
+        Get the mean duration
+
+        Args:
+            None
+
+        Returns:
+            mean (float), or 0 if nothing has been counted
+        """
+
+        return self.total / self.count if self.count else 0.0
+
+
+def command_name(ipmitool_cmd):
+    """
+    Get the type of an ipmitool command, as its first two words
+
+    Args:
+        ipmitool_cmd (list): command words
+
+    Returns:
+        name (str), e.g., 'sdr entity'
+    """
+
+    return ' '.join(str(e) for e in ipmitool_cmd[:2])
+
+
+class CommsStats():
+    """
+    Statistics for one crate, shared by all of its sessions
+    """
+
+    def __init__(self):
+        """
+        CommsStats initializer
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        # Latency of each command type, keyed by command name
+        self.commands = {}
+        # Duration of crate scans, card list reads and connections
+        self.scan = LatencyHistogram()
+        self.populate = LatencyHistogram()
+        self.connect = LatencyHistogram()
+
+        # FRU reads in the last scan, and the most in any scan
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+
+        self.timeouts = 0
+        self.reconnects = 0
+        # ipmitool output received and parsed
+        self.bytes_parsed = 0
+
+        self.lock = threading.Lock()
+
+    def command(self, name):
+        """
+        Get the latency histogram of a command type
+
+        Args:
+            name (str): command name (see command_name)
+
+        Returns:
+            LatencyHistogram, or None if the command hasn't been used
+        """
+
+        return self.commands.get(name)
+
+    def add_command(self, ipmitool_cmd, seconds, nbytes = 0):
+        """
+        Count a command
+
+        Args:
+            ipmitool_cmd (list): command words
+            seconds (float): time taken
+            nbytes (int): length of the response
+
+        Returns:
+            Nothing
+        """
+
+        name = command_name(ipmitool_cmd)
+        with self.lock:
+            histogram = self.commands.get(name)
+            if histogram is None:
+                histogram = self.commands[name] = LatencyHistogram()
+            histogram.add(seconds)
+            self.bytes_parsed += nbytes
+
+    def add_timeout(self):
+        """
+        Count a command timeout
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        with self.lock:
+            self.timeouts += 1
+
+    def add_scan(self, seconds, queue_depth):
+        """
+        Count a crate scan
+
+        Args:
+            seconds (float): time taken
+            queue_depth (int): FRUs read in the scan
+
+        Returns:
+            Nothing
+        """
+
+        with self.lock:
+            self.scan.add(seconds)
+            self.queue_depth = queue_depth
+            self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+
+    def add_populate(self, seconds):
+        """
+        Count a read of the card list
+
+        Args:
+            seconds (float): time taken
+
+        Returns:
+            Nothing
+        """
+
+        with self.lock:
+            self.populate.add(seconds)
+
+    def add_connect(self, seconds):
+        """
+        Count a connection to the MCH. All but the first are reconnections.
+
+        Args:
+            seconds (float): time taken
+
+        Returns:
+            Nothing
+        """
+
+        with self.lock:
+            if self.connect.count > 0:
+                self.reconnects += 1
+            self.connect.add(seconds)
@@ -0,0 +1,270 @@
+# File: connection_supervisor.py
+# Date: 2026-10-17
+#
+# Description:
+# Background thread that looks after the connection to one MCH.
+#
+# Records and scans never wait for the MCH to come back. When the
+# connection is lost they see that it is down and skip their I/O, and this
+# thread reconnects in the background. Failed attempts back off
+# exponentially, with random jitter so that the crates in a rack don't all
+# retry together after a power cut, and a cheap liveness probe is tried
+# before each full connection attempt.
+
+import random
+import threading
+
+CONN_STATES = [
+    'DISCONNECTED'
+    ,'CONNECTING'
+    ,'CONNECTED'
+    ,'PAUSED'
+]
+
+# Time between checks of the connection while it is up (s)
+CHECK_PERIOD = 1.0
+
+class Backoff():
+    """
+    Exponential backoff with jitter
+    """
+
+    def __init__(self, initial = 1.0, maximum = 60.0, factor = 2.0, jitter = 0.2):
+        """
+        Backoff initializer
+
+        Args:
+            initial (float): first delay (s)
+            maximum (float): longest delay (s)
+            factor (float): delay multiplier for each failure
+            jitter (float): random fraction added to or taken off each delay
+
+        Returns:
+            Nothing
+        """
+
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+        self.delay = initial
+
+    def next(self):
+        """
+        Get the delay before the next attempt, and increase the delay for
+        the one after
+
+        Args:
+            None
+
+        Returns:
+            delay (float)
+        """
+
+        delay = self.delay * (1.0 + random.uniform(-self.jitter, self.jitter))
+        self.delay = min(self.delay * self.factor, self.maximum)
+        return delay
+
+    def reset(self):
+        """
+        Go back to the initial delay after a success
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        self.delay = self.initial
+
+
+class ConnectionSupervisor():
+    """
+    Reconnects to an MCH in the background
+    """
+
+    def __init__(self, name, connected, probe, connect, on_connect,
+            paused = None, on_change = None, backoff = None):
+        """
+        ConnectionSupervisor initializer
+
+        Args:
+            name (str): name used in messages and the thread name
+            connected (callable): returns True while the connection is up
+            probe (callable): cheap check that the MCH is reachable
+            connect (callable): one connection attempt, returns True if it
+                worked
+            on_connect (callable): called after connecting, to reread the
+                crate contents
+            paused (callable, optional): returns True while something else
+                (e.g., a crate reset) owns the connection, or it can't be
+                made yet
+            on_change (callable, optional): called when the state changes
+            backoff (Backoff, optional): retry delays
+
+        Returns:
+            Nothing
+        """
+
+        self.name = name
+        self.connected = connected
+        self.probe = probe
+        self.connect = connect
+        self.on_connect = on_connect
+        self.paused = paused
+        self.on_change = on_change
+        self.backoff = backoff if backoff is not None else Backoff()
+
+        self.state = CONN_STATES.index('DISCONNECTED')
+        # Failed attempts since the last connection, and the current
+        # retry delay
+        self.attempts = 0
+        self.retry_delay = 0.0
+
+        self.thread = None
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+
+    def start(self):
+        """
+        Start the supervisor thread, if it isn't already running
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        with self.lock:
+            if self.thread is not None or self.stopped.is_set():
+                return
+            self.thread = threading.Thread(
+                    target=self.run,
+                    name='{} supervisor'.format(self.name))
+            self.thread.daemon = True
+            self.thread.start()
+
+    def stop(self):
+        """
+        Stop the supervisor thread
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        self.stopped.set()
+        self.wakeup.set()
+
+    def wake(self):
+        """
+        Tell the supervisor that the connection may have gone down. Called
+        by readers instead of reconnecting themselves. Doesn't cut short a
+        backoff delay.
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        self.start()
+        self.wakeup.set()
+
+    def wait(self, seconds):
+        """
+        Wait, unless the supervisor is stopped first
+
+        Args:
+            seconds (float): time to wait
+
+        Returns:
+            True if the supervisor was stopped
+        """
+
+        return self.stopped.wait(seconds)
+
+    def set_state(self, state):
+        """
+        Update the state, and tell the status records if it has changed
+
+        Args:
+            state (str): one of CONN_STATES
+
+        Returns:
+            Nothing
+        """
+
+        state = CONN_STATES.index(state)
+        if state != self.state:
+            self.state = state
+            if self.on_change is not None:
+                self.on_change()
+
+    def run(self):
+        """
+        Supervisor thread
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        while not self.stopped.is_set():
+            if self.paused is not None and self.paused():
+                self.set_state('PAUSED')
+            elif self.connected():
+                self.set_state('CONNECTED')
+            else:
+                self.attempt()
+                continue
+
+            self.wakeup.wait(CHECK_PERIOD)
+            self.wakeup.clear()
+
+    def attempt(self):
+        """
+        Try to connect once, and back off if that fails
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        self.set_state('CONNECTING')
+        ok = False
+        try:
+            ok = self.probe() and self.connect()
+            if ok:
+                self.on_connect()
+        except Exception as e:
+            print('{}: connection attempt failed: {}'.format(self.name, e))
+            ok = False
+
+        if ok:
+            print('{}: connected'.format(self.name))
+            self.attempts = 0
+            self.retry_delay = 0.0
+            self.backoff.reset()
+            self.set_state('CONNECTED')
+            return
+
+        self.attempts += 1
+        self.retry_delay = self.backoff.next()
+        if self.attempts == 1:
+            print('{}: MCH not responding, retrying in the background'.format(self.name))
+        self.set_state('DISCONNECTED')
+        if self.on_change is not None:
+            self.on_change()
+        self.wait(self.retry_delay)
+        self.wakeup.clear()
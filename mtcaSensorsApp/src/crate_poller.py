@@ -0,0 +1,192 @@
+# File: crate_poller.py
+# Date: 2026-10-17
+#
+# Description:
+# Poll any number of MTCA crates concurrently from one IOC process.
+#
+# An asyncio event loop runs in a background thread. Each crate scan is
+# scheduled on the loop as its own task, and the blocking MCH comms for the
+# scan run in a worker thread, so a slow or unreachable crate does not hold
+# up the others. Only one scan per crate is in progress at any time.
+#
+# Unless the number of workers is fixed, the pool has one worker for each
+# key registered before the first scan, so no scan waits in the queue for a
+# worker held by another crate. The PET reads of a crate are submitted under
+# their own key (see MTCACrate.handle_alert), so they get their own workers
+# as well. Keys first seen after the pool has started share its workers.
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class CratePoller():
+    """
+    Concurrent scan engine for multiple crates
+    """
+
+    def __init__(self, max_workers = None):
+        """
+        CratePoller initializer
+
+        Args:
+            max_workers (int, optional): maximum number of crates scanned
+                at the same time. By default, one worker for each key
+                registered.
+
+        Returns:
+            Nothing
+        """
+
+        self.max_workers = max_workers
+        self.loop = None
+        self.thread = None
+        self.executor = None
+        self.workers = 0
+        self.stopped = False
+        # Crates with a scan in progress, and all crates registered
+        self.busy = set()
+        self.keys = set()
+        self.lock = threading.Lock()
+
+    def register(self, *keys):
+        """
+        Add crates to be scanned, so that the pool has a worker for each
+        of them when it starts
+
+        Args:
+            keys (str): crate keys
+
+        Returns:
+            Nothing
+        """
+
+        with self.lock:
+            self.keys.update(keys)
+
+    def start(self):
+        """
+        Start the event loop thread, if it isn't already running
+
+        Args:
+            None
+
+        Returns:
+            True if the poller is running, False if it has been stopped
+        """
+
+        with self.lock:
+            return self.start_locked()
+
+    def start_locked(self):
+        """
+        Start the event loop thread. Called with the lock held.
+
+        Args:
+            None
+
+        Returns:
+            True if the poller is running, False if it has been stopped
+        """
+
+        if self.stopped:
+            return False
+        if self.thread is None:
+            self.workers = self.max_workers or max(len(self.keys), 1)
+            self.executor = ThreadPoolExecutor(self.workers)
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=self.run, args=(self.loop,),
+                    name='CratePoller')
+            self.thread.daemon = True
+            self.thread.start()
+        return True
+
+    def run(self, loop):
+        """
+        Event loop thread
+
+        Args:
+            loop (AbstractEventLoop): loop to run. stop() may have
+                cleared self.loop by the time it finishes.
+
+        Returns:
+            Nothing
+        """
+
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+        # Let the scans stop() abandoned finish cleanly
+        tasks = asyncio.all_tasks(loop)
+        for task in tasks:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        loop.close()
+
+    def stop(self):
+        """
+        Stop the event loop thread for good. Scans in progress are
+        abandoned, and no more are scheduled.
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        with self.lock:
+            self.stopped = True
+            thread, loop, executor = self.thread, self.loop, self.executor
+            self.thread = None
+            self.loop = None
+            self.executor = None
+            self.busy.clear()
+        if thread is None:
+            return
+        # Scans finishing meanwhile take the lock, so wait without it
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        executor.shutdown(wait=False)
+
+    def submit(self, key, scan):
+        """
+        Schedule a scan of a crate, unless one is already in progress
+
+        Args:
+            key (str): crate key
+            scan (callable): blocking function that scans the crate
+
+        Returns:
+            True if the scan was scheduled, False if one is in progress or
+            the poller has been stopped
+        """
+
+        # One lock hold, so that stop() can't take the pool or the loop
+        # away in between
+        with self.lock:
+            if key in self.busy or not self.start_locked():
+                return False
+            self.busy.add(key)
+            self.keys.add(key)
+            future = self.executor.submit(scan)
+            asyncio.run_coroutine_threadsafe(self.scan(key, future), self.loop)
+        return True
+
+    async def scan(self, key, future):
+        """
+        Wait for one crate scan to finish in its worker thread
+
+        Args:
+            key (str): crate key
+            future (Future): scan submitted to the worker pool
+
+        Returns:
+            Nothing
+        """
+
+        try:
+            await asyncio.wrap_future(future)
+        except Exception as e:
+            print('CratePoller: scan of crate "{}" failed: {}'.format(key, e))
+        finally:
+            with self.lock:
+                self.busy.discard(key)
@@ -0,0 +1,877 @@
+# File: ipmi_lan.py
+# Date: 2026-10-17
+#
+# Description:
+# Native IPMI v1.5 over LAN (RMCP) client for talking to an MCH without
+# going through an ipmitool process. Only the commands needed to read MTCA
+# crate sensors are implemented: session setup, SDR repository access,
+# sensor readings and thresholds, and the SEL clock.
+#
+# Sensors owned by other controllers (AMC, cooling unit and power module
+# IPMCs) are read by bridging through the MCH with Send Message, in the same
+# way as ipmitool does for "sdr entity".
+
+import hashlib
+import math
+import socket
+import struct
+import threading
+import time
+
+RMCP_PORT = 623
+RMCP_VERSION = 0x06
+RMCP_NO_ACK = 0xff
+RMCP_CLASS_ASF = 0x06
+RMCP_CLASS_IPMI = 0x07
+
+# ASF presence ping, answered by the MCH without a session
+ASF_IANA = 4542
+ASF_PRESENCE_PING = 0x80
+ASF_PRESENCE_PONG = 0x40
+
+AUTH_NONE = 0x00
+AUTH_MD5 = 0x02
+AUTH_PASSWORD = 0x04
+
+AUTH_TYPES = {
+    'none': AUTH_NONE
+    ,'md5': AUTH_MD5
+    ,'password': AUTH_PASSWORD
+}
+
+BMC_SLAVE_ADDR = 0x20
+REMOTE_SWID = 0x81
+
+NETFN_SENSOR = 0x04
+NETFN_APP = 0x06
+NETFN_STORAGE = 0x0a
+
+CMD_GET_DEVICE_ID = 0x01
+CMD_SEND_MESSAGE = 0x34
+CMD_GET_CHANNEL_AUTH_CAP = 0x38
+CMD_GET_SESSION_CHALLENGE = 0x39
+CMD_ACTIVATE_SESSION = 0x3a
+CMD_SET_SESSION_PRIV = 0x3b
+CMD_CLOSE_SESSION = 0x3c
+
+CMD_SET_SENSOR_THRESHOLDS = 0x26
+CMD_GET_SENSOR_THRESHOLDS = 0x27
+CMD_GET_SENSOR_READING = 0x2d
+
+CMD_GET_SDR_REPO_INFO = 0x20
+CMD_RESERVE_SDR_REPO = 0x22
+CMD_GET_SDR = 0x23
+CMD_GET_SEL_TIME = 0x48
+
+PRIV_ADMIN = 0x04
+
+CC_OK = 0x00
+CC_RESERVATION_CANCELLED = 0xc5
+CC_CANNOT_RETURN_BYTES = 0xca
+
+SDR_FULL_SENSOR = 0x01
+SDR_COMPACT_SENSOR = 0x02
+SDR_FRU_LOCATOR = 0x11
+SDR_MC_LOCATOR = 0x12
+
+SDR_HEADER_LEN = 5
+SDR_CHUNK_SIZE = 32
+SDR_MIN_CHUNK_SIZE = 8
+SDR_LAST_RECORD = 0xffff
+
+# Sensor reading flags (Get Sensor Reading, byte 2)
+READING_UNAVAILABLE = 0x20
+READING_SCANNING_ENABLED = 0x40
+
+# Threshold status bits (Get Sensor Reading, byte 3), in the order ipmitool
+# reports them
+THRESHOLD_STATUS = [
+    (0x04, 'lnr')
+    ,(0x20, 'unr')
+    ,(0x02, 'lcr')
+    ,(0x10, 'ucr')
+    ,(0x01, 'lnc')
+    ,(0x08, 'unc')
+]
+
+# Threshold mask bits and order of values in Get Sensor Thresholds
+THRESHOLD_NAMES = ['lnc', 'lcr', 'lnr', 'unc', 'ucr', 'unr']
+
+# Subset of IPMI base unit codes used by MTCA sensors, named as ipmitool
+# prints them
+UNIT_NAMES = {
+    0: 'unspecified'
+    ,1: 'degrees C'
+    ,2: 'degrees F'
+    ,3: 'degrees K'
+    ,4: 'Volts'
+    ,5: 'Amps'
+    ,6: 'Watts'
+    ,18: 'RPM'
+    ,19: 'Hz'
+}
+
+# Analog data formats (units 1, bits 7:6)
+ANALOG_UNSIGNED = 0
+ANALOG_1S_COMPLEMENT = 1
+ANALOG_2S_COMPLEMENT = 2
+ANALOG_NONE = 3
+
+# Event/reading type code for threshold based sensors
+EVENT_TYPE_THRESHOLD = 0x01
+
+# PICMG Module Hot Swap sensor states (sensor type 0xf2)
+SENSOR_TYPE_MODULE_HOT_SWAP = 0xf2
+MODULE_HOT_SWAP_STATES = [
+    'Module Handle Closed'
+    ,'Module Handle Opened'
+    ,'Quiesced'
+    ,'Backend Power Failure'
+    ,'Backend Power Shut Down'
+]
+
+LINEARIZATION = {
+    0: lambda x: x
+    ,1: math.log
+    ,2: math.log10
+    ,3: lambda x: math.log(x, 2)
+    ,4: math.exp
+    ,5: lambda x: math.pow(10.0, x)
+    ,6: lambda x: math.pow(2.0, x)
+    ,7: lambda x: 1.0 / x
+    ,8: lambda x: x * x
+    ,9: lambda x: x * x * x
+    ,10: math.sqrt
+    ,11: lambda x: math.copysign(abs(x) ** (1.0 / 3.0), x)
+}
+
+
+class IPMIError(Exception):
+    """
+    Error returned by the MCH, or a malformed exchange
+    """
+
+    def __init__(self, message, cc = None):
+        Exception.__init__(self, message)
+        self.cc = cc
+
+
+class IPMITimeout(IPMIError):
+    """
+    No response from the MCH within the retry limit
+    """
+    pass
+
+
+def checksum(data):
+    """
+    IPMI two's complement checksum
+
+    Args:
+        data (bytes): bytes to be checksummed
+
+    Returns:
+        checksum (int)
+    """
+
+    return (-sum(bytearray(data))) & 0xff
+
+
+def signed(value, bits):
+    """
+    Convert a two's complement field of the given width to a signed integer
+    """
+
+    if value & (1 << (bits - 1)):
+        value -= 1 << bits
+    return value
+
+
+def decode_id_string(type_length, data):
+    """
+    Decode an SDR ID string as 8-bit ASCII
+
+    Args:
+        type_length (int): type/length byte
+        data (bytes): string bytes
+
+    Returns:
+        name (str)
+    """
+
+    length = type_length & 0x1f
+    return bytes(data[:length]).decode('latin-1').rstrip('\x00').strip()
+
+
+class SDRRecord():
+    """
+    Decoded Sensor Data Record. Sensor records (full and compact) carry the
+    sensor addressing and conversion factors; FRU and MC locator records only
+    the entity and name.
+    """
+
+    def __init__(self, record_id, record_type):
+        self.record_id = record_id
+        self.record_type = record_type
+        self.raw = b''
+        self.name = ''
+        self.owner_id = BMC_SLAVE_ADDR
+        self.owner_lun = 0
+        self.channel = 0
+        self.number = 0
+        self.entity_id = 0
+        self.entity_instance = 0
+        self.sensor_type = 0
+        self.event_type = 0
+        self.units = UNIT_NAMES[0]
+        self.analog_format = ANALOG_NONE
+        self.linearization = 0
+        self.m = 1
+        self.b = 0
+        self.b_exp = 0
+        self.r_exp = 0
+
+    @property
+    def fru_id(self):
+        """
+        FRU ID in the form ipmitool uses (e.g., 193.101)
+        """
+        return '{}.{}'.format(self.entity_id, self.entity_instance)
+
+    @property
+    def is_sensor(self):
+        return self.record_type in (SDR_FULL_SENSOR, SDR_COMPACT_SENSOR)
+
+    @property
+    def is_analog(self):
+        return (self.record_type == SDR_FULL_SENSOR
+                and self.event_type == EVENT_TYPE_THRESHOLD
+                and self.analog_format != ANALOG_NONE)
+
+    def convert(self, raw):
+        """
+        Convert a raw 8-bit reading to engineering units, as ipmitool does
+
+        Args:
+            raw (int): raw reading
+
+        Returns:
+            value (float)
+        """
+
+        if self.analog_format == ANALOG_1S_COMPLEMENT:
+            if raw & 0x80:
+                raw = (raw + 1) & 0xff
+            raw = signed(raw, 8)
+        elif self.analog_format == ANALOG_2S_COMPLEMENT:
+            raw = signed(raw, 8)
+
+        value = ((self.m * raw + self.b * math.pow(10, self.b_exp))
+                * math.pow(10, self.r_exp))
+
+        try:
+            return LINEARIZATION.get(self.linearization & 0x7f, LINEARIZATION[0])(value)
+        except (ValueError, ZeroDivisionError):
+            return float('NaN')
+
+    def raw_value(self, value):
+        """
+        Convert a value in engineering units to the nearest raw 8-bit value.
+        All 256 raw values are tried, so that it works for every
+        linearization and number format.
+
+        Args:
+            value (float): value in engineering units
+
+        Returns:
+            raw value (int)
+        """
+
+        best = None
+        best_error = None
+        for raw in range(256):
+            error = abs(self.convert(raw) - value)
+            if not math.isnan(error) and (best_error is None or error < best_error):
+                best = raw
+                best_error = error
+        return best
+
+
+def decode_sdr(data):
+    """
+    Decode the SDR record types we use
+
+    Args:
+        data (bytes): full record, including the 5 byte header
+
+    Returns:
+        SDRRecord, or None for record types that are not of interest
+    """
+
+    data = bytearray(data)
+    if len(data) < SDR_HEADER_LEN:
+        return None
+
+    record_id = data[0] | (data[1] << 8)
+    record_type = data[3]
+
+    if record_type in (SDR_FULL_SENSOR, SDR_COMPACT_SENSOR):
+        record = SDRRecord(record_id, record_type)
+        record.owner_id = data[5]
+        record.owner_lun = data[6] & 0x03
+        record.channel = data[6] >> 4
+        record.number = data[7]
+        record.entity_id = data[8]
+        # Bit 7 only says whether the instance is device-relative
+        record.entity_instance = data[9] & 0x7f
+        record.sensor_type = data[12]
+        record.event_type = data[13]
+        record.analog_format = data[20] >> 6
+        record.units = UNIT_NAMES.get(data[21], UNIT_NAMES[0])
+
+        if record_type == SDR_FULL_SENSOR:
+            record.linearization = data[23]
+            record.m = signed(data[24] | ((data[25] & 0xc0) << 2), 10)
+            record.b = signed(data[26] | ((data[27] & 0xc0) << 2), 10)
+            record.r_exp = signed(data[29] >> 4, 4)
+            record.b_exp = signed(data[29] & 0x0f, 4)
+            record.name = decode_id_string(data[47], data[48:])
+        else:
+            record.analog_format = ANALOG_NONE
+            record.name = decode_id_string(data[31], data[32:])
+        record.raw = bytes(data)
+        return record
+
+    elif record_type in (SDR_FRU_LOCATOR, SDR_MC_LOCATOR):
+        record = SDRRecord(record_id, record_type)
+        record.entity_id = data[12]
+        record.entity_instance = data[13] & 0x7f
+        record.name = decode_id_string(data[15], data[16:])
+        record.raw = bytes(data)
+        return record
+
+    return None
+
+
+def reading_status(states):
+    """
+    Convert threshold comparison bits to the status string ipmitool reports
+
+    Discrete sensors go through the same conversion in ipmitool, so a hot swap
+    sensor with its first state asserted reports 'lnc'.
+    """
+
+    for mask, status in THRESHOLD_STATUS:
+        if states & mask:
+            return status
+    return 'ok'
+
+
+def presence_ping(host, port = RMCP_PORT, timeout = 1.0):
+    """
+    Check whether an MCH is on the network with an RMCP/ASF presence ping.
+    This needs no session, so it is much cheaper than connecting.
+
+    Args:
+        host (str): MCH host name
+        port (int): RMCP port
+        timeout (float): time to wait for the pong (s)
+
+    Returns:
+        True if the MCH answered
+    """
+
+    tag = int(time.time() * 1000) & 0xfe
+    ping = (bytes([RMCP_VERSION, 0, RMCP_NO_ACK, RMCP_CLASS_ASF])
+            + struct.pack('>IBBBB', ASF_IANA, ASF_PRESENCE_PING, tag, 0, 0))
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect((host, port))
+        sock.send(ping)
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            data = bytearray(sock.recv(512))
+            if (len(data) >= 12
+                    and data[3] == RMCP_CLASS_ASF
+                    and data[8] == ASF_PRESENCE_PONG
+                    and data[9] == tag):
+                return True
+    except (OSError, socket.timeout):
+        pass
+    finally:
+        sock.close()
+    return False
+
+
+class IPMILanSession():
+    """
+    IPMI v1.5 LAN session to an MCH
+    """
+
+    def __init__(self, host, port = RMCP_PORT, username = '', password = '',
+            auth_type = 'none', timeout = 1.0, retries = 3):
+        """
+        IPMILanSession initializer
+
+        Args:
+            host (str): MCH host name or IP address
+            port (int): RMCP port
+            username (str): IPMI user name, empty for anonymous
+            password (str): IPMI password
+            auth_type (str): 'none', 'md5' or 'password'
+            timeout (float): time to wait for each response (s)
+            retries (int): number of attempts per request
+
+        Returns:
+            Nothing
+        """
+        self.host = host
+        self.port = port
+        self.username = username.encode('latin-1')[:16].ljust(16, b'\x00')
+        self.password = password.encode('latin-1')[:16].ljust(16, b'\x00')
+        self.auth_type = AUTH_TYPES[auth_type]
+        self.timeout = timeout
+        self.retries = retries
+
+        self.sock = None
+        self.session_id = 0
+        self.session_seq = 0
+        self.session_auth = AUTH_NONE
+        self.rq_seq = 0
+        self.sdr_chunk = SDR_CHUNK_SIZE
+        self.lock = threading.Lock()
+
+    def open(self):
+        """
+        Open the socket and activate an IPMI session
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        self.close()
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.connect((self.host, self.port))
+
+        # Check that the MCH accepts the requested authentication type
+        data = self.request(NETFN_APP, CMD_GET_CHANNEL_AUTH_CAP,
+                bytes([0x0e, PRIV_ADMIN]))
+        if not data[1] & (1 << self.auth_type):
+            raise IPMIError('authentication type {} not supported'.format(self.auth_type))
+
+        data = self.request(NETFN_APP, CMD_GET_SESSION_CHALLENGE,
+                bytes([self.auth_type]) + self.username)
+        temp_session_id = struct.unpack('<I', data[0:4])[0]
+        challenge = data[4:20]
+
+        # The Activate Session request is the first one that is authenticated
+        self.session_id = temp_session_id
+        self.session_auth = self.auth_type
+        initial_outbound_seq = 1
+        data = self.request(NETFN_APP, CMD_ACTIVATE_SESSION,
+                bytes([self.auth_type, PRIV_ADMIN]) + challenge
+                + struct.pack('<I', initial_outbound_seq))
+        self.session_auth = data[0]
+        self.session_id, self.session_seq = struct.unpack('<II', data[1:9])
+
+        self.request(NETFN_APP, CMD_SET_SESSION_PRIV, bytes([PRIV_ADMIN]))
+
+    def close(self):
+        """
+        Close the IPMI session and socket. Errors are ignored, as the MCH may
+        already have gone away.
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        if self.sock is not None:
+            if self.session_seq:
+                try:
+                    self.request(NETFN_APP, CMD_CLOSE_SESSION,
+                            struct.pack('<I', self.session_id))
+                except (IPMIError, socket.error):
+                    pass
+            self.sock.close()
+        self.sock = None
+        self.session_id = 0
+        self.session_seq = 0
+        self.session_auth = AUTH_NONE
+
+    def _build_message(self, rs_addr, netfn, lun, rq_addr, seq, cmd, data):
+        """
+        Build an IPMB format message with both checksums
+        """
+
+        header = bytes([rs_addr, (netfn << 2) | (lun & 0x03)])
+        body = bytes([rq_addr, (seq << 2) & 0xff, cmd]) + bytes(data)
+        return (header + bytes([checksum(header)])
+                + body + bytes([checksum(body)]))
+
+    def _auth_code(self, msg, seq):
+        """
+        Authentication code for the session header
+        """
+
+        if self.session_auth == AUTH_PASSWORD:
+            return self.password
+        elif self.session_auth == AUTH_MD5:
+            return hashlib.md5(
+                    self.password
+                    + struct.pack('<I', self.session_id)
+                    + msg
+                    + struct.pack('<I', seq)
+                    + self.password).digest()
+        return b''
+
+    def _wrap(self, msg):
+        """
+        Add the RMCP and IPMI session headers to a message
+        """
+
+        seq = self.session_seq
+        if self.session_seq:
+            self.session_seq = (self.session_seq + 1) & 0xffffffff or 1
+
+        packet = bytes([RMCP_VERSION, 0x00, RMCP_NO_ACK, RMCP_CLASS_IPMI])
+        packet += struct.pack('<BII', self.session_auth, seq, self.session_id)
+        if self.session_auth != AUTH_NONE:
+            packet += self._auth_code(msg, seq)
+        return packet + bytes([len(msg)]) + msg
+
+    @staticmethod
+    def _unwrap(packet):
+        """
+        Extract the IPMI response message from an RMCP packet
+
+        Returns:
+            (netfn, seq, cmd, cc, data), or None if this is not an IPMI
+            response message
+        """
+
+        packet = bytearray(packet)
+        if len(packet) < 14 or packet[0] != RMCP_VERSION \
+                or packet[3] != RMCP_CLASS_IPMI:
+            return None
+
+        offset = 13
+        if packet[4] != AUTH_NONE:
+            offset += 16
+        if len(packet) <= offset:
+            return None
+        length = packet[offset]
+        return IPMILanSession._parse_response(packet[offset + 1:offset + 1 + length])
+
+    @staticmethod
+    def _parse_response(msg):
+        """
+        Parse an IPMB format response message
+
+        Returns:
+            (netfn, seq, cmd, cc, data), or None if the message is truncated
+        """
+
+        if len(msg) < 8:
+            return None
+        netfn = msg[1] >> 2
+        seq = msg[4] >> 2
+        cmd = msg[5]
+        cc = msg[6]
+        return netfn, seq, cmd, cc, bytes(msg[7:-1])
+
+    def _receive(self, deadline):
+        """
+        Wait for the next response message until the deadline
+
+        Returns:
+            parsed response, or None on timeout
+        """
+
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            self.sock.settimeout(remaining)
+            try:
+                packet = self.sock.recv(1024)
+            except socket.timeout:
+                return None
+            response = self._unwrap(packet)
+            if response is not None:
+                return response
+
+    def request(self, netfn, cmd, data = b'', target = None, channel = 0, lun = 0):
+        """
+        Send a request and wait for the matching response
+
+        Args:
+            netfn (int): network function of the request
+            cmd (int): command
+            data (bytes): request data
+            target (int): IPMB address of the owning controller; requests to
+                anything other than the MCH are bridged
+            channel (int): channel used to reach the target
+            lun (int): target LUN
+
+        Returns:
+            response data (bytes), excluding the completion code
+
+        Raises:
+            IPMIError: non-zero completion code
+            IPMITimeout: no response
+        """
+
+        if self.sock is None:
+            raise IPMIError('session not open')
+
+        bridged = target is not None and target != BMC_SLAVE_ADDR
+
+        with self.lock:
+            self.rq_seq = (self.rq_seq + 1) & 0x3f
+            seq = self.rq_seq
+
+            if bridged:
+                inner = self._build_message(target, netfn, lun,
+                        BMC_SLAVE_ADDR, seq, cmd, data)
+                msg = self._build_message(BMC_SLAVE_ADDR, NETFN_APP, 0,
+                        REMOTE_SWID, seq, CMD_SEND_MESSAGE,
+                        bytes([0x40 | (channel & 0x0f)]) + inner)
+            else:
+                msg = self._build_message(BMC_SLAVE_ADDR, netfn, lun,
+                        REMOTE_SWID, seq, cmd, data)
+
+            for attempt in range(self.retries):
+                self.sock.send(self._wrap(msg))
+                deadline = time.time() + self.timeout
+
+                response = self._receive(deadline)
+                while response is not None:
+                    rsp_netfn, rsp_seq, rsp_cmd, cc, rsp_data = response
+
+                    if bridged and rsp_cmd == CMD_SEND_MESSAGE and rsp_seq == seq:
+                        if cc != CC_OK:
+                            raise IPMIError('send message failed: 0x{:02x}'.format(cc), cc)
+                        # Some MCHs return the bridged response inside the
+                        # Send Message response, others send it separately
+                        if len(rsp_data) >= 8:
+                            embedded = self._parse_response(bytearray(rsp_data))
+                            if embedded is not None:
+                                rsp_netfn, rsp_seq, rsp_cmd, cc, rsp_data = embedded
+                                return self._check(cmd, cc, rsp_data)
+                    elif rsp_cmd == cmd and rsp_netfn == netfn + 1 and rsp_seq == seq:
+                        return self._check(cmd, cc, rsp_data)
+
+                    response = self._receive(deadline)
+
+        raise IPMITimeout('no response to netfn 0x{:02x} cmd 0x{:02x} from {}'.format(
+            netfn, cmd, self.host))
+
+    @staticmethod
+    def _check(cmd, cc, data):
+        if cc != CC_OK:
+            raise IPMIError('cmd 0x{:02x} failed: 0x{:02x}'.format(cmd, cc), cc)
+        return data
+
+    def get_device_id(self):
+        """
+        Get Device ID. Used as a cheap liveness check.
+
+        Returns:
+            (device_id, firmware revision string)
+        """
+
+        data = bytearray(self.request(NETFN_APP, CMD_GET_DEVICE_ID))
+        return data[0], '{}.{:02x}'.format(data[2] & 0x7f, data[3])
+
+    def get_sdr_repository_info(self):
+        """
+        Get SDR Repository Info
+
+        Returns:
+            dict with record count and the most recent addition and erase
+            timestamps, which change whenever the repository is updated
+        """
+
+        data = bytearray(self.request(NETFN_STORAGE, CMD_GET_SDR_REPO_INFO))
+        count, free, addition, erase = struct.unpack('<HHII', bytes(data[1:13]))
+        return {
+            'version': data[0]
+            ,'count': count
+            ,'addition': addition
+            ,'erase': erase
+        }
+
+    def reserve_sdr_repository(self):
+        data = self.request(NETFN_STORAGE, CMD_RESERVE_SDR_REPO)
+        return struct.unpack('<H', data[0:2])[0]
+
+    def get_sdr(self, reservation, record_id):
+        """
+        Read one SDR in chunks the MCH can handle
+
+        Returns:
+            (next record ID, raw record bytes)
+        """
+
+        data = self.request(NETFN_STORAGE, CMD_GET_SDR,
+                struct.pack('<HHBB', reservation, record_id, 0, SDR_HEADER_LEN))
+        next_id = struct.unpack('<H', data[0:2])[0]
+        record = bytearray(data[2:])
+        length = SDR_HEADER_LEN + record[4]
+
+        while len(record) < length:
+            count = min(self.sdr_chunk, length - len(record))
+            try:
+                data = self.request(NETFN_STORAGE, CMD_GET_SDR,
+                        struct.pack('<HHBB', reservation, record_id, len(record), count))
+            except IPMIError as e:
+                if e.cc == CC_CANNOT_RETURN_BYTES and self.sdr_chunk > SDR_MIN_CHUNK_SIZE:
+                    self.sdr_chunk //= 2
+                    continue
+                raise
+            record += data[2:]
+
+        return next_id, bytes(record)
+
+    def read_sdr_repository(self):
+        """
+        Read and decode the whole SDR repository
+
+        Returns:
+            list of SDRRecord objects
+        """
+
+        records = []
+        reservation = self.reserve_sdr_repository()
+        record_id = 0
+
+        while record_id != SDR_LAST_RECORD:
+            try:
+                next_id, data = self.get_sdr(reservation, record_id)
+            except IPMIError as e:
+                if e.cc == CC_RESERVATION_CANCELLED:
+                    reservation = self.reserve_sdr_repository()
+                    continue
+                raise
+            record = decode_sdr(data)
+            if record is not None:
+                records.append(record)
+            record_id = next_id
+
+        return records
+
+    def get_sensor_reading(self, record):
+        """
+        Get Sensor Reading for an SDR sensor record
+
+        Returns:
+            (raw reading, flags, state bits)
+        """
+
+        data = bytearray(self.request(NETFN_SENSOR, CMD_GET_SENSOR_READING,
+                bytes([record.number]), target = record.owner_id,
+                channel = record.channel, lun = record.owner_lun))
+        data.extend(bytes(3 - min(len(data), 3)))
+        return data[0], data[1], data[2]
+
+    def read_sensor(self, record):
+        """
+        Read and convert one sensor
+
+        Returns:
+            (status, value) where value is a float for analog sensors, the
+            state description for module hot swap sensors, or None if the
+            reading is unavailable
+        """
+
+        status, value = self.read_sensor_raw(record)
+        if record.is_analog and value is not None:
+            value = record.convert(value)
+        return status, value
+
+    def read_sensor_raw(self, record):
+        """
+        Read one sensor, leaving analog readings unconverted so that they
+        can be converted in bulk
+
+        Returns:
+            (status, value) as for read_sensor, except that the value of an
+            analog sensor is the raw 8-bit reading (int)
+        """
+
+        raw, flags, states = self.get_sensor_reading(record)
+
+        if flags & READING_UNAVAILABLE or not flags & READING_SCANNING_ENABLED:
+            return 'ns', None
+
+        status = reading_status(states)
+
+        if record.is_analog:
+            return status, raw
+        elif record.sensor_type == SENSOR_TYPE_MODULE_HOT_SWAP:
+            for state, description in enumerate(MODULE_HOT_SWAP_STATES):
+                if states & (1 << state):
+                    return status, description
+            return status, ''
+        return status, float(states)
+
+    def get_sensor_thresholds(self, record):
+        """
+        Get Sensor Thresholds for a full sensor record
+
+        Returns:
+            dict of readable thresholds (lnc, lcr, lnr, unc, ucr, unr) in
+            engineering units
+        """
+
+        data = bytearray(self.request(NETFN_SENSOR, CMD_GET_SENSOR_THRESHOLDS,
+                bytes([record.number]), target = record.owner_id,
+                channel = record.channel, lun = record.owner_lun))
+
+        thresholds = {}
+        for bit, name in enumerate(THRESHOLD_NAMES):
+            if data[0] & (1 << bit) and len(data) > bit + 1:
+                thresholds[name] = record.convert(data[bit + 1])
+        return thresholds
+
+    def set_sensor_thresholds(self, record, thresholds):
+        """
+        Set Sensor Thresholds for a full sensor record
+
+        Args:
+            record (SDRRecord): sensor record
+            thresholds (dict): thresholds to set (lnc, lcr, lnr, unc, ucr,
+                unr) in engineering units. The others are left as they are.
+
+        Returns:
+            Nothing
+        """
+
+        data = bytearray([record.number, 0, 0, 0, 0, 0, 0, 0])
+        for bit, name in enumerate(THRESHOLD_NAMES):
+            if name in thresholds:
+                data[1] |= 1 << bit
+                data[bit + 2] = record.raw_value(thresholds[name])
+
+        self.request(NETFN_SENSOR, CMD_SET_SENSOR_THRESHOLDS, bytes(data),
+                target = record.owner_id, channel = record.channel,
+                lun = record.owner_lun)
+
+    def get_sel_time(self):
+        """
+        Get SEL Time
+
+        Returns:
+            MCH clock in seconds since 1970
+        """
+
+        data = self.request(NETFN_STORAGE, CMD_GET_SEL_TIME)
+        return struct.unpack('<I', data[0:4])[0]
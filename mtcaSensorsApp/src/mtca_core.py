@@ -0,0 +1,3314 @@
+# File: mtca_core.py
+# Date: 2017-06-15
+# Author: Wayne Lewis
+#
+# Description:
+# Get sensor information for microTCA crate using ipmitool command.
+#
+# This is the part of the crate support that doesn't need EPICS: comms with
+# the MCH, parsing, the crate model and scan scheduling. It can be imported
+# by command line tools without pyDevSup. MTCACrate.py connects it to the
+# records.
+#
+# Changes:
+# 2017-09-27 WL  Convert to Python3
+# 2017-10-19 WL  Add TimeoutExpired execption handling
+# 2017-12-22 WL  Add card rescan after crate reset
+# 2017-12-26 WL  Create utility function for calling ipmitool
+# 2017-12-27 WL  Convert to ipmitool shell
+
+import re
+import time
+import datetime
+import os
+import sys
+import socket
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
+from ipmi_lan import IPMILanSession, IPMIError, IPMITimeout, SDR_FRU_LOCATOR, decode_sdr
+from ipmi_lan import presence_ping, reading_status
+from sdr_cache import SDRCache
+from crate_poller import CratePoller
+from sensor_parser import SdrEntityParser
+from scan_scheduler import ScanScheduler
+from sdr_convert import SDRConverter
+from sensor_store import SensorStore, store_property
+from threshold_cache import ThresholdCache
+from threshold_policy import load_policy, PolicyError, THRESHOLD_NAMES, THRESHOLD_GROUPS
+from threshold_policy import THRESHOLD_DESCRIPTIONS
+from reset_sequence import ResetSequence
+from connection_supervisor import ConnectionSupervisor, Backoff
+from shell_session import ShellSession
+from comms_stats import CommsStats
+from sel_reader import SELReader, SENSOR_TYPE_MODULE_HOT_SWAP, MODULE_HOT_SWAP_EVENTS
+from sel_reader import FRU_ACTIVE_STATES
+from pet_listener import PETListener
+from broker_client import BrokerClient, BrokerError
+from response_cache import ResponseCache
+
+if os.name == 'posix' and sys.version_info[0] < 3:
+    import subproces32 as subprocess
+    from subprocess32 import check_output
+    from subprocess32 import CalledProcessError
+    from subprocess32 import TimeoutExpired
+else:
+    import subprocess
+    from subprocess import check_output
+    from subprocess import CalledProcessError
+    from subprocess import TimeoutExpired
+
+# Use this to suppress ipmitool/ipmiutil errors
+ERR_FILE = open(os.devnull, 'w')
+# Use this to report ipmitool/ipmiutil errors
+#ERR_FILE = sys.stderr
+
+SLOT_OFFSET = 96
+PICMG_SLOT_OFFSET = 4
+MCH_FRU_ID_OFFSET = 2
+
+FW_TAG = "Product Extra"
+
+HOT_SWAP_N_A = 0
+HOT_SWAP_OK = 1
+HOT_SWAP_FAULT = 2
+
+HOT_SWAP_NORMAL_STS = ['lnc', 'ok']
+HOT_SWAP_NO_VALUE_NORMAL_STS = 'lnc'
+HOT_SWAP_NORMAL_VALUE = [
+        'Module Handle Closed'
+       , 'Device Absent']
+HOT_SWAP_FAULT_VALUE = ['Quiesced']
+
+COMMS_ERROR = 0
+COMMS_OK = 1
+COMMS_NONE = 2
+
+COMMS_TIMEOUT = 5.0
+
+MIN_GOOD_IPMI_MSG_LEN = 40
+
+EPICS_ALARM_OFFSET = 0.001
+NO_ALARM_OFFSET = 0.01
+
+BUS_IDS = {
+    'pm': 10
+    ,'cu': 30
+    ,'amc': 193
+    ,'mch': 194
+}
+
+SENSOR_NAMES = {
+    '12 V PP': '12V0'
+    ,'12V PP': '12V0'
+    ,'12 V AMC': '12V0'
+    ,'+12V PSU': '12V0'
+    ,'+12V': '12V0'
+    ,'PP': '12V0'
+    ,'Base 12V': '12V0'
+    ,'+12V_1': '12V0_1'
+    ,'12VHH': '12V0_1'
+    ,'+5V PSU': '5V0'
+    ,'SMP': '5V0'
+    ,'SMPP': '5V0_1'
+    ,'3.3 V PP': '3V3'
+    ,'3.3V MP': '3V3'
+    ,'+3.3V PSU': '3V3'
+    ,'+3.3V': '3V3'
+    ,'MP': '3V3'
+    ,'Base 3.3V': '3V3'
+    ,'2.5 V': '2V5'
+    ,'2.5V': '2V5'
+    ,'Base 2.5V': '2V5'
+    ,'1.8 V': '1V8'
+    ,'1.8V': '1V8'
+    ,'Base 1.8V': '1V8'
+    ,'1.5V PSU': '1V5'
+    ,'Base 1.5V': '1V5'
+    ,'1.0V CORE': 'V_FPGA'
+    ,'1.0 V': 'V_FPGA'
+    ,'FPGA 1.2 V': 'V_FPGA'
+    ,'Current 12 V': '12V0CURRENT'
+    ,'Base Current': '12V0CURRENT'
+    ,'Current 3.3 V': '3V3CURRENT'
+    ,'Current 1.2 V': '1V2CURRENT'
+    ,'Inlet': 'TEMP_INLET'
+    ,'Temp 1 (inlet)': 'TEMP_INLET'
+    ,'DC/DC Inlet': 'TEMP_INLET'
+    ,'T PATH UPD': 'TEMP_INLET'
+    ,'Outlet': 'TEMP_OUTLET'
+    ,'Temp 2 (outlet)': 'TEMP_OUTLET'
+    ,'FPGA S6': 'TEMP_OUTLET'
+    ,'T DCDC UPD': 'TEMP_OUTLET'
+    ,'FPGA DIE': 'TEMP_FPGA'
+    ,'FPGA V5': 'TEMP_FPGA'
+    ,'Middle': 'TEMP1'
+    ,'FMC1': 'TEMP1'
+    ,'Board Temp': 'TEMP1'
+    ,'LM75 Temp': 'TEMP1'
+    ,'T COOLER UPM': 'TEMP1'
+    ,'Temp CPU': 'TEMP1'
+    ,'FPGA PCB': 'TEMP2'
+    ,'FMC2': 'TEMP2'
+    ,'CPU Temp': 'TEMP2'
+    ,'LM75 Temp2': 'TEMP2'
+    ,'T TRAFO UPM': 'TEMP2'
+    ,'Temp I/O': 'TEMP2'
+    ,'CPLD': 'TEMP3'
+    ,'Fan 1': 'FAN1'
+    ,'Fan 2': 'FAN2'
+    ,'Fan 3': 'FAN3'
+    ,'Fan 4': 'FAN4'
+    ,'Fan 5': 'FAN5'
+    ,'Fan 6': 'FAN6'
+    ,'Current(Sum)': 'I_TOTAL'
+    ,'Ch01 Current': 'I01'
+    ,'Ch02 Current': 'I02'
+    ,'Ch03 Current': 'I03'
+    ,'Ch04 Current': 'I04'
+    ,'Ch05 Current': 'I05'
+    ,'Ch06 Current': 'I06'
+    ,'Ch07 Current': 'I07'
+    ,'Ch08 Current': 'I08'
+    ,'Ch09 Current': 'I09'
+    ,'Ch10 Current': 'I10'
+    ,'Ch11 Current': 'I11'
+    ,'Ch12 Current': 'I12'
+    ,'Ch13 Current': 'I13'
+    ,'Ch14 Current': 'I14'
+    ,'Ch15 Current': 'I15'
+    ,'Ch16 Current': 'I16'
+    ,'Ejector Handle': 'HOT_SWAP'
+    ,'HotSwap': 'HOT_SWAP'
+    ,'Hot Swap': 'HOT_SWAP'
+}
+
+DIGITAL_SENSORS = [
+    'HOT_SWAP'
+]
+
+ALARMS = {
+    'Lower Critical': 'lolo'
+    ,'Lower Non-Critical': 'low'
+    ,'Upper Non-Critical': 'high'
+    ,'Upper Critical': 'hihi'
+}
+
+EGU = {
+    'Volts': 'V'
+    ,'Amps': 'A'
+    ,'degrees C': 'C'
+    ,'unspecified': ''
+    ,'RPM': 'RPM'
+}
+
+ALARM_LEVELS = {
+    'ok': 1
+    ,'lnc': 2
+    ,'unc': 2
+    ,'lcr': 3
+    ,'ucr': 3
+    ,'lnr': 4
+    ,'unr': 4
+}
+
+ALARM_STATES = [
+    'UNSET'
+    ,'NO_ALARM'
+    ,'NON_CRITICAL'
+    ,'CRITICAL'
+    ,'NON_RECOVERABLE'
+]
+
+# Alarm limits of the records of fan and power module current sensors,
+# rather than the thresholds read from the MCH, as a threshold policy (see
+# threshold_policy.py). MTCA_THRESHOLD_POLICY names a policy file to use
+# instead, normally the one the MCHs are provisioned with
+# (mtca_provision.py), so that the records match the MCH. Sensors with
+# none of the lcr, lnc, unc and ucr thresholds in the policy use the
+# thresholds read from the MCH.
+DEFAULT_THRESHOLD_POLICY = [
+    {'sensor': '.*Fan', 'thresholds': {'lcr': 500, 'lnc': 1000, 'unc': 3500, 'ucr': 4000}}
+    ,{'sensor': r'Ch[0-9][0-9] Current', 'thresholds': {'lcr': 0, 'lnc': 0, 'unc': 2.9, 'ucr': 3.0}}
+    ,{'sensor': r'Current\(Sum\)', 'thresholds': {'lcr': 0, 'lnc': 0, 'unc': 20.0, 'ucr': 25.0}}
+]
+THRESHOLD_POLICY_FILE = os.environ.get('MTCA_THRESHOLD_POLICY') or None
+
+MCH_START_TIME = datetime.datetime(1970,1,1,0,0,0)
+
+# Scan period for each class of sensor (s). Sensors are read at the
+# SCANNER record rate at most. With the shell backend a FRU is read in
+# full whenever any of its sensor classes is due.
+SCAN_PERIODS = {
+    'hot_swap': 1.0
+    ,'current': 1.0
+    ,'voltage': 5.0
+    ,'fan': 5.0
+    ,'temperature': 10.0
+}
+
+# Scan period for FRUs whose sensors are not known yet
+DEFAULT_SCAN_PERIOD = 5.0
+# Scan period for sensors in or near alarm
+ALARM_SCAN_PERIOD = 1.0
+# Longest scan period, reached by backing off FRUs that don't respond
+MAX_SCAN_PERIOD = 60.0
+# Scan period for the MCH uptime
+UPTIME_SCAN_PERIOD = 60.0
+# Fraction of the alarm range inside the non-critical thresholds that
+# counts as near alarm
+NEAR_ALARM_FRACTION = 0.05
+
+# Delays between attempts to reconnect to an MCH that is down (s), and the
+# random fraction added to or taken off each delay
+RECONNECT_MIN_DELAY = 1.0
+RECONNECT_MAX_DELAY = 60.0
+RECONNECT_JITTER = 0.2
+
+# Change in value, by engineering units, needed before sensor records are
+# processed. Changes in validity or alarm status always process them.
+DEADBANDS = {
+    'V': 0.01
+    ,'A': 0.01
+    ,'C': 0.5
+    ,'RPM': 10.0
+}
+
+# Number of readings kept in the history of each sensor, and the window for
+# the history min/max/mean (s)
+HISTORY_LENGTH = int(os.environ.get('MTCA_HISTORY_LENGTH', 120))
+HISTORY_WINDOW = float(os.environ.get('MTCA_HISTORY_WINDOW', 60.0))
+
+# SDR repository contents by MCH, shared by all crates
+SDR_CACHE = SDRCache()
+
+# Alarm thresholds by card type, shared by all crates. With
+# MTCA_THRESHOLD_REFRESH set, cached thresholds are read again from the MCH
+# in the background, THRESHOLD_REFRESH_PER_SCAN sensors per scan.
+THRESHOLD_CACHE = ThresholdCache()
+THRESHOLD_REFRESH = os.environ.get('MTCA_THRESHOLD_REFRESH', '0') not in ('', '0')
+THRESHOLD_REFRESH_PER_SCAN = 1
+
+# Alarm limits set by policy (see DEFAULT_THRESHOLD_POLICY)
+try:
+    THRESHOLD_POLICY = load_policy(THRESHOLD_POLICY_FILE, BUS_IDS, DEFAULT_THRESHOLD_POLICY)
+except PolicyError as e:
+    print('mtca_core: caught PolicyError {}, using the default policy'.format(e))
+    THRESHOLD_POLICY = load_policy(None, BUS_IDS, DEFAULT_THRESHOLD_POLICY)
+
+# Crate key used by records that don't name a crate
+DEFAULT_CRATE = ''
+
+# All crates handled by this IOC, keyed by crate key
+_crates = {}
+
+# Engine for scanning crates concurrently, with a worker for the scans of
+# each crate and another for its PET reads
+_poller = CratePoller()
+
+# Listener for PETs from the MCHs (see PET_PORT), and the addresses of the
+# crate hosts, by host name
+_pet_listener = None
+_host_addresses = {}
+
+IPMITOOL_SHELL_PROMPT = 'ipmitool>'
+# Time allowed for a command sent to the ipmitool shell, unless it is listed
+# in COMMAND_TIMEOUTS
+SHELL_TIMEOUT = 10.0
+
+# Time allowed for each kind of command (s), keyed by its first two words.
+# Reading the sensors of a card is quick, while 'fru print' reads the whole
+# FRU inventory. Commands not listed are allowed SHELL_TIMEOUT in the shell,
+# or COMMS_TIMEOUT when run directly.
+COMMAND_TIMEOUTS = {
+    ('sdr', 'entity'): 3.0
+    ,('sdr', 'info'): 3.0
+    ,('sdr', 'elist'): 20.0
+    ,('sensor', 'get'): 3.0
+    ,('sensor', 'thresh'): 5.0
+    ,('sel', 'time'): 3.0
+    ,('mc', 'info'): 3.0
+    ,('fru', 'print'): 30.0
+    ,('picmg', 'activate'): 5.0
+    ,('picmg', 'deactivate'): 5.0
+    ,('raw', '0x0a'): 3.0
+    ,('sel', 'get'): 3.0
+}
+
+# Time for which responses are kept (s), by the first two words of the
+# command, so that requests made close together by different parts of the
+# IOC are answered by one command. The MCH firmware version in 'fru print'
+# only changes with a reset. Commands not listed are always sent, but
+# identical commands in flight at the same time are still sent only once.
+# MTCA_RESPONSE_CACHE=0 stops responses being kept.
+RESPONSE_TTLS = {
+    ('fru', 'print'): 4 * 3600.0
+    ,('sdr', 'elist'): 10.0
+    ,('sdr', 'info'): 1.0
+    ,('sdr', 'entity'): 0.5
+    ,('sensor', 'get'): 5.0
+}
+RESPONSE_CACHE = os.environ.get('MTCA_RESPONSE_CACHE', '1') not in ('', '0')
+RESPONSE_CACHE_SIZE = 256
+
+# Commands that change the MCH or cards, after which no kept response is
+# used
+CHANGING_COMMANDS = [
+    ('picmg', 'activate')
+    ,('picmg', 'deactivate')
+    ,('sensor', 'thresh')
+    ,('mc', 'reset')
+    ,('raw', '0x06')
+]
+
+# Attempts to read the FRU list before populate_fru_list gives up until the
+# next scan, and the wait after an empty response (s)
+FRU_LIST_ATTEMPTS = 5
+FRU_LIST_RETRY_DELAY = 1.0
+
+# Command timeouts in a row after which the session is taken to be lost and
+# is started again. A single slow card only fails its own read.
+MAX_COMMAND_TIMEOUTS = 3
+
+# Response of MCH_comms.read_frus for a FRU that wasn't read, because a
+# command ahead of it in the same batch timed out. The FRU keeps its state
+# and is read on the next scan.
+NOT_READ = 'not read'
+
+# Communications backends, selected with the IPMI_BACKEND environment variable.
+# The broker backend sends ipmitool commands through the MCH connection
+# broker (see broker_client.py), which shares one shell session per MCH
+# between all the IOCs and tools on the host.
+BACKEND_SHELL = 'shell'
+BACKEND_LAN = 'lan'
+BACKEND_BROKER = 'broker'
+
+# Age of broker responses that will do for sensor reads (s), so that IOCs
+# reading the same crate share reads. Set with MTCA_BROKER_MAX_AGE.
+BROKER_MAX_AGE = float(os.environ.get('MTCA_BROKER_MAX_AGE', 0.5))
+
+# Sensor reading modes, selected with the IPMI_READINGS environment variable.
+# Raw readings are converted in bulk from the SDR conversion factors, and
+# need the LAN backend.
+READINGS_TEXT = 'text'
+READINGS_RAW = 'raw'
+
+# 'sdr info' fields that change when the SDR repository is updated
+SDR_STAMP_FIELDS = [
+    'Most recent Addition'
+    ,'Most recent Erase'
+]
+
+# New events are read from the MCH System Event Log on every scan, unless
+# MTCA_SEL_EVENTS is 0. The most recent EVENT_LOG_LENGTH events are kept
+# for the event log records.
+SEL_EVENTS = os.environ.get('MTCA_SEL_EVENTS', '1') not in ('', '0')
+EVENT_LOG_LENGTH = 100
+
+# UDP port on which to listen for Platform Event Traps (PET) from the MCHs,
+# set with MTCA_PET_PORT. The card named in each trap is read again at
+# once, without waiting for the next scan. Off unless the port is set.
+PET_PORT = int(os.environ.get('MTCA_PET_PORT', 0) or 0)
+
+# Sensor details printed by 'ipmitool sel get' after the event itself, used
+# to find the card and sensor that logged an event
+SEL_ENTITY_PATTERN = re.compile(r'^\s*Entity ID\s*:\s*(\d+\.\d+)', re.MULTILINE)
+SEL_SENSOR_PATTERN = re.compile(r'^\s*Sensor ID\s*:\s*(.*?)\s*\(0x[0-9a-fA-F]+\)', re.MULTILINE)
+
+# Map ipmitool threshold names to EPICS alarm fields
+THRESHOLD_ALARMS = {
+    'lcr': 'lolo'
+    ,'lnc': 'low'
+    ,'unc': 'high'
+    ,'ucr': 'hihi'
+}
+
+def command_timeout(ipmitool_cmd, default):
+    """
+    Get the time allowed for an ipmitool command (see COMMAND_TIMEOUTS)
+
+    Args:
+        ipmitool_cmd (list): command words
+        default (float): time allowed for commands that are not listed
+
+    Returns:
+        timeout (float)
+    """
+
+    return COMMAND_TIMEOUTS.get(tuple(str(e) for e in ipmitool_cmd[:2]), default)
+
+def threshold_commands(name, thresholds):
+    """
+    Get the ipmitool commands that set the thresholds of a sensor. A whole
+    group of lower or upper thresholds is set in one command, so that the
+    MCH never sees them out of order.
+
+    Args:
+        name (str): sensor name
+        thresholds (dict): thresholds to set, keyed by ipmitool threshold
+            name
+
+    Returns:
+        list of commands
+    """
+
+    ipmitool_cmds = []
+    remaining = dict(thresholds)
+    for group, names in THRESHOLD_GROUPS.items():
+        if all(threshold in remaining for threshold in names):
+            ipmitool_cmds.append(['sensor', 'thresh', '"'+name+'"', group]
+                    + [remaining.pop(threshold) for threshold in names])
+    for threshold in THRESHOLD_NAMES:
+        if threshold in remaining:
+            ipmitool_cmds.append(['sensor', 'thresh', '"'+name+'"',
+                    threshold, remaining[threshold]])
+    return ipmitool_cmds
+
+def response_ttl(ipmitool_cmd):
+    """
+    Get the time for which a response to an ipmitool command is kept (see
+    RESPONSE_TTLS)
+
+    Args:
+        ipmitool_cmd (list): command words
+
+    Returns:
+        time (float), 0 if it isn't kept
+    """
+
+    if not RESPONSE_CACHE:
+        return 0.0
+    return RESPONSE_TTLS.get(tuple(str(e) for e in ipmitool_cmd[:2]), 0.0)
+
+def scan_class(sensor_type):
+    """
+    Get the scan class of a sensor type (see SCAN_PERIODS)
+
+    Args:
+        sensor_type (str): sensor type (see SENSOR_NAMES)
+
+    Returns:
+        scan class (str)
+    """
+
+    if sensor_type in DIGITAL_SENSORS:
+        return 'hot_swap'
+    elif 'CURRENT' in sensor_type or re.match(r'I(\d\d|_TOTAL)$', sensor_type):
+        return 'current'
+    elif sensor_type.startswith('TEMP'):
+        return 'temperature'
+    elif sensor_type.startswith('FAN'):
+        return 'fan'
+    return 'voltage'
+
+SCAN_CLASSES = dict(
+        (sensor_type, scan_class(sensor_type))
+        for sensor_type in set(SENSOR_NAMES.values()))
+
+def hot_swap_value(status, val):
+    """
+    Convert the status and value of a hot swap sensor to HOT_SWAP_OK or
+    HOT_SWAP_FAULT
+
+    Args:
+        status (str): sensor status
+        val (str): sensor value
+
+    Returns:
+        hot swap state
+    """
+
+    if status in HOT_SWAP_NORMAL_STS:
+        if status == HOT_SWAP_NO_VALUE_NORMAL_STS:
+            return HOT_SWAP_OK
+        elif val in HOT_SWAP_NORMAL_VALUE:
+            return HOT_SWAP_OK
+    return HOT_SWAP_FAULT
+
+# Parser for 'sdr entity' responses, with all lookup tables prebuilt
+SDR_ENTITY_PARSER = SdrEntityParser(
+        SENSOR_NAMES,
+        EGU,
+        ALARM_LEVELS,
+        DIGITAL_SENSORS,
+        hot_swap_value,
+        IPMITOOL_SHELL_PROMPT)
+
+class ScanList():
+    """
+    Stand-in for the pyDevSup I/O Intr scan list, for using crates outside
+    an IOC. Calls the functions added to it when interrupted.
+    """
+
+    def __init__(self):
+        self.callbacks = []
+
+    def add(self, callback):
+        """
+        Add a function to call on each interrupt
+
+        Args:
+            callback (callable): function with no arguments
+
+        Returns:
+            function that removes the callback again
+        """
+
+        self.callbacks.append(callback)
+        return lambda: self.callbacks.remove(callback)
+
+    def interrupt(self, reason = None, mask = None):
+        """
+        Call every function added to the list
+
+        Args:
+            reason, mask: ignored
+
+        Returns:
+            Nothing
+        """
+
+        for callback in list(self.callbacks):
+            callback()
+
+def get_crate(key = DEFAULT_CRATE, scan_list_class = ScanList):
+    """
+    Find existing crate object, or create new one.
+
+    Args:
+        key (str, optional): crate key. Omit for the default crate of a
+            single crate IOC.
+        scan_list_class (class, optional): scan list type for a new crate
+            (IOScanListBlock in the IOC)
+
+    Returns:
+        MTCACrate object
+    """
+
+    if key not in _crates:
+        _crates[key] = MTCACrate(key, scan_list_class)
+        _poller.register(key, ('alert', key))
+        start_pet_listener()
+    return _crates[key]
+
+def poll(crate):
+    """
+    Schedule a scan of a crate on the multi-crate scan engine, unless one
+    is already in progress
+
+    Args:
+        crate (MTCACrate): crate to scan
+
+    Returns:
+        True if the scan was scheduled
+    """
+
+    return _poller.submit(crate.key, crate.scan)
+
+def start_pet_listener():
+    """
+    Start listening for PETs, if a port is set (see PET_PORT)
+
+    Args:
+        None
+
+    Returns:
+        Nothing
+    """
+
+    global _pet_listener
+
+    if PET_PORT and _pet_listener is None:
+        _pet_listener = PETListener(PET_PORT, dispatch_alert)
+        _pet_listener.start()
+
+def dispatch_alert(alert):
+    """
+    Pass a PET to the crate whose MCH sent it. Called in the listener
+    thread.
+
+    Args:
+        alert (PETAlert): trap received
+
+    Returns:
+        Nothing
+    """
+
+    crates = list(_crates.values())
+    for crate in crates:
+        if crate.host is None:
+            continue
+        if crate.host not in _host_addresses:
+            try:
+                _host_addresses[crate.host] = socket.gethostbyname(crate.host)
+            except OSError:
+                # Try again on the next trap
+                continue
+        if _host_addresses[crate.host] == alert.agent:
+            crate.handle_alert(alert)
+            return
+
+    # An IOC with one crate takes every trap, as the MCH may be behind
+    # address translation
+    if len(crates) == 1:
+        crates[0].handle_alert(alert)
+
+# Connect to crate
+def connect(key = DEFAULT_CRATE):
+    """
+    Connect to crate on startup
+    """
+
+    crate = get_crate(key)
+    if not crate.mch_comms.ipmitool_shell_connect():
+        # Keep trying in the background
+        crate.supervisor.wake()
+
+# Cleanup on IOC exit
+def stop():
+    """
+    Cleanup on IOC exit
+    """
+
+    # Stop listening for traps and scheduling crate scans
+    if _pet_listener is not None:
+        _pet_listener.stop()
+    _poller.stop()
+
+    for crate in _crates.values():
+        # Stop reconnecting, and any resets in progress
+        crate.supervisor.stop()
+        crate.reset_sequence.cancel()
+        for sequence in crate.fru_resets.values():
+            sequence.cancel()
+
+        for mch_comms in crate.comms_pool:
+            # Close the IPMI LAN session
+            try:
+                if mch_comms.lan:
+                    mch_comms.lan.close()
+            except:
+                pass
+            # Stop the ipmitool shell process and its reader thread
+            try:
+                mch_comms.close_session()
+            except:
+                pass
+
+class MCH_comms():
+    """
+    Class to handle all comms to MCH
+    """
+
+    def __init__(self, _crate, primary = True):
+        # ipmitool shell session, replaced on each connection
+        self.session = None
+        self.crate = _crate
+        # Timing statistics and kept responses, shared by all sessions to
+        # the crate
+        self.stats = _crate.stats
+        self.responses = _crate.responses
+        # The primary session owns the crate state (FRU list, reset and
+        # rescan flags). Extra sessions in the crate's pool only read.
+        self.primary = primary
+        self.connected = False
+        self.comms_timeout = False
+        # Command timeouts in a row (see MAX_COMMAND_TIMEOUTS)
+        self.timeouts = 0
+        self.comms_lock = threading.Lock()
+        # Stops two threads connecting at the same time
+        self.connect_lock = threading.Lock()
+
+        # Select ipmitool shell or native IPMI LAN comms
+        self.backend = os.environ.get('IPMI_BACKEND', BACKEND_SHELL)
+        self.lan = None
+        self.sdr_records = []
+        self.broker = None
+        if self.backend == BACKEND_BROKER:
+            self.broker = BrokerClient()
+
+        # Text readings formatted by ipmitool, or raw readings
+        self.readings = os.environ.get('IPMI_READINGS', READINGS_TEXT)
+        if self.readings == READINGS_RAW and self.backend != BACKEND_LAN:
+            if self.primary:
+                print('MCH_comms: raw readings need IPMI_BACKEND={}, using text readings'.format(BACKEND_LAN))
+            self.readings = READINGS_TEXT
+
+        # SDR repository cache, and the change stamp of the records in use
+        self.sdr_cache = SDR_CACHE
+        self.sdr_stamp = None
+
+        # Whether the MCH answers presence pings (see probe)
+        self.ping_answered = False
+
+    def create_ipmitool_command(self):
+        """
+        Creates common part of ipmitool command
+
+        Args:
+            None
+
+        Returns:
+            command (list): list of common command elements
+        """
+
+        # Get the path to ipmitool from the EPICS environment
+        ipmitool_path = os.environ['IPMITOOL']
+
+        # Create the IPMI tool command
+        #crate = get_crate()
+        command = []
+        command.append(os.path.join(ipmitool_path, "ipmitool"))
+        command.append("-H")
+        command.append(self.crate.host)
+        command.append("-A")
+        command.append("None")
+
+        return command
+
+    def ipmitool_shell_connect(self):
+        """
+        Make one attempt to connect to the ipmitool shell. Retries are
+        left to the crate's connection supervisor.
+
+        Args:
+            None
+        Returns:
+            True if connected
+        """
+
+        with self.connect_lock:
+            if self.connected:
+                return True
+            start = time.time()
+            if not self.connect_once():
+                return False
+            if self.primary:
+                self.stats.add_connect(time.time() - start)
+            return True
+
+    def connect_once(self):
+        """
+        Connection attempt for ipmitool_shell_connect, made with the
+        connect lock held
+
+        Args:
+            None
+        Returns:
+            True if connected
+        """
+
+        if self.connected:
+            return True
+
+        # The broker has its own ipmitool
+        if self.primary and self.backend != BACKEND_BROKER:
+            self.crate.print_ipmitool_version()
+
+        # Check if we have comms to the crate
+        try:
+            if self.backend == BACKEND_LAN:
+                self.lan_connect()
+            else:
+                self.call_ipmitool_direct_command(["mc", "info"])
+        except CalledProcessError:
+            return False
+        except TimeoutExpired:
+            # OK to get timeout exceptions here. Be silent.
+            return False
+        except (IPMIError, OSError):
+            # LAN backend equivalent of the above. Be silent.
+            return False
+        except TypeError as e:
+            print('ipmitool_shell_connect: caught TypeError {}'.format(e))
+            return False
+
+        if self.backend in (BACKEND_LAN, BACKEND_BROKER):
+            # The LAN session is opened by the connection check, and the
+            # broker has the shell, so there is no shell process or reader
+            # thread to start
+            self.connected = True
+            return True
+
+        command = self.create_ipmitool_command()
+        command.append("shell")
+
+        # Set inputrc path to limit libreadline's history-size and prevent
+        # ever-growing memory usage
+        ipmi_env = os.environ.copy()
+        ipmi_env['INPUTRC'] = os.path.join(ipmi_env['TOP'], 'inputrc')
+
+        # Start a new session, with its own process and reader thread
+        self.session = ShellSession(command, ipmi_env, IPMITOOL_SHELL_PROMPT,
+                stderr = ERR_FILE)
+        self.connected = True
+        return True
+
+    def probe(self):
+        """
+        Cheap check that the MCH is reachable, made before a full
+        connection attempt. Only used once the MCH has answered a presence
+        ping, as not every MCH does.
+
+        Args:
+            None
+        Returns:
+            True if the MCH may be reachable
+        """
+
+        if presence_ping(self.crate.host):
+            self.ping_answered = True
+            return True
+        return not self.ping_answered
+
+    def lan_connect(self):
+        """
+        Open a native IPMI LAN session and read the SDR repository
+
+        Args:
+            None
+        Returns:
+            Nothing
+        """
+
+        if self.lan:
+            self.lan.close()
+        # Matches the '-A None' used for ipmitool
+        self.lan = IPMILanSession(self.crate.host)
+        self.lan.open()
+        self.lan_read_sdr()
+
+    def lan_read_sdr(self):
+        """
+        Load the SDR records from the cache if the MCH repository has not
+        changed since they were saved, otherwise read and cache them.
+        A user-requested rescan always reads the repository.
+
+        Args:
+            None
+        Returns:
+            Nothing
+        """
+
+        stamp = self.get_sdr_stamp()
+
+        entry = None
+        if not self.crate.fru_rescan or not self.primary:
+            entry = self.sdr_cache.load(self.crate.host, stamp)
+
+        if entry is not None:
+            records = [decode_sdr(bytes.fromhex(sdr)) for sdr in entry['sdrs']]
+            self.sdr_records = [record for record in records if record is not None]
+        else:
+            print('lan_read_sdr: reading SDR repository')
+            self.sdr_records = self.lan.read_sdr_repository()
+            self.sdr_cache.save(
+                    self.crate.host,
+                    stamp,
+                    fru_list = self.get_fru_list(),
+                    sdrs = [record.raw for record in self.sdr_records])
+
+        self.sdr_stamp = stamp
+
+    def get_sdr_stamp(self):
+        """
+        Get the SDR repository change stamp, made from the most recent
+        addition and erase timestamps
+
+        Args:
+            None
+        Returns:
+            stamp (str), or None if it could not be read
+        """
+
+        if self.backend == BACKEND_LAN:
+            info = self.lan.get_sdr_repository_info()
+            return '{}:{}'.format(info['addition'], info['erase'])
+
+        try:
+            result = self.call_ipmitool_direct_command(["sdr", "info"]).decode('ascii')
+        except (CalledProcessError, TimeoutExpired):
+            return None
+
+        stamp = []
+        for line in result.splitlines():
+            try:
+                description, value = [x.strip() for x in line.split(':', 1)]
+                if description in SDR_STAMP_FIELDS:
+                    stamp.append(value)
+            except ValueError:
+                # Traps lines that cannot be split. Be silent.
+                pass
+
+        if len(stamp) == len(SDR_STAMP_FIELDS):
+            return ':'.join(stamp)
+        return None
+
+    def sdr_changed(self):
+        """
+        Check whether the MCH SDR repository has changed since the records
+        were read (LAN backend). This is a single cheap request, so it can
+        be done every scan.
+
+        Args:
+            None
+        Returns:
+            True if the repository has changed
+        """
+
+        try:
+            return self.get_sdr_stamp() != self.sdr_stamp
+        except (IPMIError, AttributeError, OSError) as e:
+            print('sdr_changed: caught {}'.format(e))
+            return False
+
+    def ipmitool_shell_reconnect(self):
+        """
+        Make sure that a reconnection is under way if the connection is
+        down. Doesn't wait for it: callers check self.connected and skip
+        their I/O if it is still down.
+
+        Args:
+            None
+        Returns:
+            Nothing
+        """
+
+        # Drop a session whose shell has exited
+        if (self.connected
+                and self.session is not None
+                and not self.session.alive()):
+            print('ipmitool_shell_reconnect: ipmitool shell session {} has exited'.format(self.session.generation))
+            self.ipmitool_shell_disconnect()
+
+        if self.connected:
+            return
+
+        if not self.primary:
+            # Extra sessions connect on demand while the main one is up
+            if self.crate.mch_comms.connected and self.ipmitool_shell_connect():
+                self.comms_timeout = False
+            return
+
+        self.crate.supervisor.wake()
+
+    def ipmitool_shell_disconnect(self):
+        """
+        Disconnect and tear down all communications structures
+
+        Args:
+            None
+        Returns:
+            Nothing
+        """
+
+        # Only do this if we are already connected
+        if self.connected:
+            if self.primary:
+                # Reset the FRU init status to stop attempts to read the sensors
+                # This will force a reconnect once comms comes back
+                self.crate.frus_inited = False
+                self.crate.crate_resetting = True
+
+            if self.backend == BACKEND_LAN:
+                print('ipmitool_shell_disconnect: closing IPMI LAN session')
+                if self.lan:
+                    self.lan.close()
+                self.lan = None
+                self.connected = False
+                return
+
+            self.close_session()
+
+    def close_session(self):
+        """
+        Stop the ipmitool shell session, its process and reader thread
+
+        Args:
+            None
+        Returns:
+            Nothing
+        """
+
+        session = self.session
+        self.session = None
+        self.connected = False
+        if session is not None:
+            print('close_session: closing ipmitool shell session {}'.format(session.generation))
+            session.close()
+        if self.broker is not None:
+            self.broker.close()
+
+    def call_ipmitool_command(self, ipmitool_cmd):
+        """
+        Generate and call ipmitool command using ipmitool shell connection
+
+        Args:
+            ipmitool_cmd: command string
+
+        Returns:
+            result (string): response of ipmitool to command
+        """
+
+        words = tuple(str(e) for e in ipmitool_cmd)
+        if words[:2] in CHANGING_COMMANDS:
+            self.responses.invalidate()
+        return self.responses.call(words, response_ttl(words),
+                lambda: self.call_ipmitool_batch([ipmitool_cmd])[0])
+
+    def call_ipmitool_batch(self, ipmitool_cmds):
+        """
+        Call several ipmitool commands in one exchange with the ipmitool
+        shell. All commands are written at once, and the output is split
+        back into responses at the prompt that precedes each command echo.
+
+        Args:
+            ipmitool_cmds: list of commands
+
+        Returns:
+            results (list of strings): response of ipmitool to each command,
+            empty for a command that timed out or wasn't run
+        """
+
+        if len(ipmitool_cmds) == 0:
+            return []
+
+        if self.backend == BACKEND_LAN:
+            # Commands without a native implementation fall back to
+            # a one-off ipmitool process
+            self.ipmitool_shell_reconnect()
+            if not self.connected:
+                return [""] * len(ipmitool_cmds)
+            return [self.call_ipmitool_direct_command(
+                    [str(e).strip('"') for e in ipmitool_cmd]).decode('ascii')
+                    for ipmitool_cmd in ipmitool_cmds]
+
+        results, timed_out = self.shell_batch(ipmitool_cmds)
+        return ["" if result is None else result for result in results]
+
+    def shell_batch(self, ipmitool_cmds):
+        """
+        Send several commands to the ipmitool shell, allowing each one its
+        own time (see COMMAND_TIMEOUTS). If a command times out, the
+        responses to the commands before it are still returned.
+
+        Args:
+            ipmitool_cmds: list of commands
+
+        Returns:
+            (results, timed_out): response of ipmitool to each command, or
+            None for the commands after one that timed out, and the index
+            of the command that timed out, or None
+        """
+
+        if len(ipmitool_cmds) == 0:
+            return [], None
+
+        if self.backend == BACKEND_BROKER:
+            self.ipmitool_shell_reconnect()
+            if not self.connected:
+                return [""] * len(ipmitool_cmds), None
+            return self.broker_batch(ipmitool_cmds, BROKER_MAX_AGE)
+
+        commands = ''
+        for ipmitool_cmd in ipmitool_cmds:
+            commands += ' '.join(str(e) for e in ipmitool_cmd)
+            commands += '\n'
+
+        # Only one request can use the shell at a time
+        if not self.comms_lock.acquire(False):
+            return [""] * len(ipmitool_cmds), None
+
+        try:
+            self.ipmitool_shell_reconnect()
+            if not self.connected:
+                return [""] * len(ipmitool_cmds), None
+            sent = time.time()
+            # Write a null command to get an 'ipmitool>' response
+            # that indicates the end of the data transmission. Wait until
+            # the reader thread has seen one prompt per command echo, plus
+            # the final prompt, or until the time allowed for all of the
+            # commands has run out.
+            result_list, times, complete = self.session.send(
+                    commands + '\n',
+                    len(ipmitool_cmds) + 1,
+                    sum(command_timeout(ipmitool_cmd, SHELL_TIMEOUT)
+                        for ipmitool_cmd in ipmitool_cmds))
+        except (BrokenPipeError, AttributeError) as e:
+            # The shell has gone, or the session was closed under us
+            print('shell_batch: caught {}'.format(e))
+            self.ipmitool_shell_disconnect()
+            self.ipmitool_shell_reconnect()
+            return [""] * len(ipmitool_cmds), None
+        finally:
+            self.comms_lock.release()
+
+        #print('shell_batch: {}'.format(result_list))
+        # Split the output at each prompt. Drop the first line of each
+        # response, as it is an echo of the command.
+        results = []
+        for line in result_list:
+            if IPMITOOL_SHELL_PROMPT in line:
+                results.append([])
+            elif results:
+                results[-1].append(line)
+        results = ["".join(lines) for lines in results]
+
+        # Each command ends when the prompt for the next one arrives
+        for index, result in enumerate(results[:len(times) - 1]):
+            start = sent if index == 0 else times[index]
+            self.stats.add_command(ipmitool_cmds[index],
+                    times[index + 1] - start, len(result))
+
+        if complete:
+            self.timeouts = 0
+            results = results[:len(ipmitool_cmds)]
+            results.extend([""] * (len(ipmitool_cmds) - len(results)))
+            return results, None
+
+        if len(results) == 0:
+            # The shell hasn't started on these commands. It is still busy
+            # with a command that timed out earlier.
+            self.command_timed_out(ipmitool_cmds[0])
+            return [None] * len(ipmitool_cmds), None
+
+        # The last response started is from the command that timed out.
+        # The ones before it are complete, and the ones after it weren't run.
+        timed_out = len(results) - 1
+        results = results[:timed_out]
+        results.append("")
+        results.extend([None] * (len(ipmitool_cmds) - len(results)))
+        self.command_timed_out(ipmitool_cmds[timed_out])
+        return results, timed_out
+
+    def broker_batch(self, ipmitool_cmds, max_age):
+        """
+        Send several commands to the MCH through the connection broker,
+        with the same results as shell_batch
+
+        Args:
+            ipmitool_cmds: list of commands
+            max_age (float): age of cached responses that will do (s)
+
+        Returns:
+            (results, timed_out): as shell_batch
+        """
+
+        start = time.time()
+        try:
+            results, timed_out, connected = self.broker.call(
+                    self.crate.host,
+                    ipmitool_cmds,
+                    max_age,
+                    sum(command_timeout(ipmitool_cmd, SHELL_TIMEOUT)
+                        for ipmitool_cmd in ipmitool_cmds))
+        except BrokerError as e:
+            print('broker_batch: caught {}'.format(e))
+            connected = False
+        if not connected:
+            # The broker, or its session to the MCH, is down
+            self.ipmitool_shell_disconnect()
+            self.ipmitool_shell_reconnect()
+            return [""] * len(ipmitool_cmds), None
+
+        # Only the time for the whole batch is known
+        elapsed = (time.time() - start) / len(ipmitool_cmds)
+        for ipmitool_cmd, result in zip(ipmitool_cmds, results):
+            if result is not None:
+                self.stats.add_command(ipmitool_cmd, elapsed, len(result))
+
+        if timed_out is None:
+            self.timeouts = 0
+        else:
+            self.command_timed_out(ipmitool_cmds[timed_out])
+        return results, timed_out
+
+    def command_timed_out(self, ipmitool_cmd):
+        """
+        Count a command timeout. The session is only taken to be lost, and
+        started again, after MAX_COMMAND_TIMEOUTS in a row, so that one
+        slow card doesn't cost a reconnection and rescan of the crate.
+
+        Args:
+            ipmitool_cmd: command that timed out
+
+        Returns:
+            Nothing
+        """
+
+        self.timeouts += 1
+        self.stats.add_timeout()
+        print('command_timed_out: {} timed out ({} in a row)'.format(
+                ' '.join(str(e) for e in ipmitool_cmd), self.timeouts))
+        if self.timeouts < MAX_COMMAND_TIMEOUTS:
+            return
+        self.timeouts = 0
+
+        # Assume that we have lost the connection, so disconnect to allow
+        # a future reconnection, unless someone had already set the crate
+        # resetting flag
+        if not self.primary:
+            self.ipmitool_shell_disconnect()
+            self.comms_timeout = True
+        elif not self.crate.crate_resetting:
+            self.crate.frus_inited = False
+            self.crate.read_sensors()
+            self.crate.interrupt()
+            self.ipmitool_shell_disconnect()
+            self.comms_timeout = True
+
+    def call_ipmitool_direct_command(self, ipmitool_cmd):
+        """
+        Generate and call ipmitool command bypassing the shell
+
+        Args:
+            ipmitool_cmd: command string
+
+        Returns:
+            result (string): response of ipmitool to command
+        """
+
+        words = tuple(str(e) for e in ipmitool_cmd)
+        if words[:2] in CHANGING_COMMANDS:
+            self.responses.invalidate()
+        return self.responses.call(('direct',) + words, response_ttl(words),
+                lambda: self.run_direct_command(ipmitool_cmd))
+
+    def run_direct_command(self, ipmitool_cmd):
+        """
+        Run an ipmitool command bypassing the shell, for
+        call_ipmitool_direct_command
+
+        Args:
+            ipmitool_cmd: command string
+
+        Returns:
+            result (string): response of ipmitool to command
+        """
+
+        if self.backend == BACKEND_BROKER:
+            # Always sent: the response may be cached in the SDR cache
+            results, timed_out = self.broker_batch([ipmitool_cmd], 0.0)
+            if timed_out is not None:
+                raise TimeoutExpired(ipmitool_cmd, command_timeout(ipmitool_cmd, COMMS_TIMEOUT))
+            if len(results[0]) == 0:
+                raise CalledProcessError(1, ipmitool_cmd)
+            return results[0].encode('ascii')
+
+        command = self.create_ipmitool_command()
+        command.extend(ipmitool_cmd)
+
+        start = time.time()
+        result = subprocess.check_output(command,
+                timeout = command_timeout(ipmitool_cmd, COMMS_TIMEOUT))
+        self.stats.add_command(ipmitool_cmd, time.time() - start, len(result))
+        return result
+
+    def read_frus(self, frus, sensor_names = None):
+        """
+        Read the sensors of several FRUs
+
+        Args:
+            frus (list): FRU objects
+            sensor_names (list, optional): for each FRU, the set of sensor
+                names to read, or None to read all. The shell backend
+                always reads all sensors.
+
+        Returns:
+            list of responses, one per FRU, to pass to FRU.update_sensors.
+            A FRU whose command timed out gets an empty response, and the
+            FRUs after it in the batch get NOT_READ.
+        """
+
+        if sensor_names is None or self.backend != BACKEND_LAN:
+            sensor_names = [None] * len(frus)
+
+        # Responses are kept by FRU and the sensors read. A FRU listed twice
+        # is read once.
+        requests = collections.OrderedDict()
+        keys = []
+        for fru, names in zip(frus, sensor_names):
+            key = ('sdr', 'entity', fru.id,
+                    None if names is None else tuple(sorted(names)))
+            requests[key] = (fru, names)
+            keys.append(key)
+
+        def fetch(keys):
+            return self.fetch_frus(
+                    [requests[key][0] for key in keys],
+                    [requests[key][1] for key in keys])
+
+        responses = dict(zip(requests.keys(), self.responses.call_many(
+                list(requests.keys()),
+                response_ttl(['sdr', 'entity']),
+                fetch,
+                keep = lambda response: response is not NOT_READ and bool(response))))
+        return [responses[key] for key in keys]
+
+    def fetch_frus(self, frus, sensor_names):
+        """
+        Read the sensors of several FRUs from the MCH, for read_frus
+
+        Args:
+            frus (list): FRU objects
+            sensor_names (list): for each FRU, the set of sensor names to
+                read, or None to read all
+
+        Returns:
+            list of responses, one per FRU, as read_frus
+        """
+
+        if self.backend == BACKEND_LAN:
+            if self.readings == READINGS_RAW:
+                return [self.read_entity_raw(fru.id, names)
+                        for fru, names in zip(frus, sensor_names)]
+            return [self.read_entity_sensors(fru.id, names)
+                    for fru, names in zip(frus, sensor_names)]
+
+        results, timed_out = self.shell_batch([["sdr", "entity", fru.id] for fru in frus])
+        return [NOT_READ if result is None else result for result in results]
+
+    def get_fru_list(self):
+        """
+        Get the FRU list from the SDR repository (LAN backend)
+
+        Args:
+            None
+
+        Returns:
+            list of (name, FRU ID) tuples
+        """
+
+        return [(record.name, record.fru_id)
+                for record in self.sdr_records
+                if record.record_type == SDR_FRU_LOCATOR]
+
+    def find_sensor_records(self, fru_id):
+        """
+        Get the SDR sensor records belonging to a FRU (LAN backend)
+
+        Args:
+            fru_id (str): FRU ID (e.g., 193.101)
+
+        Returns:
+            list of SDRRecord objects
+        """
+
+        return [record for record in self.sdr_records
+                if record.is_sensor and record.fru_id == fru_id]
+
+    def read_entity_sensors(self, fru_id, sensor_names = None):
+        """
+        Read all sensors for a FRU over the LAN session. This is the
+        native equivalent of 'sdr entity <fru_id>'.
+
+        Args:
+            fru_id (str): FRU ID (e.g., 193.101)
+            sensor_names (set, optional): only read these sensors
+
+        Returns:
+            list of (sensor name, status, value) tuples, with the value
+            formatted as ipmitool prints it, or None if the FRU could not
+            be read
+        """
+
+        self.ipmitool_shell_reconnect()
+        if not self.connected:
+            return None
+
+        records = self.find_sensor_records(fru_id)
+        if not records:
+            return None
+        if sensor_names is not None:
+            records = [record for record in records if record.name in sensor_names]
+
+        # Allow the FRU as long as an 'sdr entity' command
+        start = time.time()
+        deadline = start + command_timeout(['sdr', 'entity'], COMMS_TIMEOUT)
+        readings = []
+        try:
+            for record in records:
+                if time.time() > deadline:
+                    raise IPMITimeout('no response from {} in time'.format(fru_id))
+                status, value = self.lan.read_sensor(record)
+                if value is None:
+                    val = 'No Reading'
+                elif isinstance(value, float):
+                    val = '{:.2f} {}'.format(value, record.units)
+                else:
+                    val = value
+                readings.append((record.name, status, val))
+        except IPMITimeout:
+            # Only this FRU is marked bad, unless it keeps happening
+            self.command_timed_out(['sdr', 'entity', fru_id])
+            return None
+        except IPMIError:
+            # Empty slots and pulled cards don't respond to bridged requests
+            return None
+        except (AttributeError, OSError) as e:
+            print('read_entity_sensors: caught {}'.format(e))
+            self.ipmitool_shell_disconnect()
+            return None
+
+        self.timeouts = 0
+        self.stats.add_command(['sdr', 'entity'], time.time() - start)
+        return readings
+
+    def read_entity_raw(self, fru_id, sensor_names = None):
+        """
+        Read all sensors for a FRU over the LAN session, without
+        converting the analog readings
+
+        Args:
+            fru_id (str): FRU ID (e.g., 193.101)
+            sensor_names (set, optional): only read these sensors
+
+        Returns:
+            list of (SDR record, status, value) tuples, where the value is
+            the raw reading of an analog sensor, or None if the FRU could
+            not be read
+        """
+
+        self.ipmitool_shell_reconnect()
+        if not self.connected:
+            return None
+
+        records = self.find_sensor_records(fru_id)
+        if not records:
+            return None
+        if sensor_names is not None:
+            records = [record for record in records if record.name in sensor_names]
+
+        # Allow the FRU as long as an 'sdr entity' command
+        start = time.time()
+        deadline = start + command_timeout(['sdr', 'entity'], COMMS_TIMEOUT)
+        readings = []
+        try:
+            for record in records:
+                if time.time() > deadline:
+                    raise IPMITimeout('no response from {} in time'.format(fru_id))
+                status, value = self.lan.read_sensor_raw(record)
+                readings.append((record, status, value))
+        except IPMITimeout:
+            # Only this FRU is marked bad, unless it keeps happening
+            self.command_timed_out(['sdr', 'entity', fru_id])
+            return None
+        except IPMIError:
+            # Empty slots and pulled cards don't respond to bridged requests
+            return None
+        except (AttributeError, OSError) as e:
+            print('read_entity_raw: caught {}'.format(e))
+            self.ipmitool_shell_disconnect()
+            return None
+
+        self.timeouts = 0
+        self.stats.add_command(['sdr', 'entity'], time.time() - start)
+        return readings
+
+    def read_entity_thresholds(self, fru_id, name):
+        """
+        Read the thresholds for a named sensor on a FRU (LAN backend)
+
+        Args:
+            fru_id (str): FRU ID (e.g., 193.101)
+            name (str): sensor name
+
+        Returns:
+            dict of threshold values keyed by ipmitool threshold name
+        """
+
+        record = self.find_sensor_record(fru_id, name)
+        if record is not None:
+            try:
+                return self.lan.get_sensor_thresholds(record)
+            except (IPMIError, AttributeError, OSError) as e:
+                print('read_entity_thresholds: caught {}'.format(e))
+        return {}
+
+    def find_sensor_record(self, fru_id, name):
+        """
+        Find the SDR record of a named threshold sensor on a FRU (LAN
+        backend)
+
+        Args:
+            fru_id (str): FRU ID (e.g., 193.101)
+            name (str): sensor name
+
+        Returns:
+            SDRRecord, or None if there isn't one
+        """
+
+        for record in self.find_sensor_records(fru_id):
+            if record.name == name and record.is_analog:
+                return record
+        return None
+
+    def list_sensors(self, fru_id):
+        """
+        Get the names of all the sensors on a FRU, including those that
+        aren't read for the records
+
+        Args:
+            fru_id (str): FRU ID (e.g., 193.101)
+
+        Returns:
+            list of sensor names
+        """
+
+        if self.backend == BACKEND_LAN:
+            self.ipmitool_shell_reconnect()
+            return [record.name for record in self.find_sensor_records(fru_id)
+                    if record.is_analog]
+
+        names = []
+        for line in self.call_ipmitool_command(['sdr', 'entity', fru_id]).splitlines():
+            fields = line.split('|')
+            if len(fields) == 5 and fields[0].strip() not in names:
+                names.append(fields[0].strip())
+        return names
+
+    def read_sensor_thresholds(self, sensors):
+        """
+        Read the thresholds of several sensors, in one exchange with the
+        ipmitool shell
+
+        ipmitool finds sensors by name, and takes the first with the name
+        in the SDR repository. A sensor that shares its name with one on
+        another FRU ahead of it can only be reached with the LAN backend.
+
+        Args:
+            sensors (list): (FRU ID, sensor name) tuples
+
+        Returns:
+            list with a dict of thresholds keyed by ipmitool threshold name
+            for each sensor, or None if it couldn't be read. Thresholds
+            that aren't readable are left out.
+        """
+
+        if self.backend == BACKEND_LAN:
+            self.ipmitool_shell_reconnect()
+            results = []
+            for fru_id, name in sensors:
+                record = self.find_sensor_record(fru_id, name)
+                try:
+                    results.append(None if record is None
+                            else self.lan.get_sensor_thresholds(record))
+                except (IPMIError, AttributeError, OSError) as e:
+                    print('read_sensor_thresholds: caught {}'.format(e))
+                    results.append(None)
+            return results
+
+        responses, timed_out = self.shell_batch(
+                [['sensor', 'get', '"'+name+'"'] for fru_id, name in sensors])
+        results = []
+        for (fru_id, name), response in zip(sensors, responses):
+            entity = SEL_ENTITY_PATTERN.search(response or '')
+            if entity is None or entity.group(1) != fru_id:
+                # Not read, or another FRU's sensor of the same name
+                results.append(None)
+                continue
+            thresholds = {}
+            for line in response.splitlines():
+                try:
+                    description, value = [x.strip() for x in line.split(':', 1)]
+                    if description in THRESHOLD_DESCRIPTIONS.keys():
+                        thresholds[THRESHOLD_DESCRIPTIONS[description]] = float(value)
+                except ValueError:
+                    # Lines that cannot be split, and thresholds that
+                    # are not set ('na')
+                    pass
+            results.append(thresholds)
+        return results
+
+    def set_sensor_thresholds(self, changes):
+        """
+        Set the thresholds of several sensors, in one exchange with the
+        ipmitool shell. The MCH may round the values, or refuse them
+        without saying so, so read them back to check.
+
+        Args:
+            changes (list): (FRU ID, sensor name, thresholds) tuples, with
+                the thresholds to set keyed by ipmitool threshold name
+
+        Returns:
+            list of True for each sensor whose thresholds were sent, or
+            False
+        """
+
+        # Thresholds are part of the kept 'sensor get' responses
+        self.responses.invalidate()
+
+        if self.backend == BACKEND_LAN:
+            self.ipmitool_shell_reconnect()
+            results = []
+            for fru_id, name, thresholds in changes:
+                record = self.find_sensor_record(fru_id, name)
+                try:
+                    if record is None:
+                        raise IPMIError('no sensor {} on {}'.format(name, fru_id))
+                    self.lan.set_sensor_thresholds(record, thresholds)
+                    results.append(True)
+                except (IPMIError, AttributeError, OSError) as e:
+                    print('set_sensor_thresholds: caught {}'.format(e))
+                    results.append(False)
+            return results
+
+        ipmitool_cmds = []
+        counts = []
+        for fru_id, name, thresholds in changes:
+            sensor_cmds = threshold_commands(name, thresholds)
+            ipmitool_cmds.extend(sensor_cmds)
+            counts.append(len(sensor_cmds))
+
+        responses, timed_out = self.shell_batch(ipmitool_cmds)
+        results = []
+        start = 0
+        for count in counts:
+            # ipmitool reports each threshold it sets, and errors on stderr
+            results.append(all(responses[start:start + count]))
+            start += count
+        return results
+
+    def get_sel_time(self):
+        """
+        Get the MCH clock (LAN backend)
+
+        Args:
+            None
+
+        Returns:
+            seconds since 1970
+        """
+
+        self.ipmitool_shell_reconnect()
+        if not self.connected:
+            raise IPMIError('not connected')
+        return self.lan.get_sel_time()
+
+    def raw_request(self, netfn, cmd, data):
+        """
+        Send a raw IPMI request to the MCH, natively over the LAN session
+        or as an ipmitool 'raw' command
+
+        Args:
+            netfn (int): network function
+            cmd (int): command
+            data (bytes): request data
+
+        Returns:
+            response data (bytes), excluding the completion code
+
+        Raises:
+            IPMIError: no response, or an error from the MCH
+        """
+
+        ipmitool_cmd = ['raw'] + ['0x{:02x}'.format(b) for b in bytes([netfn, cmd]) + bytes(data)]
+
+        if self.backend == BACKEND_LAN:
+            self.ipmitool_shell_reconnect()
+            if not self.connected:
+                raise IPMIError('not connected')
+            start = time.time()
+            try:
+                response = self.lan.request(netfn, cmd, data)
+            except IPMITimeout:
+                self.command_timed_out(ipmitool_cmd)
+                raise
+            except (AttributeError, OSError) as e:
+                raise IPMIError(str(e))
+            self.timeouts = 0
+            self.stats.add_command(ipmitool_cmd, time.time() - start, len(response))
+            return response
+
+        # ipmitool prints the response as hex bytes. Errors go to stderr,
+        # so leave an empty response.
+        result = self.call_ipmitool_command(ipmitool_cmd)
+        try:
+            response = bytes(int(b, 16) for b in result.split())
+        except ValueError:
+            response = b''
+        if len(response) == 0:
+            raise IPMIError('no response to {}'.format(' '.join(ipmitool_cmd)))
+        return response
+
+    def find_event_sensor(self, event):
+        """
+        Find the sensor that logged a SEL event
+
+        Args:
+            event (SELEvent): event
+
+        Returns:
+            (FRU ID, sensor name), or None if the sensor isn't known
+        """
+
+        if self.backend == BACKEND_LAN:
+            for record in self.sdr_records:
+                if (record.is_sensor
+                        and (record.owner_id, record.owner_lun, record.number) == event.sensor_key):
+                    return record.fru_id, record.name
+            return None
+
+        # ipmitool looks up the sensor of the event in its SDR cache
+        result = self.call_ipmitool_command(["sel", "get", '0x{:04x}'.format(event.record_id)])
+        entity = SEL_ENTITY_PATTERN.search(result)
+        sensor = SEL_SENSOR_PATTERN.search(result)
+        if entity is None or sensor is None:
+            return None
+        return entity.group(1), sensor.group(1)
+
+    def get_ipmitool_version(self):
+            # Print ipmitool information
+            ipmitool_path = os.environ['IPMITOOL']
+            command = []
+            command.append(os.path.join(ipmitool_path, "ipmitool"))
+            command.append("-V")
+
+            return check_output(
+                    command,
+                    stderr=ERR_FILE,
+                    timeout=COMMS_TIMEOUT).decode('ascii')
+
+
+class Sensor():
+    """
+    Sensor information. The numeric state is held in the crate's
+    SensorStore; this is a view onto one row of it.
+    """
+
+    __slots__ = ('store', 'index', 'name', 'egu')
+
+    value = store_property('value', float)
+    lolo = store_property('lolo', float)
+    low = store_property('low', float)
+    high = store_property('high', float)
+    hihi = store_property('hihi', float)
+    alarm_values_read = store_property('alarm_values_read', bool)
+    alarms_valid = store_property('alarms_valid', bool)
+    valid = store_property('valid', bool)
+    # Alarm level reported by the MCH for this sensor
+    alarm_level = store_property('alarm_level', int)
+    # Last value passed to the records, and the change needed before
+    # the records are processed again
+    published_value = store_property('published_value', float)
+    deadband = store_property('deadband', float)
+
+    def __init__(self, name, store, index):
+        self.store = store
+        self.index = index
+        self.name = name
+        self.egu = ''
+
+    def set_value(self, value, alarm_level):
+        """
+        Store a new reading
+
+        Args:
+            value (float): sensor value
+            alarm_level (int): alarm level reported by the MCH
+
+        Returns:
+            True if the records for this sensor need to be processed
+        """
+
+        changed = (not self.valid
+                or alarm_level != self.alarm_level
+                or not abs(value - self.published_value) <= self.deadband)
+
+        self.value = value
+        self.valid = True
+        self.alarm_level = alarm_level
+        if changed:
+            self.published_value = value
+        return changed
+
+    def thresholds(self):
+        """
+        Get the alarm thresholds, to check whether they have changed
+
+        Args:
+            None
+
+        Returns:
+            (lolo, low, high, hihi, alarms_valid)
+        """
+
+        return (self.lolo, self.low, self.high, self.hihi, self.alarms_valid)
+
+    def near_alarm(self):
+        """
+        Check whether the sensor is in alarm, or within NEAR_ALARM_FRACTION
+        of the alarm range of a non-critical threshold
+
+        Args:
+            None
+
+        Returns:
+            True if the sensor is in or near alarm
+        """
+
+        if not self.valid:
+            return False
+        if self.alarm_level > ALARM_STATES.index('NO_ALARM'):
+            return True
+        if not self.alarms_valid:
+            return False
+
+        margin = NEAR_ALARM_FRACTION * abs(self.hihi - self.lolo)
+        if self.high != 0 and self.value >= self.high - margin:
+            return True
+        if self.low != 0 and self.value <= self.low + margin:
+            return True
+        return False
+
+class FRU():
+    """
+    FRU information
+    """
+
+    def __init__(self, id = None, name = None, slot = None, bus = None, crate = None):
+        """
+        FRU class initializer
+
+        Args:
+            id (str): FRU ID (e.g., 193.101)
+            name (str): card name
+            slot(int): slot number
+            bus(int): MTCA bus number
+            crate(obj): reference to crate object
+
+        Returns:
+            Nothing
+        """
+        self.id = id
+        self.name = name
+        self.slot  = slot
+        self.bus  = bus
+        self.crate = crate
+        self.mch_comms = self.crate.mch_comms
+        self.comms_ok = False
+        self.alarm_level = ALARM_STATES.index('UNSET')
+
+        # Dictionary for storing sensor values
+        self.sensors = {}
+
+    def __str__(self):
+        """
+        FRU class printout
+
+        Args:
+            None
+
+        Returns:
+            String representation of FRU
+        """
+        return "ID: {}, Name: {}".format(self.id, self.name)
+
+    def read_sensors(self):
+        """
+        Read the sensors for this AMC Slot
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        if not self.crate.crate_resetting:
+            self.update_sensors(self.crate.read_frus([self])[0])
+
+    def update_sensors(self, response):
+        """
+        Update the sensors for this AMC Slot from a response read by
+        MCH_comms.read_frus, possibly on another session of the pool
+
+        Args:
+            response: 'sdr entity' response (shell backend), or list of
+                sensor readings (LAN backend, see MTCACrate.read_frus), or
+                NOT_READ
+
+        Returns:
+            Nothing
+        """
+
+        if response is NOT_READ:
+            return
+
+        if not self.crate.crate_resetting:
+            try:
+                if self.mch_comms.backend == BACKEND_LAN:
+                    readings = response
+                    if readings is None:
+                        pass
+                    elif self.mch_comms.readings == READINGS_RAW:
+                        readings = SDR_ENTITY_PARSER.parse_values(readings)
+                    else:
+                        readings = SDR_ENTITY_PARSER.parse_readings(readings)
+                else:
+                    readings = self.parse_sdr_entity(response)
+
+                comms_ok = self.comms_ok
+                now = time.time()
+
+                if readings is None:
+                    self.comms_ok = False
+                    max_alarm_level = ALARM_STATES.index('NON_RECOVERABLE')
+                else:
+                    self.comms_ok = True
+
+                    for reading in readings:
+                        if reading.value is None:
+                            # Assume that this is due to the card being pulled
+                            self.comms_ok = False
+                            self.set_sensors_invalid()
+                            continue
+
+                        sensor_type = SDR_ENTITY_PARSER.types[reading.type_index]
+
+                        # Check if we have already created this sensor
+                        sensor = self.sensors.get(sensor_type)
+                        if sensor is None:
+                            sensor = Sensor(
+                                    SDR_ENTITY_PARSER.names[reading.name_index],
+                                    self.crate.sensor_store,
+                                    self.crate.sensor_store.add(
+                                        (self.bus, self.slot, sensor_type)))
+                            # Get the simplified engineering units
+                            sensor.egu = SDR_ENTITY_PARSER.egus[reading.egu_index]
+                            sensor.deadband = DEADBANDS.get(sensor.egu, 0.0)
+                            self.sensors[sensor_type] = sensor
+
+                        # Store the value and alarm status reported by the
+                        # device, and flag the records if it has changed
+                        if sensor.set_value(reading.value, reading.alarm_level):
+                            self.crate.dirty_sensors.add((self.bus, self.slot, sensor_type))
+                        self.crate.sensor_store.add_reading(sensor.index, reading.value, now)
+
+                        # Set the alarm thresholds if we haven't already
+                        if not sensor.alarm_values_read:
+                            self.set_alarms(sensor.name)
+                            sensor.alarm_values_read = True
+
+
+                    # Do the card overall status evaluation. Only some of
+                    # the sensors may have been read, so use the latest
+                    # status of all of them.
+                    if self.comms_ok:
+                        max_alarm_level = ALARM_STATES.index('NO_ALARM')
+                        for sensor in self.sensors.values():
+                            if sensor.valid and sensor.alarm_level > max_alarm_level:
+                                max_alarm_level = sensor.alarm_level
+                    else:
+                        max_alarm_level = ALARM_STATES.index('NON_RECOVERABLE')
+
+                self.alarm_level = max_alarm_level
+
+                # The records show the comms status as well
+                if self.comms_ok != comms_ok:
+                    for sensor_type in self.sensors.keys():
+                        self.crate.dirty_sensors.add((self.bus, self.slot, sensor_type))
+
+            except TimeoutExpired as e:
+                print("update_sensors: caught TimeoutExpired exception: {}".format(e))
+                self.comms_ok = False
+
+    def due_sensors(self, scheduler, now):
+        """
+        Find the sensors of this FRU that are due to be read
+
+        Args:
+            scheduler (ScanScheduler): crate scan scheduler
+            now (float): current time
+
+        Returns:
+            None to read all sensors, a set of sensor names to read some of
+            them, or an empty set if nothing is due
+        """
+
+        # Read everything until we know which sensors the FRU has
+        if len(self.sensors) == 0:
+            return None if scheduler.due(self.id, now) else set()
+
+        names = set()
+        for sensor_type, sensor in self.sensors.items():
+            if scheduler.due((self.id, SCAN_CLASSES[sensor_type]), now):
+                names.add(sensor.name)
+        if len(names) == len(self.sensors):
+            return None
+        return names
+
+    def schedule(self, scheduler, sensor_names, now):
+        """
+        Set the next read time for the sensors that have just been read.
+        Sensor classes with a sensor in or near alarm are read at
+        ALARM_SCAN_PERIOD. Failed reads back off.
+
+        Args:
+            scheduler (ScanScheduler): crate scan scheduler
+            sensor_names (set): names of the sensors read, or None for all
+            now (float): current time
+
+        Returns:
+            Nothing
+        """
+
+        if len(self.sensors) == 0:
+            scheduler.schedule(self.id, DEFAULT_SCAN_PERIOD, self.comms_ok, now)
+            return
+
+        periods = {}
+        for sensor_type, sensor in self.sensors.items():
+            if sensor_names is None or sensor.name in sensor_names:
+                scan_class = SCAN_CLASSES[sensor_type]
+                period = SCAN_PERIODS[scan_class]
+                if sensor.near_alarm():
+                    period = ALARM_SCAN_PERIOD
+                periods[scan_class] = min(period, periods.get(scan_class, period))
+
+        for scan_class, period in periods.items():
+            scheduler.schedule((self.id, scan_class), period, self.comms_ok, now)
+
+    def parse_sdr_entity(self, result):
+        """
+        Parse the ipmitool 'sdr entity' response
+
+        Args:
+            result (str): response of ipmitool
+
+        Returns:
+            list of SensorReading tuples, or None if the response indicates
+            a comms failure
+        """
+
+        # Check if we got a good response from ipmitool
+        # First test checks for an unplugged card
+        # Second test checks for MCH comms failure
+        if len(result) < MIN_GOOD_IPMI_MSG_LEN \
+            or result.find('Error') >= 0:
+            return None
+
+        return SDR_ENTITY_PARSER.parse(result)
+
+    def set_sensors_invalid(self):
+        """
+        Set the status of sensors for this AMC Slot to invalid
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        for sensor_name in self.sensors.keys():
+            if self.sensors[sensor_name].valid:
+                self.crate.dirty_sensors.add((self.bus, self.slot, sensor_name))
+            self.sensors[sensor_name].valid = False
+
+    def set_alarms(self, name):
+        """
+        Function to set alarm setpoints in AI records
+
+        Args:
+            name: sensor name
+
+        Returns:
+            Nothing
+        """
+        # Sensors covered by the threshold policy
+        alarms = {}
+        for threshold, value in THRESHOLD_POLICY.thresholds(self.bus, self.name, name).items():
+            if threshold in THRESHOLD_ALARMS.keys():
+                alarms[THRESHOLD_ALARMS[threshold]] = value
+        if alarms:
+            self.apply_thresholds(name, alarms)
+        # All other sensors. Use the thresholds cached for this type of
+        # card if there are any, and only read them from the MCH otherwise.
+        else:
+            thresholds = THRESHOLD_CACHE.get(self.name, name)
+            if thresholds is None:
+                thresholds = self.read_thresholds(name)
+                if thresholds:
+                    THRESHOLD_CACHE.put(self.name, name, thresholds)
+            elif THRESHOLD_REFRESH:
+                self.crate.stale_thresholds.append(((self.bus, self.slot), name))
+            self.apply_thresholds(name, thresholds)
+
+    def read_thresholds(self, name):
+        """
+        Read the alarm thresholds of a sensor from the MCH
+
+        Args:
+            name: sensor name
+
+        Returns:
+            dict of thresholds keyed by alarm field (lolo, low, high, hihi)
+        """
+
+        alarms = {}
+
+        # Read natively over the LAN session
+        if self.mch_comms.backend == BACKEND_LAN:
+            thresholds = self.mch_comms.read_entity_thresholds(self.id, name)
+            for threshold in thresholds.keys():
+                if threshold in THRESHOLD_ALARMS.keys():
+                    alarms[THRESHOLD_ALARMS[threshold]] = thresholds[threshold]
+            return alarms
+
+        result = ""
+        try:
+            result = self.mch_comms.call_ipmitool_command(["sensor", "get", '"'+name+'"'])
+        except CalledProcessError as e:
+            # This traps any errors thrown by the call to ipmitool.
+            # This occurs if all alarm thresholds are not set.
+            # See Jira issue DIAG-23
+            # https://jira.frib.msu.edu/projects/DIAG/issues/DIAG-23
+            # Be silent
+            print("set_alarms: caught CalledProcessError exception: {}".format(e))
+            pass
+        except TimeoutExpired as e:
+            print("set_alarms: caught TimeoutExpired exception: {}".format(e))
+
+        for line in result.splitlines():
+            try:
+                description, value = [x.strip() for x in line.split(':',1)]
+                if description in ALARMS.keys():
+                    alarms[ALARMS[description]] = float(value)
+            except ValueError:
+                # Traps lines that cannot be split. Be silent.
+                pass
+
+        return alarms
+
+    def apply_thresholds(self, name, thresholds):
+        """
+        Set the alarm thresholds of a sensor
+
+        Args:
+            name: sensor name
+            thresholds (dict): thresholds keyed by alarm field
+
+        Returns:
+            Nothing
+        """
+
+        sensor = self.sensors[SENSOR_NAMES[name]]
+        for alarm_level in thresholds.keys():
+            setattr(sensor, alarm_level, thresholds[alarm_level])
+            sensor.alarms_valid = True
+
+    def refresh_thresholds(self, name):
+        """
+        Read the alarm thresholds of a sensor again, and update the cache
+        and the sensor if they have changed
+
+        Args:
+            name: sensor name
+
+        Returns:
+            Nothing
+        """
+
+        thresholds = self.read_thresholds(name)
+        if thresholds and thresholds != THRESHOLD_CACHE.get(self.name, name):
+            THRESHOLD_CACHE.put(self.name, name, thresholds)
+            self.apply_thresholds(name, thresholds)
+            self.crate.dirty_sensors.add((self.bus, self.slot, SENSOR_NAMES[name]))
+
+    def apply_event(self, event, sensor_type):
+        """
+        Update the card state from a SEL event straight away, and read the
+        affected sensors again at this scan to confirm it
+
+        Args:
+            event (SELEvent): event logged by the card
+            sensor_type (str): type of the sensor that logged it (see
+                SENSOR_NAMES), or None if it isn't one we read
+
+        Returns:
+            Nothing
+        """
+
+        # Readings taken before the event are out of date
+        self.crate.forget_responses(self.id)
+
+        fru_state = event.fru_state
+        if fru_state is not None:
+            if fru_state not in FRU_ACTIVE_STATES and self.comms_ok:
+                # The card has been pulled or shut down
+                self.comms_ok = False
+                self.alarm_level = ALARM_STATES.index('NON_RECOVERABLE')
+                for sensor_name in self.sensors.keys():
+                    self.crate.dirty_sensors.add((self.bus, self.slot, sensor_name))
+                self.set_sensors_invalid()
+            self.crate.scheduler.reset(self.id)
+            for scan_class in set(SCAN_CLASSES[t] for t in self.sensors.keys()):
+                self.crate.scheduler.reset((self.id, scan_class))
+            return
+
+        sensor = self.sensors.get(sensor_type)
+        if sensor is None:
+            self.crate.scheduler.reset(self.id)
+            return
+
+        value = sensor.value
+        alarm_level = sensor.alarm_level
+        if event.sensor_type == SENSOR_TYPE_MODULE_HOT_SWAP:
+            if event.asserted and event.offset < len(MODULE_HOT_SWAP_EVENTS):
+                # As if the sensor had been read in its new state
+                status = reading_status(1 << event.offset)
+                value = float(hot_swap_value(status, MODULE_HOT_SWAP_EVENTS[event.offset]))
+                alarm_level = SDR_ENTITY_PARSER.sensor_alarm_levels(sensor.name).get(status, 0)
+        elif event.threshold is not None:
+            level = ALARM_LEVELS[event.threshold]
+            if event.asserted:
+                alarm_level = max(alarm_level, level)
+            else:
+                alarm_level = max(min(alarm_level, level - 1), ALARM_STATES.index('NO_ALARM'))
+
+        if sensor.valid and sensor.set_value(value, alarm_level):
+            self.crate.dirty_sensors.add((self.bus, self.slot, sensor_type))
+            if self.comms_ok:
+                self.alarm_level = max([ALARM_STATES.index('NO_ALARM')]
+                        + [s.alarm_level for s in self.sensors.values() if s.valid])
+        self.crate.scheduler.reset((self.id, SCAN_CLASSES[sensor_type]))
+
+    def reset(self):
+        """
+        Start a reset of the AMC card in the background
+
+        Args:
+            None
+
+        Returns:
+            True if the reset was started
+        """
+
+        # TODO: Add a resetting status here to allow other reads to wait
+        # See DIAG-68.
+
+        sequence = self.crate.fru_reset_sequence((self.bus, self.slot))
+        return sequence.start([
+            ('DEACTIVATING', self.deactivate)
+            # Wait for the card to shut down
+            ,('WAITING', lambda: sequence.wait(2.0))
+            ,('ACTIVATING', self.activate)
+        ])
+
+    def deactivate(self):
+        """
+        Deactivate the card
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        try:
+            result = self.mch_comms.call_ipmitool_command(["picmg", "deactivate", (str(self.slot + PICMG_SLOT_OFFSET))])
+        except CalledProcessError:
+            pass
+        except TimeoutExpired as e:
+            print("reset: caught TimeoutExpired exception: {}".format(e))
+
+    def activate(self):
+        """
+        Activate the card, and read it at the next scan
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        try:
+            result = self.mch_comms.call_ipmitool_command(["picmg", "activate", str(self.slot + PICMG_SLOT_OFFSET)])
+        except CalledProcessError:
+            pass
+        except TimeoutExpired as e:
+            print("reset: caught TimeoutExpired exception: {}".format(e))
+
+        self.crate.scheduler.reset(self.id)
+
+class MTCACrate():
+    """
+    Class for holding microTCA crate information, including AMC Slot list
+    """
+
+    def __init__(self, key = DEFAULT_CRATE, scan_list_class = ScanList):
+        """
+        Initializer for MTCACrate object.
+
+        Args:
+            key (str, optional): crate key used to route records
+            scan_list_class (class, optional): type of the I/O Intr scan
+                lists
+
+        Returns:
+            Nothing
+        """
+
+        self.key = key
+        self.scan_list_class = scan_list_class
+        self.host = None
+        self.user = None
+        self.password = None
+
+        # Initialize dictionaries of FRUs
+        self.frus = {}
+        self.frus_inited = False
+
+        # Initialize dictionaries for MCH firmware
+        self.mch_fw_ver = {}
+        self.mch_fw_date = {}
+
+        # Store IOC process start time
+        self.ioc_start_time = datetime.datetime.now()
+
+        # Create scan list for I/O Intr records
+        self.scan_list = scan_list_class()
+
+        # Scan lists for sensor value records, keyed by (bus, slot, sensor),
+        # and the sensors whose records need processing
+        self.sensor_scan_lists = {}
+        self.dirty_sensors = set()
+
+        # State of every sensor in the crate
+        self.sensor_store = SensorStore(
+                alarm_level = ALARM_STATES.index('UNSET'),
+                history_length = HISTORY_LENGTH)
+
+        # Sensors using cached thresholds that are still to be read again,
+        # as ((bus, slot), sensor name)
+        self.stale_thresholds = []
+
+        # Flag to indicate whether crate is being reset
+        self.crate_resetting = False
+
+        # Background crate reset, and card resets keyed by (bus, slot)
+        self.reset_sequence = ResetSequence(
+                'crate {}'.format(key) if key else 'crate',
+                on_change = self.scan_list.interrupt)
+        self.fru_resets = {}
+
+        # Flag to indicate if the crate is being rescanned
+        self.fru_rescan = False
+
+        # Per FRU and sensor class scan scheduling
+        self.scheduler = ScanScheduler(MAX_SCAN_PERIOD)
+
+        # Comms and scan timing statistics, and MCH responses kept for all
+        # sessions to the crate
+        self.stats = CommsStats()
+        self.responses = ResponseCache(RESPONSE_CACHE_SIZE)
+
+        # Create link for all comms
+        self.mch_comms = MCH_comms(self)
+
+        # Pool of sessions to the MCH for reading FRUs in parallel. The
+        # first one is the main link above.
+        self.comms_pool = [self.mch_comms]
+        for session in range(1, int(os.environ.get('IPMI_SESSIONS', 1))):
+            self.comms_pool.append(MCH_comms(self, primary = False))
+        self.comms_executor = None
+
+        # Bulk conversion of raw readings, built from the SDR repository
+        self.sdr_converter = None
+
+        # New System Event Log records, and the card and sensor that logged
+        # each, keyed by SELEvent.sensor_key
+        self.sel_reader = SELReader(self.mch_comms.raw_request)
+        self.sel_failed = False
+        self.event_sensors = {}
+        # Most recent events, as text, and the scan list for their records
+        self.event_log = collections.deque(maxlen = EVENT_LOG_LENGTH)
+        self.event_count = 0
+        self.event_scan_list = scan_list_class()
+        self.new_events = False
+
+        # Cards named in PETs, still to be read, and the number of PETs
+        # received. Only one scan or PET read talks to the MCH at a time.
+        self.alert_frus = set()
+        self.alert_lock = threading.Lock()
+        self.alert_count = 0
+        self.scan_lock = threading.Lock()
+
+        # Reconnection to the MCH in the background
+        self.supervisor = ConnectionSupervisor(
+                'crate {}'.format(key) if key else 'crate',
+                connected = lambda: self.mch_comms.connected,
+                probe = self.mch_comms.probe,
+                connect = self.mch_comms.ipmitool_shell_connect,
+                on_connect = self.connection_up,
+                paused = self.connection_paused,
+                on_change = self.scan_list.interrupt,
+                backoff = self.reconnect_backoff())
+
+        # The ipmitool version is printed before the first connection
+        # attempt, which is made in the background, so that creating a
+        # crate never waits for a subprocess
+        self.version_printed = False
+
+    def print_ipmitool_version(self):
+        """
+        Print the ipmitool version and path, the first time this is called
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        if self.version_printed:
+            return
+        self.version_printed = True
+
+        try:
+            result = self.mch_comms.get_ipmitool_version()
+            #result = check_output(command, stderr=ERR_FILE, timeout=COMMS_TIMEOUT).decode('utf-8')
+            print(result)
+
+            ipmitool_path = os.environ['IPMITOOL']
+            print("ipmitool path = {}".format(ipmitool_path))
+        except CalledProcessError:
+            pass
+        except TimeoutExpired as e:
+            print("print_ipmitool_version: caught TimeoutExpired exception: {}".format(e))
+
+    def populate_fru_list(self, reread_thresholds = False):
+        """
+        Call MCH and get list of AMC slots
+
+        Args:
+            reread_thresholds (bool, optional): read the alarm thresholds of
+                the cards from the MCH, rather than from the threshold
+                cache, as after a crate reset. Always done for a
+                user-requested rescan.
+
+        Returns:
+            Nothing
+        """
+
+        # Clear the list each time this runs. Allows a user-requested
+        # refresh of the list, which reads everything from the MCH again.
+        if self.fru_rescan:
+            self.forget_responses()
+        self.frus_inited = False
+        self.frus = {}
+        self.scheduler.reset()
+        self.stale_thresholds = []
+        self.event_sensors = {}
+        # Cards may have gone, so update all sensor records
+        self.dirty_sensors.update(self.sensor_scan_lists.keys())
+
+        result = ""
+
+        #print('populate_fru_list: frus_inited = {}'.format(self.frus_inited))
+        #print('populate_fru_list: crate_resetting = {}'.format(self.crate_resetting))
+        #print('populate_fru_list: mch_comms.connected = {}'.format(self.mch_comms.connected))
+        if (self.host != None
+                and self.user != None
+                and self.password != None
+                and not self.crate_resetting
+                and self.mch_comms.connected):
+
+            start = time.time()
+            if self.mch_comms.backend == BACKEND_LAN:
+                # The FRU list comes from the SDR repository read on connect
+                fru_list = self.mch_comms.get_fru_list()
+                if self.mch_comms.readings == READINGS_RAW:
+                    self.sdr_converter = SDRConverter(self.mch_comms.sdr_records)
+            else:
+                # Use the cached list if the SDR repository hasn't changed
+                stamp = self.mch_comms.get_sdr_stamp()
+                entry = None
+                if not self.fru_rescan:
+                    entry = self.mch_comms.sdr_cache.load(self.host, stamp)
+                if entry is not None:
+                    result = None
+
+                # Repeat this until we get a proper reponse to the FRU list
+                attempts = 0
+                while result is not None and len(result) <= 0:
+                    if attempts == FRU_LIST_ATTEMPTS:
+                        print("populate_fru_list: no FRU list after {} attempts".format(attempts))
+                        return
+                    if attempts > 0:
+                        # Wait a short while before trying again
+                        time.sleep(FRU_LIST_RETRY_DELAY)
+                    attempts += 1
+                    try:
+                        result = self.mch_comms.call_ipmitool_direct_command(["sdr", "elist", "fru"]).decode('ascii')
+                    except CalledProcessError:
+                        pass
+                    except TimeoutExpired as e:
+                        print("populate_fru_list: caught TimeoutExpired exception: {}".format(e))
+
+                #print('populate_fru_list: result = {}'.format(result))
+
+                if entry is not None:
+                    fru_list = [tuple(fru) for fru in entry['fru_list']]
+                else:
+                    fru_list = []
+                    for line in result.splitlines():
+                        try:
+                            name, ref, status, id, desc = line.split('|')
+                            fru_list.append((name.strip(), id.strip()))
+                        except ValueError:
+                            print ("Couldn't parse {}".format(line))
+                    self.mch_comms.sdr_cache.save(self.host, stamp, fru_list = fru_list)
+
+            for name, id in fru_list:
+                try:
+                    # Get the AMC slot number
+                    bus, slot = id.split('.')
+                    bus, slot = int(bus), int(slot)
+
+                    slot -= SLOT_OFFSET
+                    if (bus, slot) not in self.frus.keys():
+                        self.frus[(bus, slot)] = FRU(
+                                name = name,
+                                id = id,
+                                slot = slot,
+                                bus = bus,
+                                crate = self)
+                except ValueError:
+                    print ("Couldn't parse {}".format(id))
+
+            # Limits may have been changed on the MCH since they were cached
+            if self.fru_rescan or reread_thresholds:
+                for name in set(fru.name for fru in self.frus.values()):
+                    THRESHOLD_CACHE.forget(name)
+
+            # The LAN backend knows the sensors of every FRU already, so
+            # give them their rows in FRU order
+            if self.mch_comms.backend == BACKEND_LAN:
+                for (bus, slot), fru in sorted(self.frus.items()):
+                    for record in self.mch_comms.find_sensor_records(fru.id):
+                        if record.name in SENSOR_NAMES.keys():
+                            self.sensor_store.add((bus, slot, SENSOR_NAMES[record.name]))
+
+            self.frus_inited = True
+            # Get the MCH firmware info
+            self.read_fw_version()
+            self.stats.add_populate(time.time() - start)
+
+    def read_sensors(self):
+        """
+        Call read all sensor values
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        #print('read_sensors: self.mch_comms.connected = {}'.format(self.mch_comms.connected))
+        #print('read_sensors: self.mch_comms.comms_timeout = {}'.format(self.mch_comms.comms_timeout))
+
+        if not self.mch_comms.connected or self.mch_comms.comms_timeout:
+            #print('read_sensors: call ipmitool_shell_reconnect')
+            self.mch_comms.ipmitool_shell_reconnect()
+
+        # Rescan only when the MCH reports a change to the SDR repository
+        if (self.frus_inited
+                and self.mch_comms.backend == BACKEND_LAN
+                and self.mch_comms.connected
+                and self.mch_comms.sdr_changed()):
+            print('read_sensors: SDR repository changed, updating card and sensor list')
+            try:
+                self.mch_comms.lan_read_sdr()
+                self.disconnect_pool()
+                self.populate_fru_list()
+            except (IPMIError, OSError) as e:
+                print('read_sensors: caught {}'.format(e))
+
+        try:
+            if self.frus_inited:
+                #print('read_sensors: call read_sensors')
+                # Only read the FRUs and sensors that are due
+                now = time.time()
+                start = now
+                self.scheduler.begin_cycle(now)
+                frus = []
+                sensor_names = []
+                for fru in self.frus.values():
+                    names = fru.due_sensors(self.scheduler, now)
+                    if names is None or len(names) > 0:
+                        frus.append(fru)
+                        sensor_names.append(names)
+
+                if self.mch_comms.backend != BACKEND_LAN:
+                    # The shell reads every sensor of a FRU
+                    sensor_names = [None] * len(frus)
+
+                responses = self.read_frus(frus, sensor_names)
+                for fru, names, response in zip(frus, sensor_names, responses):
+                    #print('read_sensors: fru = {}'.format(fru))
+                    if response is NOT_READ:
+                        # Still due, so read on the next scan
+                        continue
+                    fru.update_sensors(response)
+                    fru.schedule(self.scheduler, names, now)
+
+                self.refresh_thresholds()
+                THRESHOLD_CACHE.save()
+                self.stats.add_scan(time.time() - start, len(frus))
+            else:
+                #print('read_sensors: call set_sensors_invalid')
+                for fru in self.frus:
+                    self.frus[fru].set_sensors_invalid()
+        except KeyError as e:
+            print('read_sensors: caught KeyError {}'.format(e))
+
+    def refresh_thresholds(self):
+        """
+        Read the thresholds of the next few sensors that are using cached
+        values (see THRESHOLD_REFRESH)
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        for i in range(THRESHOLD_REFRESH_PER_SCAN):
+            if len(self.stale_thresholds) == 0:
+                return
+            fru_key, name = self.stale_thresholds.pop(0)
+            fru = self.frus.get(fru_key)
+            if fru is not None and fru.comms_ok:
+                fru.refresh_thresholds(name)
+
+    def scan(self):
+        """
+        Read all sensor values and process the I/O Intr records, or get
+        the FRU list if it hasn't been read yet
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        # A crate reset looks after the connection and card list until it
+        # is done
+        if self.reset_sequence.running():
+            return
+
+        # PET reads (see handle_alert), and the card list update after the
+        # connection supervisor reconnects, wait for the scan to finish
+        with self.scan_lock:
+            if self.mch_comms.comms_timeout:
+                print('scan: call ipmitool_shell_reconnect')
+                self.mch_comms.ipmitool_shell_reconnect()
+
+            if self.frus_inited:
+                try:
+                    # Events first, so that the sensors they affect are read
+                    # in this scan
+                    self.read_events()
+                    self.read_sensors()
+                    if self.scheduler.due('uptime'):
+                        self.read_mch_uptime()
+                        self.scheduler.schedule('uptime', UPTIME_SCAN_PERIOD)
+                    self.interrupt()
+                except AttributeError as e:
+                    # TODO: Work out why we get this exception
+                    print ("caught AttributeError: {}".format(e))
+            else:
+                self.populate_fru_list()
+
+    def read_events(self):
+        """
+        Read the events logged by the MCH since the last scan, and update
+        the cards and sensors they affect
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        if not SEL_EVENTS or self.crate_resetting or not self.mch_comms.connected:
+            return
+
+        try:
+            events = self.sel_reader.read()
+        except IPMIError as e:
+            # Only report the first of a run of failures
+            if not self.sel_failed:
+                print('read_events: caught {}'.format(e))
+            self.sel_failed = True
+            return
+        self.sel_failed = False
+
+        for event in events:
+            key = event.sensor_key
+            if key not in self.event_sensors:
+                location = self.mch_comms.find_event_sensor(event)
+                if location is None:
+                    self.log_event(event, 'sensor 0x{:02x}/0x{:02x}'.format(*key[0::2]))
+                    continue
+                self.event_sensors[key] = location
+            fru_id, name = self.event_sensors[key]
+
+            fru = None
+            for candidate in self.frus.values():
+                if candidate.id == fru_id:
+                    fru = candidate
+            if fru is None:
+                self.log_event(event, '{} {}'.format(fru_id, name))
+                continue
+            self.log_event(event, '{} {}'.format(fru.name, name))
+            fru.apply_event(event, SENSOR_NAMES.get(name))
+
+    def handle_alert(self, alert):
+        """
+        Read the card named in a PET straight away, in the background.
+        Called in the PET listener thread.
+
+        Args:
+            alert (PETAlert): trap received from the MCH
+
+        Returns:
+            Nothing
+        """
+
+        self.alert_count += 1
+        if not self.frus_inited or self.crate_resetting:
+            return
+
+        # Traps name the card by entity. Sensors on the MCH carrier may
+        # name another entity, so fall back to the sensor's card.
+        fru_id = alert.fru_id
+        if alert.sensor_key in self.event_sensors:
+            fru_id = self.event_sensors[alert.sensor_key][0]
+        fru = None
+        for candidate in self.frus.values():
+            if candidate.id in (alert.fru_id, fru_id):
+                fru = candidate
+        if fru is None:
+            # Don't know the card, so scan the whole crate now
+            poll(self)
+            return
+
+        # Make sure the card is read at the next scan, in case it can't be
+        # read before then, and not from readings taken before the trap
+        self.forget_responses(fru.id)
+        self.scheduler.reset(fru.id)
+        for scan_class in set(SCAN_CLASSES[t] for t in fru.sensors.keys()):
+            self.scheduler.reset((fru.id, scan_class))
+
+        with self.alert_lock:
+            self.alert_frus.add(fru)
+        _poller.submit(('alert', self.key), self.read_alerts)
+
+    def read_alerts(self):
+        """
+        Read the cards named in PETs, until there are none left
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        while True:
+            with self.alert_lock:
+                frus, self.alert_frus = self.alert_frus, set()
+            if len(frus) == 0:
+                return
+
+            if (self.reset_sequence.running()
+                    or not self.mch_comms.connected):
+                # Left to the scan after reconnecting
+                continue
+
+            with self.scan_lock:
+                if not self.frus_inited:
+                    continue
+                for fru in frus:
+                    fru.read_sensors()
+                    fru.schedule(self.scheduler, None, time.time())
+                self.interrupt()
+
+    def log_event(self, event, source):
+        """
+        Add an event to the event log
+
+        Args:
+            event (SELEvent): event
+            source (str): card and sensor that logged it
+
+        Returns:
+            Nothing
+        """
+
+        self.event_log.append('{} {}: {}'.format(
+                datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                source,
+                event.description()))
+        self.event_count += 1
+        self.new_events = True
+
+    def forget_responses(self, fru_id = None):
+        """
+        Drop the MCH responses kept for a FRU, or all of them, so that the
+        next read goes to the MCH
+
+        Args:
+            fru_id (str, optional): FRU ID (e.g., 193.101). All responses
+                by default.
+
+        Returns:
+            Nothing
+        """
+
+        if fru_id is None:
+            self.responses.invalidate()
+        else:
+            self.responses.invalidate(lambda key: key[:3] == ('sdr', 'entity', fru_id))
+
+    def sensor_scan_list(self, key):
+        """
+        Get the scan list for the records of one sensor
+
+        Args:
+            key (tuple): (bus, slot, sensor type)
+
+        Returns:
+            IOScanListBlock
+        """
+
+        if key not in self.sensor_scan_lists:
+            self.sensor_scan_lists[key] = self.scan_list_class()
+        return self.sensor_scan_lists[key]
+
+    def interrupt(self):
+        """
+        Process the crate and card I/O Intr records, and the sensor
+        records whose values have changed
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        self.scan_list.interrupt()
+
+        if self.new_events:
+            self.new_events = False
+            self.event_scan_list.interrupt()
+
+        dirty, self.dirty_sensors = self.dirty_sensors, set()
+        for key in dirty:
+            scan_list = self.sensor_scan_lists.get(key)
+            if scan_list is not None:
+                scan_list.interrupt()
+
+    def read_frus(self, frus, sensor_names = None):
+        """
+        Read the sensors of a list of FRUs, shared across the session pool.
+        Each session reads its share in one exchange, and all sessions
+        run at the same time.
+
+        Args:
+            frus (list): FRU objects
+            sensor_names (list, optional): for each FRU, the set of sensor
+                names to read, or None to read all
+
+        Returns:
+            list of responses, one per FRU, to pass to FRU.update_sensors
+        """
+
+        if sensor_names is None:
+            sensor_names = [None] * len(frus)
+
+        sessions = len(self.comms_pool)
+        if sessions == 1 or len(frus) <= 1:
+            responses = self.mch_comms.read_frus(frus, sensor_names)
+        else:
+            if self.comms_executor is None:
+                self.comms_executor = ThreadPoolExecutor(sessions)
+
+            # Deal the FRUs out to the sessions
+            futures = [self.comms_executor.submit(
+                    self.comms_pool[session].read_frus,
+                    frus[session::sessions],
+                    sensor_names[session::sessions])
+                    for session in range(sessions)]
+
+            # Merge the responses back into FRU order
+            responses = [None] * len(frus)
+            for session, future in enumerate(futures):
+                responses[session::sessions] = future.result()
+
+        if self.mch_comms.readings == READINGS_RAW:
+            responses = self.convert_readings(responses)
+        return responses
+
+    def convert_readings(self, responses):
+        """
+        Convert the raw analog readings of all FRUs read in a scan in one
+        step
+
+        Args:
+            responses (list): responses from MCH_comms.read_entity_raw
+
+        Returns:
+            list of responses with (name, status, value, units) tuples, to
+            pass to FRU.update_sensors
+        """
+
+        converter = self.sdr_converter
+        if converter is None:
+            converter = SDRConverter([])
+
+        # Gather the raw readings of the sensors the converter knows about
+        indices = []
+        raw = []
+        for response in responses:
+            for record, status, value in response or []:
+                if record.is_analog and value is not None:
+                    index = converter.index.get(record.record_id)
+                    if index is not None:
+                        indices.append(index)
+                        raw.append(value)
+
+        values = iter(converter.convert(indices, raw).tolist())
+
+        converted = []
+        for response in responses:
+            if response is None:
+                converted.append(None)
+                continue
+            readings = []
+            for record, status, value in response:
+                if record.is_analog and value is not None:
+                    if record.record_id in converter.index:
+                        value = next(values)
+                    else:
+                        # Record added since the converter was built
+                        value = record.convert(value)
+                readings.append((record.name, status, value, record.units))
+            converted.append(readings)
+        return converted
+
+    def disconnect_pool(self):
+        """
+        Disconnect the extra sessions in the pool. They reconnect on their
+        next read, picking up any change in the SDR repository.
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        for mch_comms in self.comms_pool[1:]:
+            mch_comms.ipmitool_shell_disconnect()
+
+    def read_fw_version(self):
+        """
+        Get MCH firmware version
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        # This function expects the firmware version to be in a line
+        # prefixed with 'Product Extra'.
+        # At the moment, it takes the form:
+        # Product Extra         : MCH FW V2.18.8 Final (r14042) (Mar 31 2017 - 11:29)
+        # The following two parts will be extracted:
+        # mch_fw_ver: V2.18.8 Final
+        # mch_fw_date: Mar 31 2017 - 11:29
+        # If NAT change the format, then this function will need to be updated
+
+        pattern = ".*: MCH FW (.*) \(.*\) \((.*)\)"
+
+        for mch in range(1,3):
+            try:
+                result = self.mch_comms.call_ipmitool_command(["fru", "print", str(mch + MCH_FRU_ID_OFFSET)])
+
+                for line in result.splitlines():
+                    if FW_TAG in line:
+                        match = re.match(pattern, line)
+                        if match:
+                            self.mch_fw_ver[mch] = match.group(1)
+                            self.mch_fw_date[mch] = match.group(2)
+                        else:
+                            self.mch_fw_ver[mch] = "Unknown"
+                            self.mch_fw_date[mch] = "Unknown"
+            except CalledProcessError as e:
+                        self.mch_fw_ver[mch] = "Unknown"
+                        self.mch_fw_date[mch] = "Unknown"
+            except TimeoutExpired as e:
+                print("read_fw_version: caught TimeoutExpired exception: {}".format(e))
+
+    def read_mch_uptime(self):
+        """
+        Get MCH uptime
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        # Read the current MCH time
+        if self.crate_resetting == False:
+            try:
+                if self.mch_comms.backend == BACKEND_LAN:
+                    mch_now = datetime.datetime.utcfromtimestamp(
+                            self.mch_comms.get_sel_time())
+                    mch_uptime_diff = mch_now - MCH_START_TIME
+                    self.mch_uptime = (
+                            mch_uptime_diff.days +
+                            mch_uptime_diff.seconds/(24*60*60))
+                    return
+
+                result = self.mch_comms.call_ipmitool_command(["sel", "time", "get"])
+
+                # Check that the result is the expected format
+                if re.match('\d\d\/\d\d\/\d\d\d\d \d\d:\d\d:\d\d', result.splitlines()[0].strip()):
+                    mch_now = datetime.datetime.strptime(result.splitlines()[0].strip(), '%m/%d/%Y %H:%M:%S')
+
+                    # Calculate the uptime
+                    mch_uptime_diff = mch_now - MCH_START_TIME
+
+                    self.mch_uptime = (
+                            mch_uptime_diff.days +
+                            mch_uptime_diff.seconds/(24*60*60))
+
+            except CalledProcessError:
+                pass
+            except TimeoutExpired as e:
+                print("read_mch_uptime: caught TimeoutExpired exception: {}".format(e))
+            except IndexError as e:
+                pass
+                #print("read_mch_uptime: caught IndexError exception: {}".format(e))
+            except (IPMIError, AttributeError, OSError) as e:
+                print("read_mch_uptime: caught {}".format(e))
+
+    def reset(self):
+        """
+        Start a power cycle of the crate in the background
+
+        Args:
+            None
+
+        Returns:
+            True if the reset was started
+        """
+
+        if self.reset_sequence.running():
+            print('reset: crate reset already in progress')
+            return False
+
+        self.crate_resetting = True
+        # Reset the FRU init status to stop attempts to read the sensors
+        self.frus_inited = False
+
+        return self.reset_sequence.start([
+            # Wait a few seconds to allow any existing ipmitool requests
+            # to complete
+            ('WAITING', lambda: self.reset_sequence.wait(2.0))
+            ,('DEACTIVATING', self.reset_disconnect)
+            ,('RESETTING', self.reset_send)
+            ,('RECONNECTING', self.reset_reconnect)
+            # Allow the MCH to update the sensor list
+            ,('WAITING', lambda: self.reset_sequence.wait(30.0))
+            ,('RESCANNING', self.reset_rescan)
+        ], finish = self.reset_finish)
+
+    def reset_disconnect(self):
+        """
+        Crate reset step: invalidate the records and close the comms
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        # Force the records to invalid
+        print("reset: Force sensor read to set invalid")
+        self.read_sensors()
+        print("reset: Triggering records to scan")
+        self.interrupt()
+        self.mch_comms.connected = False
+        if self.mch_comms.backend == BACKEND_LAN:
+            # Close the LAN session. System will reconnect on restart
+            if self.mch_comms.lan:
+                self.mch_comms.lan.close()
+            self.mch_comms.lan = None
+        else:
+            # Stop the ipmitool session. System will reconnect on restart
+            self.mch_comms.close_session()
+        self.disconnect_pool()
+
+    def reset_send(self):
+        """
+        Crate reset step: send the reset command
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        try:
+            print("reset: Resetting crate now")
+            self.mch_comms.call_ipmitool_direct_command(["raw", "0x06", "0x03"])
+        except CalledProcessError:
+            pass
+        except TimeoutExpired as e:
+            # Be silent. We expect this command to timeout.
+            print('reset: reset command sent')
+            pass
+
+    def reset_reconnect(self):
+        """
+        Crate reset step: wait for the MCH to come back
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        backoff = self.reconnect_backoff()
+        while not self.mch_comms.ipmitool_shell_connect():
+            self.reset_sequence.wait(backoff.next())
+
+    def reset_rescan(self):
+        """
+        Crate reset step: reread the card list
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        self.crate_resetting = False
+        self.mch_comms.comms_timeout = False
+        print("reset: Updating card and sensor list")
+        self.populate_fru_list(reread_thresholds = True)
+
+    def reset_finish(self):
+        """
+        End of a crate reset, successful or not. Hand the connection back
+        to the normal scan.
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        self.crate_resetting = False
+        self.interrupt()
+
+    def reconnect_backoff(self):
+        """
+        Get a new set of reconnection delays
+
+        Args:
+            None
+
+        Returns:
+            Backoff
+        """
+
+        return Backoff(
+                initial = RECONNECT_MIN_DELAY,
+                maximum = RECONNECT_MAX_DELAY,
+                jitter = RECONNECT_JITTER)
+
+    def connection_paused(self):
+        """
+        Check whether the connection supervisor should leave the
+        connection alone: during a crate reset, which reconnects itself,
+        or before the MCH login details are known
+
+        Args:
+            None
+
+        Returns:
+            True to pause the supervisor
+        """
+
+        return (self.reset_sequence.running()
+                or self.host is None
+                or self.user is None
+                or self.password is None)
+
+    def connection_up(self):
+        """
+        Bring the crate contents up to date after the connection supervisor
+        has reconnected
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        if self.crate_resetting and not self.fru_rescan:
+            print("connection_up: 30 s wait to allow MCH to update sensor list")
+            self.supervisor.wait(30.0)
+        # Scans and PET reads wait for the new card list
+        with self.scan_lock:
+            reset = self.crate_resetting
+            self.crate_resetting = False
+            # Reread the card list, and the thresholds after a reset
+            print("connection_up: Updating card and sensor list")
+            self.populate_fru_list(reread_thresholds = reset)
+            # Reset flags
+            self.fru_rescan = False
+            self.mch_comms.comms_timeout = False
+            print("connection_up: Lists updated")
+            self.interrupt()
+
+    def fru_reset_sequence(self, key):
+        """
+        Get the reset sequence of a card slot
+
+        Args:
+            key (tuple): (bus, slot)
+
+        Returns:
+            ResetSequence
+        """
+
+        if key not in self.fru_resets:
+            self.fru_resets[key] = ResetSequence(
+                    'card {}/{}'.format(*key),
+                    on_change = self.scan_list.interrupt)
+        return self.fru_resets[key]
@@ -0,0 +1,436 @@
+# File: pet_listener.py
+# Date: 2026-10-17
+#
+# Description:
+# Listener for IPMI Platform Event Traps (PET) sent by MCHs.
+#
+# An MCH can be set up to send an SNMPv1 trap to an alert destination
+# whenever it logs an event. The trap carries the same event details as the
+# System Event Log record: the sensor and entity that logged it, the sensor
+# and event types and the event data. The listener decodes traps as they
+# arrive, in a background thread, and hands them on as SELEvent objects,
+# so that the card concerned can be read at once rather than at the next
+# scan.
+#
+# Only the parts of BER and SNMPv1 needed for PET are decoded. Anything
+# else arriving at the port is ignored.
+
+import socket
+import struct
+import threading
+
+from sel_reader import SELEvent
+
+# SNMP port for traps. Binding to it needs privileges, so the IOC is
+# normally given another port to listen on (see MTCA_PET_PORT).
+SNMP_TRAP_PORT = 162
+
+# BER tags
+BER_INTEGER = 0x02
+BER_OCTET_STRING = 0x04
+BER_NULL = 0x05
+BER_OID = 0x06
+BER_SEQUENCE = 0x30
+SNMP_IP_ADDRESS = 0x40
+SNMP_TIME_TICKS = 0x43
+SNMP_TRAP_PDU = 0xa4
+
+SNMP_VERSION_1 = 0
+
+# Enterprise OID of PET traps (wired for management), and the OID of the
+# variable holding the event
+PET_ENTERPRISE = (1, 3, 6, 1, 4, 1, 3183, 1, 1)
+PET_VARIABLE = (1, 3, 6, 1, 4, 1, 3183, 1, 1, 1)
+GENERIC_TRAP_ENTERPRISE = 6
+
+# Layout of the PET variable: GUID, sequence number, timestamp, UTC offset,
+# trap source type, event source type, severity, sensor device, sensor
+# number, entity, entity instance, then 8 bytes of event data
+PET_FORMAT = '>16sHIhBBBBBBB8s'
+PET_LEN = struct.calcsize(PET_FORMAT)
+
+# Largest packet read
+MAX_PACKET = 1500
+
+# Time between checks for a stop request (s)
+STOP_CHECK_PERIOD = 0.5
+
+class PETAlert(SELEvent):
+    """
+    Event received in a PET, with the entity that logged it and the
+    address of the MCH that sent it
+    """
+
+    def __init__(self):
+        SELEvent.__init__(self, 0, 0)
+        self.agent = None
+        self.sequence = 0
+        self.severity = 0
+        self.entity_id = 0
+        self.entity_instance = 0
+
+    @property
+    def fru_id(self):
+        """
+        FRU ID of the entity in the form ipmitool uses (e.g., 193.101)
+        """
+        return '{}.{}'.format(self.entity_id, self.entity_instance)
+
+
+def ber_read(data, pos):
+    """
+    Read one BER element
+
+    Args:
+        data (bytes): encoded data
+        pos (int): offset of the element
+
+    Returns:
+        (tag, contents (bytes), offset of the next element)
+
+    Raises:
+        ValueError: the element is truncated or too long
+    """
+
+    if pos + 2 > len(data):
+        raise ValueError('truncated BER element')
+    tag = data[pos]
+    length = data[pos + 1]
+    pos += 2
+    if length & 0x80:
+        count = length & 0x7f
+        if count == 0 or count > 4 or pos + count > len(data):
+            raise ValueError('bad BER length')
+        length = int.from_bytes(data[pos:pos + count], 'big')
+        pos += count
+    if pos + length > len(data):
+        raise ValueError('truncated BER element')
+    return tag, data[pos:pos + length], pos + length
+
+
+def ber_items(data):
+    """
+    Read the elements of a constructed BER element
+
+    Args:
+        data (bytes): contents of the element
+
+    Returns:
+        list of (tag, contents)
+    """
+
+    items = []
+    pos = 0
+    while pos < len(data):
+        tag, value, pos = ber_read(data, pos)
+        items.append((tag, value))
+    return items
+
+
+def decode_oid(data):
+    """
+    Decode the contents of a BER object identifier
+
+    Args:
+        data (bytes): contents
+
+    Returns:
+        OID (tuple of int)
+    """
+
+    if len(data) == 0:
+        return ()
+    oid = [data[0] // 40, data[0] % 40]
+    value = 0
+    for byte in data[1:]:
+        value = (value << 7) | (byte & 0x7f)
+        if not byte & 0x80:
+            oid.append(value)
+            value = 0
+    return tuple(oid)
+
+
+def decode_pet(packet, source = None):
+    """
+    Decode a Platform Event Trap
+
+    Args:
+        packet (bytes): UDP payload
+        source (str, optional): address the packet came from, used if the
+            trap doesn't give the agent address
+
+    Returns:
+        PETAlert, or None if the packet isn't a PET
+    """
+
+    try:
+        tag, message, pos = ber_read(packet, 0)
+        if tag != BER_SEQUENCE:
+            return None
+        items = ber_items(message)
+        if (len(items) < 3
+                or items[0] != (BER_INTEGER, bytes([SNMP_VERSION_1]))
+                or items[2][0] != SNMP_TRAP_PDU):
+            return None
+
+        pdu = ber_items(items[2][1])
+        if len(pdu) < 6 or pdu[0][0] != BER_OID or decode_oid(pdu[0][1]) != PET_ENTERPRISE:
+            return None
+        if int.from_bytes(pdu[2][1], 'big') != GENERIC_TRAP_ENTERPRISE:
+            return None
+        specific = int.from_bytes(pdu[3][1], 'big')
+
+        # The event itself is in the PET variable
+        pet = None
+        for tag, binding in ber_items(pdu[5][1]):
+            fields = ber_items(binding)
+            if (len(fields) == 2
+                    and fields[0][0] == BER_OID
+                    and decode_oid(fields[0][1]) == PET_VARIABLE
+                    and fields[1][0] == BER_OCTET_STRING):
+                pet = fields[1][1]
+        if pet is None or len(pet) < PET_LEN:
+            return None
+    except ValueError:
+        return None
+
+    (guid, sequence, timestamp, utc_offset, trap_source, event_source,
+            severity, sensor_device, sensor_number, entity_id,
+            entity_instance, event_data) = struct.unpack(PET_FORMAT, pet[:PET_LEN])
+
+    alert = PETAlert()
+    agent = pdu[1][1]
+    if pdu[1][0] == SNMP_IP_ADDRESS and len(agent) == 4 and agent != bytes(4):
+        alert.agent = socket.inet_ntoa(agent)
+    else:
+        alert.agent = source
+    alert.sequence = sequence
+    alert.timestamp = timestamp
+    alert.severity = severity
+    alert.generator = sensor_device & 0xfe
+    alert.sensor_number = sensor_number
+    alert.entity_id = entity_id
+    # As in the SDRs, so that the FRU ids match
+    alert.entity_instance = entity_instance & 0x7f
+    # The specific trap number holds the sensor type, event type, direction
+    # and offset
+    alert.sensor_type = (specific >> 16) & 0xff
+    alert.event_type = (specific >> 8) & 0xff
+    alert.asserted = not specific & 0x80
+    alert.offset = specific & 0x0f
+    alert.data = tuple(bytearray(event_data[:3]))
+    return alert
+
+
+def ber_encode(tag, contents):
+    """
+    Encode one BER element
+
+    Args:
+        tag (int): tag
+        contents (bytes): contents
+
+    Returns:
+        encoded element (bytes)
+    """
+
+    length = len(contents)
+    if length < 0x80:
+        return bytes([tag, length]) + contents
+    size = (length.bit_length() + 7) // 8
+    return bytes([tag, 0x80 | size]) + length.to_bytes(size, 'big') + contents
+
+
+def encode_oid(oid):
+    """
+    Encode an object identifier
+
+    Args:
+        oid (tuple of int): OID
+
+    Returns:
+        encoded OID (bytes)
+    """
+
+    contents = bytearray([oid[0] * 40 + oid[1]])
+    for value in oid[2:]:
+        chunk = [value & 0x7f]
+        value >>= 7
+        while value:
+            chunk.insert(0, 0x80 | (value & 0x7f))
+            value >>= 7
+        contents.extend(chunk)
+    return ber_encode(BER_OID, bytes(contents))
+
+
+def encode_integer(value):
+    """
+    Encode a non-negative integer
+    """
+
+    size = value.bit_length() // 8 + 1
+    return ber_encode(BER_INTEGER, value.to_bytes(size, 'big'))
+
+
+def encode_pet(agent, sensor_type, event_type, offset, asserted = True,
+        sensor_device = 0x20, sensor_number = 0, entity = '0.0',
+        event_data = (0xff, 0xff), severity = 0, sequence = 0, timestamp = 0,
+        community = 'public'):
+    """
+    Build a Platform Event Trap, as an MCH sends it. Used to test the
+    listener without an MCH.
+
+    Args:
+        agent (str): IP address of the MCH
+        sensor_type (int): sensor type
+        event_type (int): event/reading type
+        offset (int): event offset
+        asserted (bool): assertion or deassertion event
+        sensor_device (int): IPMB address of the sensor owner
+        sensor_number (int): sensor number
+        entity (str): entity ID and instance (e.g., 193.101)
+        event_data (tuple): event data bytes 2 and 3
+        severity (int): PET event severity
+        sequence (int): sequence number
+        timestamp (int): MCH time, in seconds since 1970
+        community (str): SNMP community
+
+    Returns:
+        UDP payload (bytes)
+    """
+
+    entity_id, entity_instance = [int(x) for x in entity.split('.')]
+    data = bytes([offset & 0x0f] + list(event_data)).ljust(8, b'\xff')
+    pet = struct.pack(PET_FORMAT, bytes(16), sequence, timestamp, 0, 0x20,
+            0x20, severity, sensor_device, sensor_number, entity_id,
+            entity_instance, data) + b'\x00' + bytes(6) + b'\xc1'
+    specific = ((sensor_type << 16) | (event_type << 8)
+            | (0 if asserted else 0x80) | (offset & 0x0f))
+
+    binding = ber_encode(BER_SEQUENCE, encode_oid(PET_VARIABLE)
+            + ber_encode(BER_OCTET_STRING, pet))
+    pdu = ber_encode(SNMP_TRAP_PDU,
+            encode_oid(PET_ENTERPRISE)
+            + ber_encode(SNMP_IP_ADDRESS, socket.inet_aton(agent))
+            + encode_integer(GENERIC_TRAP_ENTERPRISE)
+            + encode_integer(specific)
+            + ber_encode(SNMP_TIME_TICKS, bytes([0]))
+            + ber_encode(BER_SEQUENCE, binding))
+    return ber_encode(BER_SEQUENCE,
+            encode_integer(SNMP_VERSION_1)
+            + ber_encode(BER_OCTET_STRING, community.encode('ascii'))
+            + pdu)
+
+
+class PETListener():
+    """
+    Background thread that receives PETs on a UDP port
+    """
+
+    def __init__(self, port, on_alert, address = ''):
+        """
+        PETListener initializer
+
+        Args:
+            port (int): UDP port to listen on
+            on_alert (callable): called with each PETAlert received, in the
+                listener thread. Must not block.
+            address (str, optional): local address to listen on. All
+                addresses by default.
+
+        Returns:
+            Nothing
+        """
+
+        self.port = port
+        self.address = address
+        self.on_alert = on_alert
+        self.sock = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        # Packets received, and those that were not PETs
+        self.received = 0
+        self.ignored = 0
+
+    def start(self):
+        """
+        Open the port and start the listener thread, if it isn't already
+        running
+
+        Args:
+            None
+
+        Returns:
+            True if the listener is running
+        """
+
+        with self.lock:
+            if self.thread is not None:
+                return True
+            try:
+                self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                self.sock.bind((self.address, self.port))
+                self.sock.settimeout(STOP_CHECK_PERIOD)
+            except OSError as e:
+                print('PETListener: could not listen on port {}: {}'.format(self.port, e))
+                self.sock.close()
+                self.sock = None
+                return False
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self.run, name='PETListener')
+            self.thread.daemon = True
+            self.thread.start()
+            return True
+
+    def stop(self):
+        """
+        Stop the listener thread and close the port
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        with self.lock:
+            if self.thread is None:
+                return
+            self.stopped.set()
+            self.thread.join()
+            self.thread = None
+            self.sock.close()
+            self.sock = None
+
+    def run(self):
+        """
+        Listener thread
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        while not self.stopped.is_set():
+            try:
+                packet, source = self.sock.recvfrom(MAX_PACKET)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                print('PETListener: caught {}'.format(e))
+                self.stopped.wait(STOP_CHECK_PERIOD)
+                continue
+
+            self.received += 1
+            alert = decode_pet(packet, source[0])
+            if alert is None:
+                self.ignored += 1
+                continue
+            try:
+                self.on_alert(alert)
+            except Exception as e:
+                print('PETListener: caught {}'.format(e))
@@ -0,0 +1,276 @@
+# File: provisioning.py
+# Date: 2026-10-17
+#
+# Description:
+# Bulk provisioning of sensor thresholds from a threshold policy (see
+# threshold_policy.py).
+#
+# Each crate is handled over one session to its MCH, opened with the crate
+# core, so IPMI_BACKEND selects the ipmitool shell, the LAN backend or the
+# connection broker. The thresholds of every sensor the policy covers are
+# read in one batch and compared with the policy, and only the thresholds
+# that differ are set. They are then read back, as the MCH rounds them and
+# sometimes doesn't take them at first, and those that still differ are
+# set once more. Crates are provisioned in parallel.
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import mtca_core
+from mtca_core import BACKEND_LAN, THRESHOLD_CACHE
+from threshold_policy import threshold_changes
+
+# States of a sensor after provisioning
+SENSOR_OK = 'ok'
+SENSOR_CHANGED = 'changed'
+SENSOR_PLANNED = 'planned'
+SENSOR_FAILED = 'failed'
+SENSOR_UNREACHABLE = 'unreachable'
+
+# Time for the MCH to take new thresholds before they are read back (s)
+SETTLE_TIME = 0.5
+
+class SensorPlan():
+    """
+    Thresholds of one sensor: wanted, found on the MCH, and still to set
+    """
+
+    def __init__(self, fru, name, wanted):
+        """
+        SensorPlan initializer
+
+        Args:
+            fru (FRU): card of the sensor
+            name (str): sensor name
+            wanted (dict): thresholds wanted by the policy
+
+        Returns:
+            Nothing
+        """
+
+        self.fru = fru
+        self.name = name
+        self.wanted = wanted
+        # Thresholds as first found, and as last read back
+        self.found = None
+        self.current = None
+        # Thresholds that differ from the policy, and those set
+        self.changes = {}
+        self.applied = {}
+        self.state = None
+
+    def __str__(self):
+        found = self.found or {}
+        details = ', '.join('{} {} -> {}'.format(threshold,
+                found.get(threshold, 'na'), value)
+                for threshold, value in sorted((self.changes or self.applied).items()))
+        return '{} {} "{}": {}{}'.format(self.fru.id, self.fru.name, self.name,
+                self.state, ' ({})'.format(details) if details else '')
+
+
+class CrateProvisioner():
+    """
+    Provisions the thresholds of one crate
+    """
+
+    def __init__(self, host, policy, user = '', password = '', dry_run = False, retries = 1):
+        """
+        CrateProvisioner initializer
+
+        Args:
+            host (str): MCH host name or address
+            policy (ThresholdPolicy): thresholds wanted
+            user (str, optional): MCH user name
+            password (str, optional): MCH password
+            dry_run (bool, optional): only find the changes needed
+            retries (int, optional): times to set thresholds again that
+                the MCH didn't take
+
+        Returns:
+            Nothing
+        """
+
+        self.host = host
+        self.policy = policy
+        self.dry_run = dry_run
+        self.retries = retries
+        self.crate = mtca_core.get_crate(host)
+        self.crate.host = host
+        self.crate.user = user
+        self.crate.password = password
+        self.mch_comms = self.crate.mch_comms
+
+    def connect(self):
+        """
+        Connect to the MCH and read the card list
+
+        Args:
+            None
+
+        Returns:
+            True if connected
+        """
+
+        if not self.mch_comms.ipmitool_shell_connect():
+            return False
+        self.crate.populate_fru_list()
+        return self.crate.frus_inited
+
+    def tolerance(self, plan, threshold, value):
+        """
+        Get the difference from a wanted threshold that counts as set: the
+        tolerance of the policy, or the resolution of the sensor if it is
+        coarser and known (LAN backend)
+
+        Args:
+            plan (SensorPlan): sensor
+            threshold (str): ipmitool threshold name
+            value (float): wanted value
+
+        Returns:
+            tolerance (float)
+        """
+
+        tolerance = self.policy.tolerance(plan.fru.bus, plan.fru.name,
+                plan.name, threshold, value)
+        if self.mch_comms.backend == BACKEND_LAN:
+            record = self.mch_comms.find_sensor_record(plan.fru.id, plan.name)
+            if record is not None:
+                raw = record.raw_value(value)
+                step = abs(record.convert(min(raw + 1, 255)) - record.convert(max(raw - 1, 0))) / 2
+                tolerance = max(tolerance, step)
+        return tolerance
+
+    def compare(self, plans):
+        """
+        Read the thresholds of sensors from the MCH, and find those that
+        differ from the policy
+
+        Args:
+            plans (list): SensorPlan objects
+
+        Returns:
+            Nothing
+        """
+
+        thresholds = self.mch_comms.read_sensor_thresholds(
+                [(plan.fru.id, plan.name) for plan in plans])
+        for plan, current in zip(plans, thresholds):
+            plan.current = current
+            if plan.found is None:
+                plan.found = current
+            if current is None:
+                plan.changes = {}
+                plan.state = SENSOR_UNREACHABLE
+                continue
+            plan.changes = threshold_changes(plan.wanted, current,
+                    lambda threshold, wanted, value, plan=plan:
+                        abs(wanted - value) <= self.tolerance(plan, threshold, wanted))
+            plan.state = SENSOR_PLANNED if plan.changes else SENSOR_OK
+
+    def plan(self):
+        """
+        Find the sensors the policy covers, and the thresholds to set on
+        each
+
+        Args:
+            None
+
+        Returns:
+            list of SensorPlan objects
+        """
+
+        plans = []
+        for key, fru in sorted(self.crate.frus.items()):
+            for name in self.mch_comms.list_sensors(fru.id):
+                wanted = self.policy.thresholds(fru.bus, fru.name, name)
+                if wanted:
+                    plans.append(SensorPlan(fru, name, wanted))
+        self.compare(plans)
+        return plans
+
+    def apply(self, plans):
+        """
+        Set the thresholds that differ from the policy, and read them back
+
+        Args:
+            plans (list): SensorPlan objects from plan()
+
+        Returns:
+            Nothing
+        """
+
+        pending = [plan for plan in plans if plan.changes]
+        changed = set()
+        for attempt in range(1 + self.retries):
+            if not pending:
+                break
+            sent = self.mch_comms.set_sensor_thresholds(
+                    [(plan.fru.id, plan.name, plan.changes) for plan in pending])
+            for plan, ok in zip(pending, sent):
+                if ok:
+                    plan.applied.update(plan.changes)
+                    changed.add(plan)
+                    # An IOC reads the new limits at its next rescan
+                    THRESHOLD_CACHE.forget(plan.fru.name, plan.name)
+            time.sleep(SETTLE_TIME)
+            self.compare(pending)
+            pending = [plan for plan in pending if plan.changes]
+
+        for plan in plans:
+            if plan.changes or (plan.state == SENSOR_UNREACHABLE and plan in changed):
+                plan.state = SENSOR_FAILED
+            elif plan in changed:
+                plan.state = SENSOR_CHANGED
+        if changed:
+            THRESHOLD_CACHE.save()
+
+    def run(self):
+        """
+        Provision the crate
+
+        Args:
+            None
+
+        Returns:
+            list of SensorPlan objects, or None if the MCH couldn't be
+            reached
+        """
+
+        if not self.connect():
+            return None
+        plans = self.plan()
+        if not self.dry_run:
+            self.apply(plans)
+        return plans
+
+
+def provision(hosts, policy, user = '', password = '', dry_run = False,
+        retries = 1, max_workers = None):
+    """
+    Provision the thresholds of several crates in parallel
+
+    Args:
+        hosts (list): MCH host names or addresses
+        policy (ThresholdPolicy): thresholds wanted
+        user (str, optional): MCH user name
+        password (str, optional): MCH password
+        dry_run (bool, optional): only find the changes needed
+        retries (int, optional): times to set thresholds again that the
+            MCH didn't take
+        max_workers (int, optional): most crates provisioned at the same
+            time
+
+    Returns:
+        dict of results of CrateProvisioner.run, keyed by host
+    """
+
+    def run(host):
+        try:
+            return CrateProvisioner(host, policy, user, password, dry_run, retries).run()
+        except Exception as e:
+            print('provision: {}: caught {}'.format(host, e))
+            return None
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        return dict(zip(hosts, executor.map(run, hosts)))
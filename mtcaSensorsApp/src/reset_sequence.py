@@ -0,0 +1,163 @@
+# File: reset_sequence.py
+# Date: 2026-10-17
+#
+# Description:
+# Background state machine for crate and card resets.
+#
+# A reset is a list of steps, each tagged with the state the reset is in
+# while the step runs (deactivating, waiting, activating, ...). The steps run
+# in their own thread, so the record that starts a reset returns at once and
+# the rest of the IOC keeps running. The current state and progress are
+# published through status records.
+
+import threading
+
+RESET_STATES = [
+    'IDLE'
+    ,'WAITING'
+    ,'DEACTIVATING'
+    ,'RESETTING'
+    ,'RECONNECTING'
+    ,'RESCANNING'
+    ,'ACTIVATING'
+    ,'DONE'
+    ,'FAILED'
+]
+
+class ResetSequence():
+    """
+    Runs the steps of a reset in a background thread
+    """
+
+    def __init__(self, name, on_change = None):
+        """
+        ResetSequence initializer
+
+        Args:
+            name (str): name used in messages
+            on_change (callable, optional): called with no arguments when
+                the state or progress changes
+
+        Returns:
+            Nothing
+        """
+
+        self.name = name
+        self.on_change = on_change
+        self.state = RESET_STATES.index('IDLE')
+        # Percentage of the steps completed
+        self.progress = 0.0
+        self.thread = None
+        self.cancelled = threading.Event()
+        self.lock = threading.Lock()
+
+    def running(self):
+        """
+        Check whether a reset is in progress
+
+        Args:
+            None
+
+        Returns:
+            True if the steps are running
+        """
+
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, steps, finish = None):
+        """
+        Start a reset, unless one is already in progress
+
+        Args:
+            steps (list): (state name, callable) tuples, run in order
+            finish (callable, optional): called after the last step, or
+                after a step fails
+
+        Returns:
+            True if the reset was started
+        """
+
+        with self.lock:
+            if self.running():
+                print('{}: reset already in progress'.format(self.name))
+                return False
+            self.cancelled.clear()
+            self.thread = threading.Thread(
+                    target=self.run,
+                    args=(steps, finish),
+                    name='{} reset'.format(self.name))
+            self.thread.daemon = True
+            self.thread.start()
+        return True
+
+    def run(self, steps, finish):
+        """
+        Reset thread
+
+        Args:
+            steps (list): (state name, callable) tuples
+            finish (callable): called at the end, or None
+
+        Returns:
+            Nothing
+        """
+
+        try:
+            for index, (state, step) in enumerate(steps):
+                if self.cancelled.is_set():
+                    raise RuntimeError('cancelled')
+                print('{}: reset {}'.format(self.name, state.lower()))
+                self.set_state(state, 100.0 * index / len(steps))
+                step()
+            self.set_state('DONE', 100.0)
+        except Exception as e:
+            print('{}: reset failed while {}: {}'.format(
+                    self.name, RESET_STATES[self.state].lower(), e))
+            self.set_state('FAILED', self.progress)
+        finally:
+            if finish is not None:
+                finish()
+
+    def set_state(self, state, progress):
+        """
+        Update the state and progress, and tell the status records
+
+        Args:
+            state (str): one of RESET_STATES
+            progress (float): percentage of the steps completed
+
+        Returns:
+            Nothing
+        """
+
+        self.state = RESET_STATES.index(state)
+        self.progress = progress
+        if self.on_change is not None:
+            self.on_change()
+
+    def wait(self, seconds):
+        """
+        Wait within a step. Cancelling the reset ends the wait early.
+
+        Args:
+            seconds (float): time to wait
+
+        Returns:
+            Nothing
+        """
+
+        if self.cancelled.wait(seconds):
+            raise RuntimeError('cancelled')
+
+    def cancel(self):
+        """
+        Stop a reset in progress at the end of its current step
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        self.cancelled.set()
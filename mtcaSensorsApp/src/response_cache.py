@@ -0,0 +1,208 @@
+# File: response_cache.py
+# Date: 2026-10-17
+#
+# Description:
+# Short-lived cache of MCH responses, with coalescing of requests in flight.
+#
+# Several parts of the IOC can ask the MCH for the same thing at nearly the
+# same time: a card list rescan and a scan, two sessions of the pool, or a
+# record and the scan that follows it. The cache keeps each response for a
+# time set by the caller, and drops the least recently used ones beyond a
+# fixed number. A request for something that another thread is already
+# fetching waits for that response instead of sending the command again.
+#
+# Failed responses (None or empty) are passed on to the requests waiting
+# for them, but are not kept.
+
+import collections
+import threading
+import time
+
+class PendingResponse():
+    """
+    Response that a thread is fetching, for other requests to wait on
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResponseCache():
+    """
+    LRU cache of responses, keyed by command
+    """
+
+    def __init__(self, max_entries = 256):
+        """
+        ResponseCache initializer
+
+        Args:
+            max_entries (int, optional): most responses kept
+
+        Returns:
+            Nothing
+        """
+
+        self.max_entries = max_entries
+        # (time, response) keyed by command, least recently used first
+        self.entries = collections.OrderedDict()
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        # Count of invalidations, so that a response fetched across one
+        # isn't kept
+        self.generation = 0
+        # Requests answered from the cache, by a request in flight, and sent
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    def get(self, key, ttl, now = None):
+        """
+        Get a kept response, with the lock held
+
+        Args:
+            key: command key
+            ttl (float): age of response that will do (s)
+            now (float, optional): current time
+
+        Returns:
+            response, or None if there isn't one young enough
+        """
+
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if (now or time.time()) - entry[0] > ttl:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, value, now = None):
+        """
+        Keep a response, with the lock held
+
+        Args:
+            key: command key
+            value: response
+            now (float, optional): time it was received
+
+        Returns:
+            Nothing
+        """
+
+        self.entries[key] = (now or time.time(), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def call_many(self, keys, ttl, fetch, keep = bool):
+        """
+        Get the responses to several commands, fetching only those that
+        aren't kept or already being fetched
+
+        Args:
+            keys (list): command keys
+            ttl (float): age of kept responses that will do (s). With 0,
+                responses are not kept, but requests in flight are still
+                shared.
+            fetch (callable): takes the list of keys to fetch and returns
+                their responses in the same order
+            keep (callable, optional): takes a response and returns True if
+                it can be kept. By default, responses that are None or
+                empty are not kept.
+
+        Returns:
+            list of responses, one per key
+        """
+
+        results = [None] * len(keys)
+        owned = []
+        waiting = []
+        now = time.time()
+
+        with self.lock:
+            for index, key in enumerate(keys):
+                value = self.get(key, ttl, now) if ttl > 0 else None
+                if value is not None:
+                    self.hits += 1
+                    results[index] = value
+                elif key in self.in_flight:
+                    self.coalesced += 1
+                    waiting.append((index, self.in_flight[key]))
+                else:
+                    self.misses += 1
+                    pending = PendingResponse()
+                    self.in_flight[key] = pending
+                    owned.append((index, key, pending))
+            generation = self.generation
+
+        if owned:
+            try:
+                values = list(fetch([key for index, key, pending in owned]))
+                if len(values) != len(owned):
+                    raise ValueError('fetch returned {} responses for {} commands'.format(
+                            len(values), len(owned)))
+            except BaseException as e:
+                # Callers waiting on these commands get the error too
+                with self.lock:
+                    for index, key, pending in owned:
+                        del self.in_flight[key]
+                        pending.error = e
+                        pending.done.set()
+                raise
+
+            now = time.time()
+            with self.lock:
+                for (index, key, pending), value in zip(owned, values):
+                    del self.in_flight[key]
+                    if ttl > 0 and keep(value) and generation == self.generation:
+                        self.put(key, value, now)
+                    pending.value = value
+                    pending.done.set()
+                    results[index] = value
+
+        for index, pending in waiting:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            results[index] = pending.value
+        return results
+
+    def call(self, key, ttl, fetch, keep = bool):
+        """
+        Get the response to one command, see call_many
+
+        Args:
+            key: command key
+            ttl (float): age of a kept response that will do (s)
+            fetch (callable): takes no arguments and returns the response
+            keep (callable, optional): see call_many
+
+        Returns:
+            response
+        """
+
+        return self.call_many([key], ttl, lambda keys: [fetch()], keep)[0]
+
+    def invalidate(self, match = None):
+        """
+        Drop kept responses
+
+        Args:
+            match (callable, optional): takes a key and returns True to
+                drop its response. All are dropped by default.
+
+        Returns:
+            Nothing
+        """
+
+        with self.lock:
+            self.generation += 1
+            if match is None:
+                self.entries.clear()
+                return
+            for key in [key for key in self.entries if match(key)]:
+                del self.entries[key]
@@ -0,0 +1,120 @@
+# File: scan_scheduler.py
+# Date: 2026-10-17
+#
+# Description:
+# Tracks when each item in a crate (FRU, MCH uptime, ...) is next due to be
+# read. The crate scan runs at the SCANNER record rate and only reads the
+# items that are due, so items can be read at different rates.
+#
+# Items that repeatedly fail to respond back off exponentially, up to the
+# maximum period, so that empty slots and dead cards don't use up MCH
+# bandwidth.
+
+import time
+
+class ScanScheduler():
+    """
+    Per-item scan periods with backoff on failures
+    """
+
+    def __init__(self, max_period, backoff = 2.0):
+        """
+        ScanScheduler initializer
+
+        Args:
+            max_period (float): longest time between reads of an item (s)
+            backoff (float): period multiplier for each consecutive failure
+
+        Returns:
+            Nothing
+        """
+
+        self.max_period = max_period
+        self.backoff = backoff
+        # Time each item is next due, and its consecutive failure count
+        self.next_due = {}
+        self.failures = {}
+        # Time of the last scan cycle, and the slack allowed for jitter in
+        # the scan rate
+        self.last_cycle = None
+        self.tolerance = 0.0
+
+    def begin_cycle(self, now = None):
+        """
+        Start a scan cycle. Items due within half a cycle are treated as
+        due now, so that an item with the same period as the scan is read
+        every cycle despite jitter.
+
+        Args:
+            now (float, optional): current time
+
+        Returns:
+            Nothing
+        """
+
+        if now is None:
+            now = time.time()
+        if self.last_cycle is not None:
+            self.tolerance = max(0.0, (now - self.last_cycle) / 2.0)
+        self.last_cycle = now
+
+    def due(self, key, now = None):
+        """
+        Check if an item is due to be read. Items not seen before are due.
+
+        Args:
+            key: item key
+            now (float, optional): current time
+
+        Returns:
+            True if the item should be read this cycle
+        """
+
+        if now is None:
+            now = time.time()
+        return now + self.tolerance >= self.next_due.get(key, 0.0)
+
+    def schedule(self, key, period, ok = True, now = None):
+        """
+        Set the next read time of an item after it has been read
+
+        Args:
+            key: item key
+            period (float): scan period for the item (s)
+            ok (bool): whether the read succeeded
+            now (float, optional): current time
+
+        Returns:
+            period (float) actually used, including any backoff
+        """
+
+        if now is None:
+            now = time.time()
+
+        if ok:
+            self.failures[key] = 0
+        else:
+            self.failures[key] = self.failures.get(key, 0) + 1
+            period *= self.backoff ** self.failures[key]
+
+        period = min(period, self.max_period)
+        self.next_due[key] = now + period
+        return period
+
+    def reset(self, key = None):
+        """
+        Make an item, or all items, due at the next cycle
+
+        Args:
+            key (optional): item key. Omit to reset all items.
+
+        Returns:
+            Nothing
+        """
+
+        if key is None:
+            self.next_due = {}
+            self.failures = {}
+        else:
+            self.next_due.pop(key, None)
+            self.failures.pop(key, None)
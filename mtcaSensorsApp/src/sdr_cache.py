@@ -0,0 +1,125 @@
+# File: sdr_cache.py
+# Date: 2026-10-17
+#
+# Description:
+# Persistent cache of MCH Sensor Data Record (SDR) repository contents.
+#
+# Entries are keyed by MCH host and stamped with the SDR repository change
+# timestamps (most recent addition and erase). The MCH updates these whenever
+# the card population changes, so a matching stamp means the cached FRU list
+# and sensor records can be used without reading the repository again.
+#
+# All sessions in a process share one SDRCache (mtca_core.SDR_CACHE), so
+# that saves for different MCHs don't drop each other's entries.
+
+import json
+import os
+import tempfile
+import threading
+
+SDR_CACHE_FILE = 'mtca_sdr_cache.json'
+
+class SDRCache():
+    """
+    On-disk SDR cache shared by all crates using the same cache directory
+    """
+
+    def __init__(self, path = None):
+        """
+        SDRCache initializer
+
+        Args:
+            path (str, optional): cache file. Defaults to SDR_CACHE_FILE in
+                $MTCA_CACHE_DIR, or the system temporary directory.
+
+        Returns:
+            Nothing
+        """
+
+        if path is None:
+            cache_dir = os.environ.get('MTCA_CACHE_DIR', tempfile.gettempdir())
+            path = os.path.join(cache_dir, SDR_CACHE_FILE)
+        self.path = path
+        # Held while the file is read, changed and written back
+        self.lock = threading.Lock()
+
+    def read_entries(self):
+        """
+        Read all cache entries
+
+        Args:
+            None
+
+        Returns:
+            dict of entries keyed by host
+        """
+
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            # Missing or corrupt cache. Start again.
+            return {}
+
+    def load(self, host, stamp):
+        """
+        Get the cache entry for an MCH if it is still current
+
+        Args:
+            host (str): MCH host name
+            stamp (str): current SDR repository change stamp
+
+        Returns:
+            entry (dict) with 'fru_list' and 'sdrs' items, or None if there
+            is no entry or the repository has changed since it was saved
+        """
+
+        if stamp is None:
+            return None
+
+        entry = self.read_entries().get(host)
+        if entry is not None and entry.get('stamp') == stamp:
+            return entry
+        return None
+
+    def save(self, host, stamp, fru_list = None, sdrs = None):
+        """
+        Store the SDR contents for an MCH
+
+        Args:
+            host (str): MCH host name
+            stamp (str): SDR repository change stamp
+            fru_list (list, optional): (name, FRU ID) tuples
+            sdrs (list, optional): raw SDR records (bytes)
+
+        Returns:
+            Nothing
+        """
+
+        if stamp is None:
+            return
+
+        entry = {
+            'stamp': stamp
+            ,'fru_list': fru_list or []
+            ,'sdrs': [bytes(sdr).hex() for sdr in sdrs or []]
+        }
+
+        with self.lock:
+            entries = self.read_entries()
+            entries[host] = entry
+
+            # Write to a temporary file of our own first, so that a crash
+            # can't leave a half written cache behind
+            tmp_path = None
+            try:
+                fd, tmp_path = tempfile.mkstemp(
+                        dir=os.path.dirname(self.path) or '.',
+                        prefix=os.path.basename(self.path) + '.')
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(entries, f)
+                os.replace(tmp_path, self.path)
+            except (IOError, OSError) as e:
+                print('SDRCache.save: could not write {}: {}'.format(self.path, e))
+                if tmp_path is not None and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
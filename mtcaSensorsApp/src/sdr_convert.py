@@ -0,0 +1,115 @@
+# File: sdr_convert.py
+# Date: 2026-10-17
+#
+# Description:
+# Bulk conversion of raw 8-bit sensor readings to engineering units.
+#
+# The conversion factors (M, B, Bexp, Rexp), analog data format and
+# linearization of every analog sensor in a crate are packed into NumPy
+# arrays when the SDR repository is read. A scan then converts all of the
+# raw readings it collected in one vectorized step, rather than having
+# ipmitool format each reading as text for us to parse back.
+
+import numpy
+
+from ipmi_lan import ANALOG_1S_COMPLEMENT, ANALOG_2S_COMPLEMENT
+
+# Same functions as ipmi_lan.LINEARIZATION, applied to whole arrays
+LINEARIZATION = {
+    1: numpy.log
+    ,2: numpy.log10
+    ,3: numpy.log2
+    ,4: numpy.exp
+    ,5: lambda x: numpy.power(10.0, x)
+    ,6: numpy.exp2
+    ,7: numpy.reciprocal
+    ,8: numpy.square
+    ,9: lambda x: x * x * x
+    ,10: numpy.sqrt
+    ,11: numpy.cbrt
+}
+
+class SDRConverter():
+    """
+    Vectorized raw reading conversion for the analog sensors of a crate
+    """
+
+    def __init__(self, records):
+        """
+        SDRConverter initializer
+
+        Args:
+            records (list): SDRRecord objects. Only analog sensors are used.
+
+        Returns:
+            Nothing
+        """
+
+        self.records = [record for record in records if record.is_analog]
+
+        # Index of each sensor in the arrays, by SDR record ID
+        self.index = dict((record.record_id, i)
+                for i, record in enumerate(self.records))
+
+        self.m = numpy.array([r.m for r in self.records], dtype=numpy.float64)
+        self.b = numpy.array([r.b for r in self.records], dtype=numpy.float64)
+        self.b_scale = numpy.power(10.0,
+                numpy.array([r.b_exp for r in self.records], dtype=numpy.float64))
+        self.r_scale = numpy.power(10.0,
+                numpy.array([r.r_exp for r in self.records], dtype=numpy.float64))
+        self.ones_complement = numpy.array(
+                [r.analog_format == ANALOG_1S_COMPLEMENT for r in self.records],
+                dtype=bool)
+        self.twos_complement = numpy.array(
+                [r.analog_format == ANALOG_2S_COMPLEMENT for r in self.records],
+                dtype=bool)
+        self.linearization = numpy.array(
+                [r.linearization & 0x7f for r in self.records], dtype=numpy.uint8)
+
+        # Latest converted reading of every analog sensor in the crate
+        self.values = numpy.full(len(self.records), numpy.nan)
+
+    def __len__(self):
+        return len(self.records)
+
+    def convert(self, indices, raw):
+        """
+        Convert raw readings to engineering units, as ipmitool does, and
+        store them in the crate values array
+
+        Args:
+            indices (sequence): sensor indices, from self.index
+            raw (sequence): raw 8-bit readings, one per index
+
+        Returns:
+            numpy array of values. Readings that cannot be linearized are
+            NaN.
+        """
+
+        indices = numpy.asarray(indices, dtype=numpy.intp)
+        raw = numpy.asarray(raw, dtype=numpy.int16)
+
+        # Signed formats
+        signed = raw - ((raw & 0x80) << 1)
+        ones = self.ones_complement[indices]
+        raw = numpy.where(ones & (raw & 0x80 != 0), signed + 1, raw)
+        raw = numpy.where(self.twos_complement[indices], signed, raw)
+
+        values = ((self.m[indices] * raw + self.b[indices] * self.b_scale[indices])
+                * self.r_scale[indices])
+
+        # Non-linear sensors are rare, so only work on those present
+        linearization = self.linearization[indices]
+        with numpy.errstate(all='ignore'):
+            for code in numpy.unique(linearization):
+                if code == 0:
+                    continue
+                mask = linearization == code
+                function = LINEARIZATION.get(int(code))
+                if function is None:
+                    continue
+                values[mask] = function(values[mask])
+        values[~numpy.isfinite(values)] = numpy.nan
+
+        self.values[indices] = values
+        return values
@@ -0,0 +1,331 @@
+# File: sel_reader.py
+# Date: 2026-10-17
+#
+# Description:
+# Incremental reader for the MCH System Event Log (SEL).
+#
+# The MCH logs every hot swap state change and threshold crossing in the
+# SEL as it happens. Rather than read the whole log each cycle, the reader
+# remembers the ID of the last record it has seen, checks the SEL info for
+# additions (one command when nothing has happened), and only fetches the
+# records added since. Records are read raw (Get SEL Entry) and decoded
+# here, so the same code serves the ipmitool shell and the LAN backend.
+#
+# On the first read the reader starts at the end of the log: old events are
+# not replayed.
+
+import struct
+
+from ipmi_lan import IPMIError
+
+NETFN_STORAGE = 0x0a
+CMD_GET_SEL_INFO = 0x40
+CMD_GET_SEL_ENTRY = 0x43
+
+SEL_FIRST_ENTRY = 0x0000
+SEL_LAST_ENTRY = 0xffff
+SEL_ENTRY_LEN = 16
+# Read a whole entry, which doesn't need a reservation
+SEL_READ_ALL = 0xff
+
+# Completion code for a record that isn't in the log
+CC_NOT_PRESENT = 0xcb
+
+# Record type of events logged by a sensor. OEM records are skipped.
+SEL_SYSTEM_EVENT = 0x02
+
+EVENT_TYPE_THRESHOLD = 0x01
+
+# PICMG sensor types
+SENSOR_TYPE_FRU_HOT_SWAP = 0xf0
+SENSOR_TYPE_MODULE_HOT_SWAP = 0xf2
+
+# Threshold event offsets: the threshold crossed, and its description
+THRESHOLD_EVENTS = [
+    ('lnc', 'Lower Non-Critical going low')
+    ,('lnc', 'Lower Non-Critical going high')
+    ,('lcr', 'Lower Critical going low')
+    ,('lcr', 'Lower Critical going high')
+    ,('lnr', 'Lower Non-Recoverable going low')
+    ,('lnr', 'Lower Non-Recoverable going high')
+    ,('unc', 'Upper Non-Critical going low')
+    ,('unc', 'Upper Non-Critical going high')
+    ,('ucr', 'Upper Critical going low')
+    ,('ucr', 'Upper Critical going high')
+    ,('unr', 'Upper Non-Recoverable going low')
+    ,('unr', 'Upper Non-Recoverable going high')
+]
+
+# FRU hot swap states (M0 to M7)
+FRU_HOT_SWAP_STATES = [
+    'Not Installed'
+    ,'Inactive'
+    ,'Activation Request'
+    ,'Activation In Progress'
+    ,'Active'
+    ,'Deactivation Request'
+    ,'Deactivation In Progress'
+    ,'Communication Lost'
+]
+
+# FRU hot swap states in which the card can be read
+FRU_ACTIVE_STATES = [2, 3, 4, 5]
+
+# Module hot swap sensor offsets (same as ipmi_lan.MODULE_HOT_SWAP_STATES)
+MODULE_HOT_SWAP_EVENTS = [
+    'Module Handle Closed'
+    ,'Module Handle Opened'
+    ,'Quiesced'
+    ,'Backend Power Failure'
+    ,'Backend Power Shut Down'
+]
+
+# Most records fetched in one read, so that a flood of events can't hold up
+# a scan. The rest are fetched on the next read.
+MAX_ENTRIES_PER_READ = 32
+
+class SELEvent():
+    """
+    Decoded SEL record
+    """
+
+    def __init__(self, record_id, record_type):
+        self.record_id = record_id
+        self.record_type = record_type
+        self.timestamp = 0
+        # IPMB address, LUN and channel of the controller that logged it
+        self.generator = 0
+        self.lun = 0
+        self.channel = 0
+        self.sensor_type = 0
+        self.sensor_number = 0
+        self.event_type = 0
+        self.asserted = True
+        self.offset = 0
+        self.data = (0, 0, 0)
+
+    @property
+    def sensor_key(self):
+        """
+        Key of the sensor that logged the event: (owner address, LUN,
+        sensor number), as in the sensor's SDR
+        """
+        return (self.generator, self.lun, self.sensor_number)
+
+    @property
+    def threshold(self):
+        """
+        Threshold crossed (lnc, lcr, ...), or None for other events
+        """
+
+        if (self.event_type == EVENT_TYPE_THRESHOLD
+                and self.offset < len(THRESHOLD_EVENTS)):
+            return THRESHOLD_EVENTS[self.offset][0]
+        return None
+
+    @property
+    def fru_state(self):
+        """
+        New FRU hot swap state (0 to 7), or None for other events
+        """
+
+        if self.sensor_type == SENSOR_TYPE_FRU_HOT_SWAP:
+            return self.data[0] & 0x0f
+        return None
+
+    def description(self):
+        """
+        Describe the event, much as 'ipmitool sel elist' does
+
+        Args:
+            None
+
+        Returns:
+            description (str)
+        """
+
+        if self.sensor_type == SENSOR_TYPE_FRU_HOT_SWAP:
+            state = self.data[0] & 0x0f
+            previous = self.data[1] & 0x0f
+            return 'M{} -> M{} ({})'.format(previous, state,
+                    FRU_HOT_SWAP_STATES[state] if state < len(FRU_HOT_SWAP_STATES) else 'unknown')
+
+        if self.sensor_type == SENSOR_TYPE_MODULE_HOT_SWAP:
+            if self.offset < len(MODULE_HOT_SWAP_EVENTS):
+                description = MODULE_HOT_SWAP_EVENTS[self.offset]
+            else:
+                description = 'state {}'.format(self.offset)
+        elif self.threshold is not None:
+            description = THRESHOLD_EVENTS[self.offset][1]
+        else:
+            description = 'sensor type 0x{:02x} event type 0x{:02x} offset {}'.format(
+                    self.sensor_type, self.event_type, self.offset)
+
+        return '{} {}'.format(description, 'asserted' if self.asserted else 'deasserted')
+
+
+def decode_sel_entry(data):
+    """
+    Decode a SEL record
+
+    Args:
+        data (bytes): 16 byte record
+
+    Returns:
+        SELEvent, or None for records that are not system events
+    """
+
+    data = bytearray(data)
+    if len(data) < SEL_ENTRY_LEN:
+        return None
+
+    record_id = data[0] | (data[1] << 8)
+    record_type = data[2]
+    if record_type != SEL_SYSTEM_EVENT:
+        return None
+
+    event = SELEvent(record_id, record_type)
+    event.timestamp = struct.unpack('<I', bytes(data[3:7]))[0]
+    event.generator = data[7] & 0xfe
+    event.lun = data[8] & 0x03
+    event.channel = data[8] >> 4
+    event.sensor_type = data[10]
+    event.sensor_number = data[11]
+    event.asserted = not data[12] & 0x80
+    event.event_type = data[12] & 0x7f
+    event.offset = data[13] & 0x0f
+    event.data = (data[13], data[14], data[15])
+    return event
+
+
+class SELReader():
+    """
+    Reads the records added to the SEL since the last read
+    """
+
+    def __init__(self, request):
+        """
+        SELReader initializer
+
+        Args:
+            request (callable): sends a request to the MCH, taking the
+                network function, command and request data, and returns
+                the response data. Raises IPMIError on failure.
+
+        Returns:
+            Nothing
+        """
+
+        self.request = request
+
+        # ID of the last record read, or None to start at the first
+        self.last_id = None
+        # SEL info at the last read: (entries, most recent addition, most
+        # recent erase), or None if the SEL hasn't been read yet
+        self.stamp = None
+
+    def restart(self):
+        """
+        Start again at the end of the log, skipping everything logged so far
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        self.last_id = None
+        self.stamp = None
+
+    def get_info(self):
+        """
+        Get SEL Info
+
+        Args:
+            None
+
+        Returns:
+            (entries, most recent addition, most recent erase)
+        """
+
+        data = bytes(self.request(NETFN_STORAGE, CMD_GET_SEL_INFO, b''))
+        if len(data) < 13:
+            raise IPMIError('short SEL info response')
+        entries, free, addition, erase = struct.unpack('<HHII', data[1:13])
+        return entries, addition, erase
+
+    def get_entry(self, record_id):
+        """
+        Get SEL Entry
+
+        Args:
+            record_id (int): record ID, or SEL_LAST_ENTRY
+
+        Returns:
+            (next record ID, 16 byte record)
+        """
+
+        data = bytes(self.request(NETFN_STORAGE, CMD_GET_SEL_ENTRY,
+                struct.pack('<HHBB', 0, record_id, 0, SEL_READ_ALL)))
+        if len(data) < 2 + SEL_ENTRY_LEN:
+            raise IPMIError('short SEL entry response')
+        return struct.unpack('<H', data[0:2])[0], data[2:2 + SEL_ENTRY_LEN]
+
+    def read(self):
+        """
+        Read the records added since the last read
+
+        Args:
+            None
+
+        Returns:
+            list of SELEvent, oldest first
+        """
+
+        stamp = self.get_info()
+        entries, addition, erase = stamp
+
+        if self.stamp is None:
+            # Start at the end of the log
+            self.stamp = stamp
+            self.last_id = None
+            if entries > 0:
+                next_id, data = self.get_entry(SEL_LAST_ENTRY)
+                self.last_id = data[0] | (data[1] << 8)
+            return []
+
+        if erase != self.stamp[2] or entries < self.stamp[0]:
+            # The log has been cleared, so start at its first record. Only
+            # note the clear for now, in case this read doesn't finish.
+            self.last_id = None
+            self.stamp = (0, self.stamp[1], erase)
+        elif stamp == self.stamp:
+            return []
+
+        record_id = SEL_FIRST_ENTRY
+        if self.last_id is not None:
+            try:
+                record_id, data = self.get_entry(self.last_id)
+            except IPMIError as e:
+                if e.cc != CC_NOT_PRESENT:
+                    raise
+                # Overwritten since the last read
+                record_id = SEL_FIRST_ENTRY
+
+        events = []
+        count = 0
+        while record_id != SEL_LAST_ENTRY and count < MAX_ENTRIES_PER_READ and entries > 0:
+            next_id, data = self.get_entry(record_id)
+            self.last_id = data[0] | (data[1] << 8)
+            event = decode_sel_entry(data)
+            if event is not None:
+                events.append(event)
+            record_id = next_id
+            count += 1
+
+        # Leave the stamp alone if there are more records to fetch, so
+        # that the next read carries on
+        if record_id == SEL_LAST_ENTRY or entries == 0:
+            self.stamp = stamp
+        return events
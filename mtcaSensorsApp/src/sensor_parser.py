@@ -0,0 +1,247 @@
+# File: sensor_parser.py
+# Date: 2026-10-17
+#
+# Description:
+# Parser for ipmitool 'sdr entity' output.
+#
+# Each line has the form
+#   <sensor name> | <sensor ID> | <status> | <entity ID> | <value> <units>
+# and is turned into a compact SensorReading tuple. Sensor names, types,
+# units and alarm levels are looked up once when the parser is created, so
+# parsing a line is one split and a few dictionary lookups. A plain split
+# measured faster than a compiled regex for this format.
+
+import collections
+
+SDR_ENTITY_FIELDS = 5
+
+# Parsed sensor line. Indices refer to the parser's names, types and egus
+# tables. value is None if the line could not be parsed, which read_sensors
+# treats as a pulled card. alarm_level is 0 if the status doesn't count
+# towards the card alarm level.
+SensorReading = collections.namedtuple(
+        'SensorReading',
+        ['name_index', 'type_index', 'value', 'alarm_level', 'egu_index'])
+
+class SdrEntityParser():
+    """
+    Parser for ipmitool 'sdr entity' responses
+    """
+
+    def __init__(self, sensor_names, egu, alarm_levels, digital_sensors,
+            digital_value, prompt):
+        """
+        SdrEntityParser initializer
+
+        Args:
+            sensor_names (dict): sensor names reported by the MCH, mapped to
+                sensor types
+            egu (dict): units reported by the MCH, mapped to EPICS units
+            alarm_levels (dict): status strings mapped to alarm levels
+            digital_sensors (list): sensor types that have no units
+            digital_value (callable): converts the status and value strings
+                of a digital sensor to a number. Results are cached.
+            prompt (str): ipmitool shell prompt
+
+        Returns:
+            Nothing
+        """
+
+        self.prompt = prompt
+        self.alarm_levels = alarm_levels
+        self.digital_value = digital_value
+        self.digital_values = {}
+
+        # Interned string tables
+        self.names = sorted(sensor_names.keys())
+        self.types = sorted(set(sensor_names.values()))
+        self.egus = ['']
+
+        # Sensor name lookup:
+        # name -> (name index, type index, digital, alarm levels)
+        type_indices = dict((t, i) for i, t in enumerate(self.types))
+        self.name_lookup = {}
+        for index, name in enumerate(self.names):
+            sensor_type = sensor_names[name]
+            self.name_lookup[name] = (
+                    index,
+                    type_indices[sensor_type],
+                    sensor_type in digital_sensors,
+                    self.sensor_alarm_levels(name))
+
+        # Raw units -> EGU index. Units we don't know about are added on
+        # first sight.
+        self.egu_lookup = {}
+        for raw, simple in egu.items():
+            self.egu_lookup[raw] = self.egu_index(simple)
+
+    def egu_index(self, egu):
+        """
+        Get the index of an engineering unit string, adding it if needed
+        """
+
+        try:
+            return self.egus.index(egu)
+        except ValueError:
+            self.egus.append(egu)
+            return len(self.egus) - 1
+
+    def sensor_alarm_levels(self, name):
+        """
+        Alarm level contributed to the card status by each status of a
+        sensor
+        """
+
+        levels = dict(self.alarm_levels)
+        # Special case to ignore normal state of Hot Swap sensor
+        if name == 'Hot Swap':
+            levels['lnc'] = 0
+        return levels
+
+    def parse_reading(self, name, status, val):
+        """
+        Convert the fields of one sensor into a SensorReading
+
+        Args:
+            name (str): sensor name
+            status (str): status string (ok, lnc, ucr, ...)
+            val (str): value and units, as ipmitool prints them
+
+        Returns:
+            SensorReading, or None for sensors we don't know about
+        """
+
+        lookup = self.name_lookup.get(name)
+        if lookup is None:
+            return None
+        name_index, type_index, digital, alarm_levels = lookup
+
+        if digital:
+            value = self.digital_values.get((status, val))
+            if value is None:
+                value = float(self.digital_value(status, val))
+                self.digital_values[(status, val)] = value
+            egu_index = 0
+        else:
+            try:
+                value, egu = val.split(' ', 1)
+                value = float(value)
+            except ValueError:
+                return SensorReading(name_index, type_index, None, 0, 0)
+            egu_index = self.egu_lookup.get(egu)
+            if egu_index is None:
+                egu_index = self.egu_index(egu)
+                self.egu_lookup[egu] = egu_index
+
+        return SensorReading(
+                name_index,
+                type_index,
+                value,
+                alarm_levels.get(status, 0),
+                egu_index)
+
+    def parse_value(self, name, status, value, units):
+        """
+        Convert a sensor reading that has already been converted to
+        engineering units, such as a bulk converted raw reading, into a
+        SensorReading
+
+        Args:
+            name (str): sensor name
+            status (str): status string (ok, lnc, ucr, ...)
+            value: value (float) of an analog sensor, state description
+                (str) of a digital sensor, or None if there is no reading
+            units (str): units, as ipmitool prints them
+
+        Returns:
+            SensorReading, or None for sensors we don't know about
+        """
+
+        lookup = self.name_lookup.get(name)
+        if lookup is None:
+            return None
+        name_index, type_index, digital, alarm_levels = lookup
+
+        if digital:
+            if value is None:
+                value = 'No Reading'
+            return self.parse_reading(name, status, value)
+
+        if value is None:
+            return SensorReading(name_index, type_index, None, 0, 0)
+
+        egu_index = self.egu_lookup.get(units)
+        if egu_index is None:
+            egu_index = self.egu_index(units)
+            self.egu_lookup[units] = egu_index
+
+        return SensorReading(
+                name_index,
+                type_index,
+                value,
+                alarm_levels.get(status, 0),
+                egu_index)
+
+    def parse(self, result):
+        """
+        Parse an 'sdr entity' response
+
+        Args:
+            result (str): response of ipmitool
+
+        Returns:
+            list of SensorReading tuples. Lines that cannot be split into
+            fields give a reading with no value.
+        """
+
+        readings = []
+        parse_reading = self.parse_reading
+        for line in result.splitlines():
+            fields = line.split('|')
+            if len(fields) != SDR_ENTITY_FIELDS:
+                if line.strip() and self.prompt not in line:
+                    readings.append(SensorReading(-1, -1, None, 0, 0))
+                continue
+            reading = parse_reading(
+                    fields[0].strip(), fields[2].strip(), fields[4].strip())
+            if reading is not None:
+                readings.append(reading)
+        return readings
+
+    def parse_readings(self, readings):
+        """
+        Convert (name, status, value) tuples, as returned by the LAN
+        backend, into SensorReading tuples
+
+        Args:
+            readings (list): (name, status, value) tuples
+
+        Returns:
+            list of SensorReading tuples
+        """
+
+        parsed = []
+        for name, status, val in readings:
+            reading = self.parse_reading(name, status, val)
+            if reading is not None:
+                parsed.append(reading)
+        return parsed
+
+    def parse_values(self, readings):
+        """
+        Convert (name, status, value, units) tuples, with values already in
+        engineering units, into SensorReading tuples
+
+        Args:
+            readings (list): (name, status, value, units) tuples
+
+        Returns:
+            list of SensorReading tuples
+        """
+
+        parsed = []
+        for name, status, value, units in readings:
+            reading = self.parse_value(name, status, value, units)
+            if reading is not None:
+                parsed.append(reading)
+        return parsed
@@ -0,0 +1,208 @@
+# File: sensor_store.py
+# Date: 2026-10-17
+#
+# Description:
+# Column store for the sensor state of a whole crate.
+#
+# Each sensor in the crate is given a row index, keyed by (bus, slot, sensor
+# type), which stays the same for as long as the IOC runs. Values,
+# thresholds and status flags are held in one preallocated NumPy array per
+# field, so that the state of a crate takes a few KB however many sensors it
+# has, and a copy of the whole crate can be taken in one step.
+#
+# The store also keeps a ring buffer of the most recent readings of each
+# sensor, so that the last few seconds before a card trips can be looked at
+# afterwards without archiving every sensor at a high rate.
+
+import numpy
+
+# Field name, type and initial value
+COLUMNS = [
+    ('value', numpy.float64, 0.0)
+    ,('lolo', numpy.float64, 0.0)
+    ,('low', numpy.float64, 0.0)
+    ,('high', numpy.float64, 0.0)
+    ,('hihi', numpy.float64, 0.0)
+    ,('published_value', numpy.float64, 0.0)
+    ,('deadband', numpy.float64, 0.0)
+    ,('alarm_level', numpy.int8, 0)
+    ,('valid', numpy.bool_, False)
+    ,('alarms_valid', numpy.bool_, False)
+    ,('alarm_values_read', numpy.bool_, False)
+]
+
+class SensorStore():
+    """
+    Array-backed sensor state for one crate
+    """
+
+    def __init__(self, capacity = 64, alarm_level = 0, history_length = 0):
+        """
+        SensorStore initializer
+
+        Args:
+            capacity (int): initial number of rows. The store grows as
+                needed.
+            alarm_level (int): initial alarm level of a sensor
+            history_length (int): number of readings kept for each sensor
+
+        Returns:
+            Nothing
+        """
+
+        self.defaults = dict((name, default) for name, dtype, default in COLUMNS)
+        self.defaults['alarm_level'] = alarm_level
+
+        # Row index of each sensor, and the key of each row
+        self.index = {}
+        self.keys = []
+
+        for name, dtype, default in COLUMNS:
+            setattr(self, name, numpy.full(capacity, self.defaults[name], dtype=dtype))
+
+        # Reading history: value and time of each reading, and the position
+        # of the next reading in each row
+        self.history_length = history_length
+        self.history = numpy.full((capacity, history_length), numpy.nan)
+        self.history_time = numpy.full((capacity, history_length), numpy.nan)
+        self.history_pos = numpy.zeros(capacity, dtype=numpy.intp)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key):
+        """
+        Get the row of a sensor, adding one if it is new, and set the row
+        to its initial state. The reading history of a sensor is kept, so
+        that it carries on across a card rescan.
+
+        Args:
+            key (tuple): (bus, slot, sensor type)
+
+        Returns:
+            row index (int)
+        """
+
+        index = self.index.get(key)
+        if index is None:
+            index = len(self.keys)
+            if index == len(self.value):
+                self.grow()
+            self.index[key] = index
+            self.keys.append(key)
+
+        for name, dtype, default in COLUMNS:
+            getattr(self, name)[index] = self.defaults[name]
+        return index
+
+    def grow(self):
+        """
+        Double the number of rows
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        for name, dtype, default in COLUMNS:
+            column = getattr(self, name)
+            grown = numpy.full(2 * len(column), self.defaults[name], dtype=dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+        rows = len(self.history)
+        for name in ['history', 'history_time']:
+            grown = numpy.full((2 * rows, self.history_length), numpy.nan)
+            grown[:rows] = getattr(self, name)
+            setattr(self, name, grown)
+        grown = numpy.zeros(2 * rows, dtype=numpy.intp)
+        grown[:rows] = self.history_pos
+        self.history_pos = grown
+
+    def add_reading(self, index, value, timestamp):
+        """
+        Add a reading to the history of a sensor, replacing the oldest one
+
+        Args:
+            index (int): sensor row
+            value (float): reading
+            timestamp (float): time of the reading
+
+        Returns:
+            Nothing
+        """
+
+        if self.history_length == 0:
+            return
+        pos = self.history_pos[index]
+        self.history[index, pos] = value
+        self.history_time[index, pos] = timestamp
+        self.history_pos[index] = (pos + 1) % self.history_length
+
+    def get_history(self, index):
+        """
+        Get the reading history of a sensor, oldest first
+
+        Args:
+            index (int): sensor row
+
+        Returns:
+            (values, times) numpy arrays. Slots not yet filled are left out.
+        """
+
+        order = numpy.roll(numpy.arange(self.history_length), -self.history_pos[index])
+        times = self.history_time[index, order]
+        filled = ~numpy.isnan(times)
+        return self.history[index, order][filled], times[filled]
+
+    def history_stats(self, index, since):
+        """
+        Get the minimum, maximum and mean of the readings of a sensor
+        since a given time
+
+        Args:
+            index (int): sensor row
+            since (float): start of the window
+
+        Returns:
+            (min, max, mean), or None if there are no readings in the window
+        """
+
+        with numpy.errstate(invalid='ignore'):
+            window = self.history_time[index] >= since
+        values = self.history[index, window]
+        values = values[~numpy.isnan(values)]
+        if len(values) == 0:
+            return None
+        return float(values.min()), float(values.max()), float(values.mean())
+
+    def snapshot(self):
+        """
+        Copy the state of every sensor in the crate
+
+        Args:
+            None
+
+        Returns:
+            dict of arrays, one per field, in row order
+        """
+
+        rows = len(self.keys)
+        return dict((name, getattr(self, name)[:rows].copy())
+                for name, dtype, default in COLUMNS)
+
+
+def store_property(name, convert):
+    """
+    Property reading and writing one field of a sensor in its store
+    """
+
+    def get(self):
+        return convert(getattr(self.store, name)[self.index])
+
+    def set(self, value):
+        getattr(self.store, name)[self.index] = value
+
+    return property(get, set)
@@ -0,0 +1,268 @@
+# File: shell_session.py
+# Date: 2026-10-17
+#
+# Description:
+# One ipmitool shell process and the thread that reads its output.
+#
+# Every connection to the MCH gets a new session with its own generation
+# number, process, pipes and reader thread, so nothing is shared between a
+# session that is being torn down and the one that replaces it. The reader
+# waits on the output pipe and a wake-up pipe with a selector, rather than
+# blocking in readline(), so closing a session stops its thread at once and
+# every pipe is closed: nothing is left behind however often the MCH drops
+# out.
+#
+# The session counts every prompt the shell prints, so a request that times
+# out doesn't have to cost the session: when the late output of a slow
+# command turns up, it is recognised as belonging to the earlier request and
+# dropped, and the next request picks up at its own first prompt.
+
+import itertools
+import os
+import selectors
+import subprocess
+import threading
+import time
+
+# Time allowed for the shell to exit after it is told to, before it is
+# killed (s)
+EXIT_TIMEOUT = 0.1
+
+_generations = itertools.count(1)
+
+class ShellRequest():
+    """
+    Request in progress on the ipmitool shell. The reader thread collects
+    the output lines and signals completion once the expected number of
+    prompts has been seen.
+    """
+
+    def __init__(self, expected_prompts, start):
+        """
+        ShellRequest initializer
+
+        Args:
+            expected_prompts (int): prompts that mark the end of the output
+            start (int): prompts owed to earlier requests, whose output
+                comes before this one's
+
+        Returns:
+            Nothing
+        """
+
+        self.expected_prompts = expected_prompts
+        self.start = start
+        self.prompt_count = 0
+        self.lines = []
+        # Time that each prompt arrived
+        self.times = []
+        self.done = threading.Event()
+
+    def add_line(self, line, prompts):
+        """
+        Add a line of shell output to the request
+
+        Args:
+            line (str): line of output
+            prompts (int): prompts seen by the session up to and including
+                this line
+
+        Returns:
+            Nothing
+        """
+
+        if self.done.is_set() or prompts <= self.start:
+            # Late output of an earlier request
+            return
+        self.lines.append(line)
+        if prompts - self.start > self.prompt_count:
+            self.times.append(time.time())
+        self.prompt_count = prompts - self.start
+        if self.prompt_count >= self.expected_prompts:
+            self.done.set()
+
+    def wait(self, timeout):
+        """
+        Wait for the request to complete
+
+        Args:
+            timeout (float): time to wait (s)
+
+        Returns:
+            True if all output was received
+        """
+
+        self.done.wait(timeout)
+        return self.prompt_count >= self.expected_prompts
+
+
+class ShellSession():
+    """
+    An ipmitool shell process with a selector-based reader thread
+    """
+
+    def __init__(self, command, env, prompt, stderr = subprocess.DEVNULL):
+        """
+        Start the shell and its reader thread
+
+        Args:
+            command (list): ipmitool command, ending in 'shell'
+            env (dict): environment for the process
+            prompt (str): shell prompt
+            stderr (file, optional): where to send the shell's errors
+
+        Returns:
+            Nothing
+        """
+
+        self.generation = next(_generations)
+        self.prompt = prompt
+        self.request = None
+        self.closed = False
+        # Prompts printed by the shell so far, and prompts expected for all
+        # the commands written to it
+        self.prompts_seen = 0
+        self.prompts_owed = 0
+        self.lock = threading.Lock()
+
+        self.process = subprocess.Popen(
+                command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=stderr,
+                env=env)
+
+        # Writing to this pipe wakes the reader thread to stop it
+        self.wake_read, self.wake_write = os.pipe()
+
+        self.thread = threading.Thread(
+                target=self.read_output,
+                name='ipmitool shell {}'.format(self.generation))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def alive(self):
+        """
+        Check that the shell and its reader are still running
+
+        Args:
+            None
+
+        Returns:
+            True if the session can take requests
+        """
+
+        return (not self.closed
+                and self.process.poll() is None
+                and self.thread.is_alive())
+
+    def read_output(self):
+        """
+        Reader thread. Passes each line of output to the request in
+        progress, until the shell exits or the session is closed.
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        stdout = self.process.stdout.fileno()
+        pending = b''
+        with selectors.DefaultSelector() as selector:
+            selector.register(stdout, selectors.EVENT_READ)
+            selector.register(self.wake_read, selectors.EVENT_READ)
+            while True:
+                events = selector.select()
+                if any(key.fd == self.wake_read for key, mask in events):
+                    break
+                data = os.read(stdout, 65536)
+                if not data:
+                    break
+                # Only pass on whole lines, as readline() would. A prompt
+                # is followed by the echo of the next command.
+                lines = (pending + data).split(b'\n')
+                pending = lines.pop()
+                request = self.request
+                for line in lines:
+                    line = line.decode('ascii', 'replace') + '\n'
+                    if self.prompt in line:
+                        self.prompts_seen += 1
+                    if request is not None:
+                        request.add_line(line, self.prompts_seen)
+
+        # The shell has exited or the session is closing. Wake up any
+        # waiting request.
+        request = self.request
+        if request is not None:
+            request.done.set()
+
+    def send(self, commands, expected_prompts, timeout):
+        """
+        Write commands to the shell and wait for the output
+
+        Args:
+            commands (str): commands, one per line
+            expected_prompts (int): prompts that mark the end of the output
+            timeout (float): time to wait (s)
+
+        Returns:
+            (lines, times, complete): the output lines received, the time
+            each prompt arrived, and whether all of the output arrived in
+            time. The prompts in the lines show how far the shell got.
+        """
+
+        request = ShellRequest(expected_prompts, self.prompts_owed)
+        self.prompts_owed += expected_prompts
+        self.request = request
+        try:
+            self.process.stdin.write(commands.encode('ascii'))
+            self.process.stdin.flush()
+            complete = request.wait(timeout)
+            return list(request.lines), list(request.times), complete
+        finally:
+            self.request = None
+
+    def close(self):
+        """
+        Stop the shell and the reader thread, and close every pipe. Safe to
+        call more than once.
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+
+        try:
+            os.write(self.wake_write, b'x')
+        except OSError:
+            pass
+
+        self.process.terminate()
+        try:
+            self.process.wait(EXIT_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+        if self.thread is not threading.current_thread():
+            self.thread.join()
+
+        for pipe in [self.process.stdin, self.process.stdout]:
+            try:
+                pipe.close()
+            except (OSError, ValueError):
+                pass
+        for fd in [self.wake_read, self.wake_write]:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
@@ -0,0 +1,156 @@
+# File: threshold_cache.py
+# Date: 2026-10-17
+#
+# Description:
+# Persistent cache of sensor alarm thresholds.
+#
+# Reading the thresholds of a sensor takes a round trip to the MCH, and a
+# card has tens of sensors, so reading them all after a rescan or crate
+# reset delays the alarm limits of every card. Thresholds are set by the
+# card firmware, so they are cached by card type (the FRU name the MCH
+# reports) and sensor name, and shared by all cards of the same type in all
+# crates.
+
+import json
+import os
+import tempfile
+import threading
+
+THRESHOLD_CACHE_FILE = 'mtca_threshold_cache.json'
+
+class ThresholdCache():
+    """
+    On-disk threshold cache, loaded once and written back when it changes
+    """
+
+    def __init__(self, path = None):
+        """
+        ThresholdCache initializer
+
+        Args:
+            path (str, optional): cache file. Defaults to
+                THRESHOLD_CACHE_FILE in $MTCA_CACHE_DIR, or the system
+                temporary directory.
+
+        Returns:
+            Nothing
+        """
+
+        if path is None:
+            cache_dir = os.environ.get('MTCA_CACHE_DIR', tempfile.gettempdir())
+            path = os.path.join(cache_dir, THRESHOLD_CACHE_FILE)
+        self.path = path
+        self.entries = None
+        self.changed = False
+        self.lock = threading.Lock()
+
+    def read_entries(self):
+        """
+        Read the cache file, if it hasn't been read already
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        if self.entries is not None:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f)
+        except (IOError, OSError, ValueError):
+            # Missing or corrupt cache. Start again.
+            self.entries = {}
+
+    def get(self, product, name):
+        """
+        Get the cached thresholds of a sensor
+
+        Args:
+            product (str): card type (FRU name)
+            name (str): sensor name
+
+        Returns:
+            dict of thresholds keyed by alarm field (lolo, low, high, hihi),
+            or None if they are not cached
+        """
+
+        with self.lock:
+            self.read_entries()
+            thresholds = self.entries.get(product, {}).get(name)
+        if thresholds is None:
+            return None
+        return dict(thresholds)
+
+    def put(self, product, name, thresholds):
+        """
+        Store the thresholds of a sensor. The file is written by save.
+
+        Args:
+            product (str): card type (FRU name)
+            name (str): sensor name
+            thresholds (dict): thresholds keyed by alarm field
+
+        Returns:
+            Nothing
+        """
+
+        with self.lock:
+            self.read_entries()
+            sensors = self.entries.setdefault(product, {})
+            if sensors.get(name) != thresholds:
+                sensors[name] = dict(thresholds)
+                self.changed = True
+
+    def forget(self, product, name = None):
+        """
+        Drop the cached thresholds of a card type, or of one of its
+        sensors, so that they are read from the MCH again
+
+        Args:
+            product (str): card type (FRU name)
+            name (str, optional): sensor name. All sensors by default.
+
+        Returns:
+            Nothing
+        """
+
+        with self.lock:
+            self.read_entries()
+            sensors = self.entries.get(product)
+            if sensors is None:
+                return
+            if name is None:
+                del self.entries[product]
+                self.changed = True
+            elif name in sensors:
+                del sensors[name]
+                self.changed = True
+
+    def save(self):
+        """
+        Write the cache file if anything has changed since it was read
+
+        Args:
+            None
+
+        Returns:
+            Nothing
+        """
+
+        with self.lock:
+            if not self.changed:
+                return
+            self.changed = False
+
+            # Write to a temporary file first so that a crash can't leave a
+            # half written cache behind
+            tmp_path = '{}.{}'.format(self.path, os.getpid())
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump(self.entries, f)
+                os.replace(tmp_path, self.path)
+            except (IOError, OSError) as e:
+                print('ThresholdCache.save: could not write {}: {}'.format(self.path, e))
@@ -0,0 +1,247 @@
+# File: threshold_policy.py
+# Date: 2026-10-17
+#
+# Description:
+# Declarative sensor threshold policy.
+#
+# A policy is a list of rules. Each rule picks sensors by bus, card name and
+# sensor name, and gives some or all of their six IPMI thresholds (lnr, lcr,
+# lnc, unc, ucr, unr). Where several rules pick the same sensor, the later
+# rules override the thresholds they give. Policies are kept in JSON files:
+#
+#   {"rules": [
+#       {"bus": "cu", "sensor": "Fan", "thresholds": {"lcr": 500, "ucr": 4000}}
+#   ]}
+#
+# "bus" is a bus name (see mtca_core.BUS_IDS), and "fru" and "sensor" are
+# regular expressions matched at the start of the card and sensor names.
+# Any of the three can be left out to match everything. "tolerance" is the
+# difference from a threshold that still counts as set, as the MCH rounds
+# thresholds to the sensor's resolution. By default it is DEFAULT_TOLERANCE
+# of the threshold.
+#
+# The same policy is used to provision the MCHs (see provisioning.py) and
+# for the alarm limits of the IOC records.
+
+import json
+import re
+
+# IPMI thresholds, in the order of the Get/Set Sensor Thresholds commands
+THRESHOLD_NAMES = ['lnc', 'lcr', 'lnr', 'unc', 'ucr', 'unr']
+
+# Thresholds set together by 'ipmitool sensor thresh <id> lower|upper',
+# in the order it takes them
+THRESHOLD_GROUPS = {
+    'lower': ['lnr', 'lcr', 'lnc']
+    ,'upper': ['unc', 'ucr', 'unr']
+}
+
+# Descriptions of the thresholds in 'ipmitool sensor get'
+THRESHOLD_DESCRIPTIONS = {
+    'Lower Non-Recoverable': 'lnr'
+    ,'Lower Critical': 'lcr'
+    ,'Lower Non-Critical': 'lnc'
+    ,'Upper Non-Critical': 'unc'
+    ,'Upper Critical': 'ucr'
+    ,'Upper Non-Recoverable': 'unr'
+}
+
+# Default tolerance, as a fraction of the threshold
+DEFAULT_TOLERANCE = 0.01
+
+class PolicyError(Exception):
+    """
+    Policy that can't be used
+    """
+    pass
+
+
+class ThresholdRule():
+    """
+    One rule of a policy
+    """
+
+    def __init__(self, rule, bus_ids):
+        """
+        ThresholdRule initializer
+
+        Args:
+            rule (dict): rule as in the policy file
+            bus_ids (dict): bus numbers, keyed by bus name
+
+        Returns:
+            Nothing
+
+        Raises:
+            PolicyError: the rule is not valid
+        """
+
+        unknown = set(rule.keys()) - set(['bus', 'fru', 'sensor', 'thresholds', 'tolerance'])
+        if unknown:
+            raise PolicyError('unknown rule fields {}'.format(', '.join(sorted(unknown))))
+
+        self.bus = None
+        if rule.get('bus') is not None:
+            if rule['bus'] not in bus_ids:
+                raise PolicyError('unknown bus {}'.format(rule['bus']))
+            self.bus = bus_ids[rule['bus']]
+
+        try:
+            self.fru = re.compile(rule.get('fru', ''))
+            self.sensor = re.compile(rule.get('sensor', ''))
+        except re.error as e:
+            raise PolicyError('bad pattern: {}'.format(e))
+
+        self.thresholds = {}
+        for name, value in rule.get('thresholds', {}).items():
+            if name not in THRESHOLD_NAMES:
+                raise PolicyError('unknown threshold {}'.format(name))
+            try:
+                self.thresholds[name] = float(value)
+            except (TypeError, ValueError):
+                raise PolicyError('bad value for {}: {}'.format(name, value))
+        self.tolerance = rule.get('tolerance')
+
+    def matches(self, bus, fru_name, sensor_name):
+        """
+        Check whether the rule picks a sensor
+
+        Args:
+            bus (int): bus number of the card
+            fru_name (str): card name
+            sensor_name (str): sensor name
+
+        Returns:
+            True if it does
+        """
+
+        return ((self.bus is None or self.bus == bus)
+                and self.fru.match(fru_name or '') is not None
+                and self.sensor.match(sensor_name) is not None)
+
+
+class ThresholdPolicy():
+    """
+    Thresholds wanted for the sensors of a crate
+    """
+
+    def __init__(self, rules, bus_ids):
+        """
+        ThresholdPolicy initializer
+
+        Args:
+            rules (list): rules, as dicts (see the file description)
+            bus_ids (dict): bus numbers, keyed by bus name
+
+        Returns:
+            Nothing
+
+        Raises:
+            PolicyError: a rule is not valid
+        """
+
+        self.rules = []
+        for index, rule in enumerate(rules):
+            try:
+                self.rules.append(ThresholdRule(rule, bus_ids))
+            except PolicyError as e:
+                raise PolicyError('rule {}: {}'.format(index + 1, e))
+
+    def thresholds(self, bus, fru_name, sensor_name):
+        """
+        Get the thresholds wanted for a sensor
+
+        Args:
+            bus (int): bus number of the card
+            fru_name (str): card name
+            sensor_name (str): sensor name
+
+        Returns:
+            dict of thresholds keyed by IPMI threshold name, empty if the
+            policy doesn't cover the sensor
+        """
+
+        thresholds = {}
+        for rule in self.rules:
+            if rule.matches(bus, fru_name, sensor_name):
+                thresholds.update(rule.thresholds)
+        return thresholds
+
+    def tolerance(self, bus, fru_name, sensor_name, threshold, value):
+        """
+        Get the difference from a wanted threshold that still counts as set
+
+        Args:
+            bus (int): bus number of the card
+            fru_name (str): card name
+            sensor_name (str): sensor name
+            threshold (str): IPMI threshold name
+            value (float): wanted value
+
+        Returns:
+            tolerance (float)
+        """
+
+        tolerance = None
+        for rule in self.rules:
+            if (rule.matches(bus, fru_name, sensor_name)
+                    and threshold in rule.thresholds
+                    and rule.tolerance is not None):
+                tolerance = float(rule.tolerance)
+        if tolerance is None:
+            tolerance = abs(value) * DEFAULT_TOLERANCE
+        return tolerance
+
+
+def load_policy(path, bus_ids, default = None):
+    """
+    Load a threshold policy file
+
+    Args:
+        path (str): policy file, or None to use the default
+        bus_ids (dict): bus numbers, keyed by bus name
+        default (list, optional): rules to use without a file
+
+    Returns:
+        ThresholdPolicy
+
+    Raises:
+        PolicyError: the file can't be read, or isn't a valid policy
+    """
+
+    if path is None:
+        return ThresholdPolicy(default or [], bus_ids)
+
+    try:
+        with open(path) as f:
+            policy = json.load(f)
+    except (OSError, ValueError) as e:
+        raise PolicyError('{}: {}'.format(path, e))
+    if not isinstance(policy, dict) or not isinstance(policy.get('rules'), list):
+        raise PolicyError('{}: no list of rules'.format(path))
+    try:
+        return ThresholdPolicy(policy['rules'], bus_ids)
+    except PolicyError as e:
+        raise PolicyError('{}: {}'.format(path, e))
+
+
+def threshold_changes(wanted, current, same):
+    """
+    Find the thresholds that need setting
+
+    Args:
+        wanted (dict): wanted thresholds, keyed by IPMI threshold name
+        current (dict): thresholds read from the MCH. Thresholds that
+            can't be read are left out.
+        same (callable): takes the threshold name, wanted and current
+            value, and returns True if they count as the same
+
+    Returns:
+        dict of thresholds to set, keyed by IPMI threshold name
+    """
+
+    changes = {}
+    for name, value in wanted.items():
+        if name not in current or not same(name, value, current[name]):
+            changes[name] = value
+    return changes
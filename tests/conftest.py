@@ -0,0 +1,22 @@
+# File: conftest.py
+# Date: 2026-10-17
+#
+# Description:
+# Make the crate core and the tools importable from the tests, and give
+# them the environment the IOC would have.
+
+import os
+import sys
+import tempfile
+
+TOP = os.path.realpath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(TOP, 'mtcaSensorsApp', 'src')
+SCRIPT_DIR = os.path.join(TOP, 'mtcaSensorsApp', 'script')
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+for path in (SRC_DIR, SCRIPT_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+os.environ.setdefault('TOP', TOP)
+os.environ.setdefault('MTCA_CACHE_DIR', tempfile.mkdtemp(prefix='mtca_test_'))
@@ -0,0 +1,125 @@
+# File: test_connection_supervisor.py
+# Date: 2026-10-17
+#
+# Description:
+# Tests of the reconnection backoff, and of single connection attempts of
+# ConnectionSupervisor against a scripted MCH.
+
+import random
+import unittest
+
+from connection_supervisor import ConnectionSupervisor, Backoff, CONN_STATES
+
+class BackoffTest(unittest.TestCase):
+
+    def test_doubles_up_to_maximum(self):
+        backoff = Backoff(initial = 1.0, maximum = 10.0, jitter = 0.0)
+        self.assertEqual([backoff.next() for attempt in range(6)],
+                [1.0, 2.0, 4.0, 8.0, 10.0, 10.0])
+
+    def test_factor(self):
+        backoff = Backoff(initial = 0.5, maximum = 100.0, factor = 3.0, jitter = 0.0)
+        self.assertEqual([backoff.next() for attempt in range(3)], [0.5, 1.5, 4.5])
+
+    def test_reset(self):
+        backoff = Backoff(initial = 1.0, maximum = 10.0, jitter = 0.0)
+        for attempt in range(3):
+            backoff.next()
+        backoff.reset()
+        self.assertEqual(backoff.next(), 1.0)
+
+    def test_jitter(self):
+        random.seed(1)
+        backoff = Backoff(initial = 10.0, maximum = 10.0, jitter = 0.2)
+        delays = [backoff.next() for attempt in range(200)]
+        self.assertTrue(all(8.0 <= delay <= 12.0 for delay in delays))
+        # Crates retrying together spread out
+        self.assertGreater(max(delays) - min(delays), 2.0)
+
+
+class ScriptedMCH():
+    """
+    MCH whose probe and connection results are given in advance
+    """
+
+    def __init__(self, probes, connects):
+        self.probes = list(probes)
+        self.connects = list(connects)
+        self.up = False
+        self.connect_calls = 0
+        self.on_connect_calls = 0
+        self.changes = 0
+
+    def probe(self):
+        return self.probes.pop(0)
+
+    def connect(self):
+        self.connect_calls += 1
+        result = self.connects.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        self.up = result
+        return result
+
+    def on_connect(self):
+        self.on_connect_calls += 1
+
+    def on_change(self):
+        self.changes += 1
+
+    def supervisor(self):
+        return ConnectionSupervisor(
+                'test',
+                connected = lambda: self.up,
+                probe = self.probe,
+                connect = self.connect,
+                on_connect = self.on_connect,
+                on_change = self.on_change,
+                backoff = Backoff(initial = 0.001, maximum = 0.004, jitter = 0.0))
+
+
+class ConnectionSupervisorTest(unittest.TestCase):
+
+    def test_attempts_back_off_until_connected(self):
+        mch = ScriptedMCH(
+                probes = [False, True, True, True],
+                connects = [False, OSError('connection refused'), True])
+        supervisor = mch.supervisor()
+
+        for attempt in range(3):
+            supervisor.attempt()
+            self.assertEqual(supervisor.state, CONN_STATES.index('DISCONNECTED'))
+            self.assertEqual(supervisor.attempts, attempt + 1)
+        self.assertAlmostEqual(supervisor.retry_delay, 0.004)
+        # A failed probe doesn't try to connect, and an exception counts
+        # as a failed attempt
+        self.assertEqual(mch.connect_calls, 2)
+        self.assertEqual(mch.on_connect_calls, 0)
+
+        supervisor.attempt()
+        self.assertEqual(supervisor.state, CONN_STATES.index('CONNECTED'))
+        self.assertEqual(mch.on_connect_calls, 1)
+        self.assertEqual((supervisor.attempts, supervisor.retry_delay), (0, 0.0))
+        self.assertEqual(supervisor.backoff.delay, 0.001)
+        self.assertGreater(mch.changes, 0)
+
+    def test_failure_in_on_connect(self):
+        mch = ScriptedMCH(probes = [True], connects = [True])
+
+        def on_connect():
+            raise ValueError('bad card list')
+
+        supervisor = mch.supervisor()
+        supervisor.on_connect = on_connect
+        supervisor.attempt()
+        self.assertEqual(supervisor.state, CONN_STATES.index('DISCONNECTED'))
+        self.assertEqual(supervisor.attempts, 1)
+
+    def test_stop(self):
+        mch = ScriptedMCH(probes = [], connects = [])
+        supervisor = mch.supervisor()
+        supervisor.stop()
+        # A stopped supervisor doesn't start, and doesn't wait
+        supervisor.start()
+        self.assertIsNone(supervisor.thread)
+        self.assertTrue(supervisor.wait(10.0))
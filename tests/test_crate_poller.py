@@ -0,0 +1,113 @@
+# File: test_crate_poller.py
+# Date: 2026-10-17
+#
+# Description:
+# Tests of CratePoller: one scan per crate at a time, a worker for every
+# crate, so that a crate whose scan blocks doesn't hold up the others, and
+# no scans after stop().
+
+import os
+import threading
+import unittest
+
+from crate_poller import CratePoller
+
+# Time allowed for a scan to start (s)
+WAIT = 5.0
+
+class CratePollerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.poller = CratePoller()
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.poller.stop()
+
+    def blocking_scan(self, started):
+        def scan():
+            started.set()
+            self.release.wait(WAIT)
+        return scan
+
+    def test_one_scan_per_crate(self):
+        started = threading.Event()
+        self.assertTrue(self.poller.submit('crate1', self.blocking_scan(started)))
+        self.assertTrue(started.wait(WAIT))
+        self.assertFalse(self.poller.submit('crate1', self.blocking_scan(threading.Event())))
+
+        # Once the scan has finished, the crate can be scanned again
+        self.release.set()
+        done = threading.Event()
+        for attempt in range(100):
+            if self.poller.submit('crate1', done.set):
+                break
+            done.wait(0.05)
+        self.assertTrue(done.wait(WAIT))
+
+    def test_blocked_crates_dont_delay_others(self):
+        # More crates than the default pool of a ThreadPoolExecutor, each
+        # with a scan and a PET read that block until released
+        keys = []
+        for index in range((os.cpu_count() or 1) + 8):
+            keys.append('crate{}'.format(index))
+            keys.append(('alert', 'crate{}'.format(index)))
+        events = [threading.Event() for key in keys]
+        self.poller.register(*keys)
+        for key, started in zip(keys, events):
+            self.assertTrue(self.poller.submit(key, self.blocking_scan(started)))
+        for key, started in zip(keys, events):
+            self.assertTrue(started.wait(WAIT), key)
+        self.assertEqual(self.poller.workers, len(keys))
+
+    def test_fixed_workers(self):
+        self.poller = CratePoller(max_workers = 1)
+        first = threading.Event()
+        second = threading.Event()
+        self.poller.submit('crate1', self.blocking_scan(first))
+        self.poller.submit('crate2', self.blocking_scan(second))
+        self.assertTrue(first.wait(WAIT))
+        self.assertFalse(second.wait(0.2))
+        self.release.set()
+        self.assertTrue(second.wait(WAIT))
+
+    def test_pool_sized_once(self):
+        self.poller.register('crate1', 'crate2')
+        self.assertTrue(self.poller.start())
+        executor = self.poller.executor
+        for key in ('crate1', 'crate2', 'crate3'):
+            self.poller.submit(key, self.blocking_scan(threading.Event()))
+        self.assertIs(self.poller.executor, executor)
+        self.assertEqual(self.poller.workers, 2)
+
+    def test_no_scans_after_stop(self):
+        self.poller.stop()
+        done = threading.Event()
+        self.assertFalse(self.poller.submit('crate1', done.set))
+        self.assertFalse(self.poller.start())
+        self.assertFalse(done.wait(0.2))
+        self.assertIsNone(self.poller.thread)
+
+    def test_stop_while_submitting(self):
+        keys = ['crate{}'.format(index) for index in range(8)]
+        self.poller.register(*keys)
+        errors = []
+        start = threading.Barrier(len(keys) + 1)
+
+        def submit(key):
+            start.wait()
+            try:
+                for attempt in range(200):
+                    self.poller.submit(key, lambda: None)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=submit, args=(key,)) for key in keys]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        self.poller.stop()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
@@ -0,0 +1,335 @@
+# File: test_ipmi_lan.py
+# Date: 2026-10-17
+#
+# Description:
+# Tests of the native IPMI LAN client against a fake MCH on a local UDP
+# socket. The fake checks the framing of every request (RMCP and session
+# headers, IPMB checksums, bridged Send Message) and answers with canned
+# response frames, so the whole RMCP path of IPMILanSession is exercised.
+
+import socket
+import struct
+import threading
+import unittest
+
+import ipmi_lan
+from ipmi_lan import (IPMILanSession, IPMIError, IPMITimeout, checksum,
+        NETFN_APP, NETFN_STORAGE, NETFN_SENSOR, BMC_SLAVE_ADDR, REMOTE_SWID,
+        CMD_GET_CHANNEL_AUTH_CAP, CMD_GET_SESSION_CHALLENGE,
+        CMD_ACTIVATE_SESSION, CMD_SET_SESSION_PRIV, CMD_CLOSE_SESSION,
+        CMD_RESERVE_SDR_REPO, CMD_GET_SDR, CMD_GET_SENSOR_READING,
+        CMD_SEND_MESSAGE, SDR_FULL_SENSOR, SDR_COMPACT_SENSOR,
+        SDR_FRU_LOCATOR, decode_sdr)
+
+TEMP_SESSION_ID = 0x11223344
+SESSION_ID = 0x55667788
+INITIAL_INBOUND_SEQ = 0x10
+CHALLENGE = bytes(range(16))
+RESERVATION = 0x0042
+
+# Completion code for a sensor that isn't there
+CC_NOT_PRESENT = 0xcb
+
+def sdr_header(record_id, record_type, body):
+    return struct.pack('<HBBB', record_id, 0x51, record_type, len(body)) + bytes(body)
+
+def full_sensor_sdr(record_id, owner, channel, lun, number, entity, instance,
+        name, m, b, b_exp, r_exp, units, analog_format = 0, sensor_type = 0x02):
+    """
+    Full sensor record, laid out by absolute offset in the record
+    """
+
+    data = bytearray(48)
+    data[5] = owner
+    data[6] = (channel << 4) | lun
+    data[7] = number
+    data[8] = entity
+    data[9] = instance
+    data[12] = sensor_type
+    data[13] = 0x01              # threshold event/reading type
+    data[20] = analog_format << 6
+    data[21] = units
+    data[23] = 0                 # linear
+    data[24] = m & 0xff
+    data[25] = (m >> 2) & 0xc0
+    data[26] = b & 0xff
+    data[27] = (b >> 2) & 0xc0
+    data[29] = ((r_exp & 0x0f) << 4) | (b_exp & 0x0f)
+    data[47] = 0xc0 | len(name)
+    data += name.encode()
+    return sdr_header(record_id, SDR_FULL_SENSOR, data[5:])
+
+def compact_sensor_sdr(record_id, owner, number, entity, instance, name):
+    data = bytearray(32)
+    data[5] = owner
+    data[7] = number
+    data[8] = entity
+    data[9] = instance
+    data[12] = 0xf2              # module hot swap
+    data[13] = 0x6f
+    data[31] = 0xc0 | len(name)
+    data += name.encode()
+    return sdr_header(record_id, SDR_COMPACT_SENSOR, data[5:])
+
+def fru_locator_sdr(record_id, entity, instance, name):
+    data = bytearray(16)
+    data[12] = entity
+    data[13] = instance
+    data[15] = 0xc0 | len(name)
+    data += name.encode()
+    return sdr_header(record_id, SDR_FRU_LOCATOR, data[5:])
+
+SDRS = [
+    fru_locator_sdr(0, 193, 101, 'AMC1')
+    # 12 V on the AMC IPMC, reached through the MCH on IPMB-L (channel 7)
+    ,full_sensor_sdr(1, 0x7a, 7, 0, 5, 193, 101, '12 V PP',
+        m = 6, b = 0, b_exp = 0, r_exp = -2, units = 4)
+    # Temperature on the MCH itself, 2's complement with an offset
+    ,full_sensor_sdr(2, BMC_SLAVE_ADDR, 0, 0, 9, 194, 97, 'Temp CPU',
+        m = 1, b = 5, b_exp = 1, r_exp = 0, units = 1, analog_format = 2)
+    ,compact_sensor_sdr(3, 0x7a, 6, 193, 101, 'HS 001 AMC1')
+]
+
+# Raw readings, keyed by (IPMB address, sensor number): (raw, flags, states)
+READINGS = {
+    (0x7a, 5): (200, 0xc0, 0x00)
+    ,(BMC_SLAVE_ADDR, 9): (0xf6, 0xc0, 0x08)
+    ,(0x7a, 6): (0, 0xc0, 0x04)
+}
+
+def ipmb_message(rs_addr, netfn, rq_addr, seq, cmd, data):
+    header = bytes([rs_addr, netfn << 2])
+    body = bytes([rq_addr, seq << 2, cmd]) + bytes(data)
+    return header + bytes([checksum(header)]) + body + bytes([checksum(body)])
+
+
+class FakeMCH():
+    """
+    Fake MCH answering one IPMI v1.5 session with no authentication
+    """
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.port = self.sock.getsockname()[1]
+        # (auth type, session seq, session ID, netfn, cmd, data) of each
+        # request, with bridged requests recorded as their inner request
+        # plus the channel
+        self.requests = []
+        self.errors = []
+        self.outbound_seq = 0
+        # Commands not to answer, to test timeouts
+        self.silent = set()
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def close(self):
+        self.sock.close()
+
+    def check(self, condition, message):
+        if not condition:
+            self.errors.append(message)
+        return condition
+
+    def serve(self):
+        while True:
+            try:
+                packet, address = self.sock.recvfrom(1024)
+            except OSError:
+                return
+            packet = bytearray(packet)
+            self.check(packet[:4] == bytearray([6, 0, 0xff, 7]), 'bad RMCP header')
+            auth, session_seq, session_id = struct.unpack('<BII', bytes(packet[4:13]))
+            offset = 13 + (16 if auth else 0)
+            msg = packet[offset + 1:offset + 1 + packet[offset]]
+            self.check(checksum(msg[:2]) == msg[2], 'bad header checksum')
+            self.check(checksum(msg[3:-1]) == msg[-1], 'bad body checksum')
+            self.check(msg[0] == BMC_SLAVE_ADDR, 'request not for the MCH')
+            self.check(msg[3] == REMOTE_SWID, 'bad requester address')
+            netfn, seq, cmd, data = msg[1] >> 2, msg[4] >> 2, msg[5], bytes(msg[6:-1])
+            self.requests.append((auth, session_seq, session_id, netfn, cmd, data))
+
+            if cmd in self.silent:
+                continue
+            cc, response = self.answer(netfn, cmd, data, seq)
+            msg = ipmb_message(REMOTE_SWID, netfn + 1, BMC_SLAVE_ADDR, seq, cmd,
+                    bytes([cc]) + response)
+            self.outbound_seq += 1
+            self.sock.sendto(bytes([6, 0, 0xff, 7])
+                    + struct.pack('<BII', 0, self.outbound_seq, SESSION_ID)
+                    + bytes([len(msg)]) + msg, address)
+
+    def answer(self, netfn, cmd, data, seq):
+        if netfn == NETFN_APP and cmd == CMD_GET_CHANNEL_AUTH_CAP:
+            return 0, bytes([0x0e, 0x01, 0x17, 0, 0, 0, 0, 0])
+        if netfn == NETFN_APP and cmd == CMD_GET_SESSION_CHALLENGE:
+            return 0, struct.pack('<I', TEMP_SESSION_ID) + CHALLENGE
+        if netfn == NETFN_APP and cmd == CMD_ACTIVATE_SESSION:
+            self.check(data[2:18] == CHALLENGE, 'challenge not returned')
+            return 0, bytes([0]) + struct.pack('<II', SESSION_ID, INITIAL_INBOUND_SEQ) + bytes([4])
+        if netfn == NETFN_APP and cmd in (CMD_SET_SESSION_PRIV, CMD_CLOSE_SESSION):
+            return 0, bytes([4])
+        if netfn == NETFN_STORAGE and cmd == CMD_RESERVE_SDR_REPO:
+            return 0, struct.pack('<H', RESERVATION)
+        if netfn == NETFN_STORAGE and cmd == CMD_GET_SDR:
+            reservation, record_id, offset, count = struct.unpack('<HHBB', data)
+            if offset > 0 and not self.check(reservation == RESERVATION, 'bad reservation'):
+                return 0xc5, b''
+            next_id = record_id + 1 if record_id + 1 < len(SDRS) else 0xffff
+            return 0, struct.pack('<H', next_id) + SDRS[record_id][offset:offset + count]
+        if netfn == NETFN_SENSOR and cmd == CMD_GET_SENSOR_READING:
+            return self.reading(BMC_SLAVE_ADDR, data[0])
+        if netfn == NETFN_APP and cmd == CMD_SEND_MESSAGE:
+            return self.bridge(data, seq)
+        return 0xc1, b''
+
+    def reading(self, owner, number):
+        if (owner, number) not in READINGS:
+            return CC_NOT_PRESENT, b''
+        return 0, bytes(READINGS[(owner, number)]) + bytes([0x80])
+
+    def bridge(self, data, seq):
+        channel = data[0] & 0x0f
+        inner = bytearray(data[1:])
+        self.check(data[0] & 0x40, 'Send Message without tracking')
+        self.check(checksum(inner[:2]) == inner[2], 'bad bridged header checksum')
+        self.check(checksum(inner[3:-1]) == inner[-1], 'bad bridged body checksum')
+        self.check(inner[3] == BMC_SLAVE_ADDR, 'bad bridged requester address')
+        target, netfn, cmd = inner[0], inner[1] >> 2, inner[5]
+        inner_seq, inner_data = inner[4] >> 2, bytes(inner[6:-1])
+        self.check(inner_seq == seq, 'bridged sequence differs')
+        self.requests.append(('bridged', channel, target, netfn, cmd, inner_data))
+
+        if netfn == NETFN_SENSOR and cmd == CMD_GET_SENSOR_READING:
+            cc, response = self.reading(target, inner_data[0])
+        else:
+            cc, response = 0xc1, b''
+        # Answer inside the Send Message response, as most MCHs do
+        return 0, ipmb_message(BMC_SLAVE_ADDR, netfn + 1, target, inner_seq, cmd,
+                bytes([cc]) + response)
+
+
+class DecodeSDRTest(unittest.TestCase):
+
+    def test_logical_entity_instance(self):
+        # Bit 7 of the instance marks a device-relative instance, and
+        # isn't part of the FRU id
+        for sdr in (fru_locator_sdr(0, 193, 0xe5, 'AMC1'),
+                full_sensor_sdr(1, 0x7a, 7, 0, 5, 193, 0xe5, '12 V PP',
+                    m = 6, b = 0, b_exp = 0, r_exp = -2, units = 4),
+                compact_sensor_sdr(3, 0x7a, 6, 193, 0xe5, 'HS 001 AMC1')):
+            self.assertEqual(decode_sdr(sdr).fru_id, '193.101')
+
+
+class IPMILanSessionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mch = FakeMCH()
+        self.session = IPMILanSession('127.0.0.1', port = self.mch.port,
+                username = 'root', timeout = 0.5, retries = 1)
+        self.session.open()
+
+    def tearDown(self):
+        self.session.close()
+        self.mch.close()
+        self.assertEqual(self.mch.errors, [])
+
+    def test_session_activation(self):
+        requests = self.mch.requests
+        self.assertEqual([request[4] for request in requests[:4]], [
+            CMD_GET_CHANNEL_AUTH_CAP, CMD_GET_SESSION_CHALLENGE,
+            CMD_ACTIVATE_SESSION, CMD_SET_SESSION_PRIV])
+        # Outside a session until Activate Session, which uses the
+        # temporary session ID
+        self.assertEqual(requests[0][1:3], (0, 0))
+        self.assertEqual(requests[1][5][1:], b'root'.ljust(16, b'\x00'))
+        self.assertEqual(requests[2][1:3], (0, TEMP_SESSION_ID))
+        # Then the session ID and sequence numbers given by the MCH
+        self.assertEqual(requests[3][1:3], (INITIAL_INBOUND_SEQ, SESSION_ID))
+        self.assertEqual(self.session.session_id, SESSION_ID)
+
+    def test_sequence_numbers(self):
+        self.session.read_sdr_repository()
+        in_session = self.mch.requests[3:]
+        # Bridged requests are recorded twice, once by the inner request
+        outer = [request for request in in_session if request[0] != 'bridged']
+        self.assertEqual([request[1] for request in outer],
+                list(range(INITIAL_INBOUND_SEQ, INITIAL_INBOUND_SEQ + len(outer))))
+        self.assertTrue(all(request[2] == SESSION_ID for request in outer))
+
+    def test_read_sdr_repository(self):
+        records = self.session.read_sdr_repository()
+        self.assertEqual([record.name for record in records],
+                ['AMC1', '12 V PP', 'Temp CPU', 'HS 001 AMC1'])
+
+        fru, volts, temp, hot_swap = records
+        self.assertEqual(fru.record_type, SDR_FRU_LOCATOR)
+        self.assertEqual(fru.fru_id, '193.101')
+        self.assertFalse(fru.is_sensor)
+
+        self.assertEqual(volts.record_type, SDR_FULL_SENSOR)
+        self.assertEqual((volts.owner_id, volts.channel, volts.owner_lun, volts.number),
+                (0x7a, 7, 0, 5))
+        self.assertEqual(volts.fru_id, '193.101')
+        self.assertEqual((volts.m, volts.b, volts.b_exp, volts.r_exp), (6, 0, 0, -2))
+        self.assertEqual(volts.units, 'Volts')
+        self.assertTrue(volts.is_analog)
+
+        self.assertEqual(temp.owner_id, BMC_SLAVE_ADDR)
+        self.assertEqual((temp.m, temp.b, temp.b_exp, temp.r_exp), (1, 5, 1, 0))
+        self.assertEqual(temp.analog_format, ipmi_lan.ANALOG_2S_COMPLEMENT)
+        self.assertEqual(temp.units, 'degrees C')
+
+        self.assertEqual(hot_swap.record_type, SDR_COMPACT_SENSOR)
+        self.assertFalse(hot_swap.is_analog)
+        self.assertEqual(hot_swap.sensor_type, ipmi_lan.SENSOR_TYPE_MODULE_HOT_SWAP)
+
+        # The full records are longer than one chunk, so they are read in
+        # pieces under the reservation
+        offsets = [struct.unpack('<HHBB', request[5])[2] for request in self.mch.requests
+                if request[4] == CMD_GET_SDR and struct.unpack('<HHBB', request[5])[1] == 1]
+        self.assertEqual(offsets, [0, 5, 37])
+
+    def test_local_reading(self):
+        records = self.session.read_sdr_repository()
+        status, value = self.session.read_sensor(records[2])
+        # (-10 + 5 * 10) * 1, with the upper non-critical bit set
+        self.assertEqual(status, 'unc')
+        self.assertAlmostEqual(value, 40.0)
+        self.assertNotEqual(self.mch.requests[-1][0], 'bridged')
+
+    def test_bridged_reading(self):
+        records = self.session.read_sdr_repository()
+        status, value = self.session.read_sensor(records[1])
+        self.assertEqual(status, 'ok')
+        self.assertAlmostEqual(value, 12.0)
+        bridged = self.mch.requests[-1]
+        self.assertEqual(bridged[:5], ('bridged', 7, 0x7a, NETFN_SENSOR, CMD_GET_SENSOR_READING))
+        self.assertEqual(bridged[5], bytes([5]))
+
+        status, value = self.session.read_sensor(records[3])
+        self.assertEqual((status, value), ('lnr', 'Quiesced'))
+
+    def test_completion_code(self):
+        records = self.session.read_sdr_repository()
+        missing = records[1]
+        missing.number = 99
+        with self.assertRaises(IPMIError) as raised:
+            self.session.read_sensor(missing)
+        self.assertEqual(raised.exception.cc, CC_NOT_PRESENT)
+        self.assertNotIsInstance(raised.exception, IPMITimeout)
+
+        # The session is still usable after an error
+        status, value = self.session.read_sensor(records[2])
+        self.assertAlmostEqual(value, 40.0)
+
+    def test_timeout(self):
+        self.mch.silent.add(CMD_GET_SENSOR_READING)
+        records = self.session.read_sdr_repository()
+        with self.assertRaises(IPMITimeout):
+            self.session.read_sensor(records[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
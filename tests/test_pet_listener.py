@@ -0,0 +1,97 @@
+# File: test_pet_listener.py
+# Date: 2026-10-17
+#
+# Description:
+# Tests of the PET decoding: traps built by encode_pet, as an MCH sends
+# them, decode to the same event, and anything else is ignored. Also a
+# round trip through PETListener on a local UDP port.
+
+import queue
+import socket
+import unittest
+
+from pet_listener import (PETListener, PET_ENTERPRISE, decode_pet, encode_pet,
+        encode_oid)
+from sel_reader import EVENT_TYPE_THRESHOLD, SENSOR_TYPE_FRU_HOT_SWAP
+
+# Time allowed for a trap to arrive (s)
+WAIT = 5.0
+
+class DecodePETTest(unittest.TestCase):
+
+    def test_threshold_event(self):
+        packet = encode_pet('192.168.1.41', 0x01, EVENT_TYPE_THRESHOLD, 9,
+                sensor_device = 0x7b, sensor_number = 5, entity = '193.101',
+                severity = 0x10, sequence = 7, timestamp = 1700000000)
+        alert = decode_pet(packet, source = '10.0.0.1')
+        self.assertEqual(alert.agent, '192.168.1.41')
+        self.assertEqual((alert.sensor_type, alert.event_type, alert.offset),
+                (0x01, EVENT_TYPE_THRESHOLD, 9))
+        self.assertTrue(alert.asserted)
+        self.assertEqual(alert.threshold, 'ucr')
+        self.assertEqual(alert.fru_id, '193.101')
+        self.assertEqual(alert.sensor_key, (0x7a, 0, 5))
+        self.assertEqual((alert.severity, alert.sequence, alert.timestamp),
+                (0x10, 7, 1700000000))
+
+    def test_deassertion(self):
+        alert = decode_pet(encode_pet('192.168.1.41', 0x01, EVENT_TYPE_THRESHOLD, 2,
+                asserted = False))
+        self.assertFalse(alert.asserted)
+        self.assertEqual(alert.description(), 'Lower Critical going low deasserted')
+
+    def test_hot_swap_event(self):
+        alert = decode_pet(encode_pet('192.168.1.41', SENSOR_TYPE_FRU_HOT_SWAP, 0x6f, 4,
+                entity = '193.102', event_data = (0x03, 0x00)))
+        self.assertEqual(alert.fru_state, 4)
+        self.assertEqual(alert.data[1], 0x03)
+        self.assertEqual(alert.fru_id, '193.102')
+
+    def test_logical_entity_instance(self):
+        alert = decode_pet(encode_pet('192.168.1.41', 0x01, EVENT_TYPE_THRESHOLD, 9,
+                entity = '193.229'))
+        self.assertEqual(alert.fru_id, '193.101')
+
+    def test_agent_fallback(self):
+        # An MCH behind address translation may leave the agent address out
+        packet = encode_pet('0.0.0.0', 0x01, EVENT_TYPE_THRESHOLD, 9)
+        self.assertEqual(decode_pet(packet, source = '10.0.0.1').agent, '10.0.0.1')
+        self.assertIsNone(decode_pet(packet).agent)
+
+    def test_not_a_pet(self):
+        packet = encode_pet('192.168.1.41', 0x01, EVENT_TYPE_THRESHOLD, 9)
+        for data in (b'', b'\x30', b'hello', b'\x30\x03\x02\x01\x01',
+                packet[:len(packet) // 2], packet[:-1]):
+            self.assertIsNone(decode_pet(data), data)
+        # SNMPv2c rather than v1
+        self.assertIsNone(decode_pet(packet[:4] + b'\x01' + packet[5:]))
+        # Another enterprise
+        other = packet.replace(encode_oid(PET_ENTERPRISE),
+                encode_oid(PET_ENTERPRISE[:-1] + (2,)), 1)
+        self.assertNotEqual(other, packet)
+        self.assertIsNone(decode_pet(other))
+
+
+class PETListenerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.alerts = queue.Queue()
+        self.listener = PETListener(0, self.alerts.put, address = '127.0.0.1')
+        self.assertTrue(self.listener.start())
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def tearDown(self):
+        self.sock.close()
+        self.listener.stop()
+
+    def test_receive(self):
+        address = self.listener.sock.getsockname()
+        self.sock.sendto(b'not a trap', address)
+        self.sock.sendto(encode_pet('0.0.0.0', 0x01, EVENT_TYPE_THRESHOLD, 9,
+                entity = '193.101'), address)
+        alert = self.alerts.get(timeout = WAIT)
+        self.assertEqual(alert.fru_id, '193.101')
+        # The sender's address stands in for the agent address
+        self.assertEqual(alert.agent, '127.0.0.1')
+        self.assertTrue(self.alerts.empty())
+        self.assertEqual((self.listener.received, self.listener.ignored), (2, 1))
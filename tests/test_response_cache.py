@@ -0,0 +1,207 @@
+# File: test_response_cache.py
+# Date: 2026-10-17
+#
+# Description:
+# Tests of ResponseCache: expiry, LRU eviction, responses that aren't kept,
+# invalidation, and coalescing of requests in flight.
+
+import threading
+import time
+import unittest
+
+from response_cache import ResponseCache
+
+# Time allowed for a thread to get as far as the test needs (s)
+WAIT = 5.0
+
+class Fetcher():
+    """
+    fetch callable that counts the commands it is asked to send
+    """
+
+    def __init__(self, responses = None):
+        self.responses = responses or {}
+        self.fetched = []
+
+    def __call__(self, keys):
+        self.fetched.extend(keys)
+        return [self.responses.get(key, 'response {}'.format(key)) for key in keys]
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def test_hit_and_expiry(self):
+        cache = ResponseCache()
+        cache.put('a', 'old', now = time.time() - 10.0)
+        fetch = Fetcher()
+        # Too old for a 5 s TTL
+        self.assertEqual(cache.call_many(['a'], 5.0, fetch), ['response a'])
+        self.assertEqual(cache.call_many(['a'], 5.0, fetch), ['response a'])
+        self.assertEqual(fetch.fetched, ['a'])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_ttl_zero_isnt_kept(self):
+        cache = ResponseCache()
+        fetch = Fetcher()
+        cache.call_many(['a'], 0, fetch)
+        cache.call_many(['a'], 0, fetch)
+        self.assertEqual(fetch.fetched, ['a', 'a'])
+        self.assertEqual(len(cache.entries), 0)
+
+    def test_mixed_batch(self):
+        cache = ResponseCache()
+        cache.put('b', 'kept b')
+        fetch = Fetcher()
+        results = cache.call_many(['a', 'b', 'c'], 5.0, fetch)
+        self.assertEqual(results, ['response a', 'kept b', 'response c'])
+        # Only the commands not kept are sent, in order
+        self.assertEqual(fetch.fetched, ['a', 'c'])
+
+    def test_failures_arent_kept(self):
+        cache = ResponseCache()
+        fetch = Fetcher({'a': None, 'b': ''})
+        self.assertEqual(cache.call_many(['a', 'b'], 5.0, fetch), [None, ''])
+        self.assertEqual(len(cache.entries), 0)
+
+        # A keep function can refuse other responses too
+        fetch = Fetcher({'c': 'Error'})
+        cache.call('c', 5.0, lambda: fetch(['c'])[0], keep = lambda value: value != 'Error')
+        self.assertNotIn('c', cache.entries)
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_entries = 2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        # Using 'a' makes 'b' the least recently used
+        self.assertEqual(cache.get('a', 5.0), 1)
+        cache.put('c', 3)
+        self.assertEqual(list(cache.entries.keys()), ['a', 'c'])
+
+    def test_invalidate(self):
+        cache = ResponseCache()
+        for key in (('sdr', 'entity', '193.101'), ('sdr', 'entity', '193.102'), ('fru', 'print', '3')):
+            cache.put(key, 'response')
+        cache.invalidate(lambda key: key[:2] == ('sdr', 'entity'))
+        self.assertEqual(list(cache.entries.keys()), [('fru', 'print', '3')])
+        cache.invalidate()
+        self.assertEqual(len(cache.entries), 0)
+
+    def test_response_fetched_across_invalidation_isnt_kept(self):
+        cache = ResponseCache()
+
+        def fetch(keys):
+            # A changing command is sent while this one is in flight
+            cache.invalidate()
+            return ['stale']
+
+        self.assertEqual(cache.call('a', 5.0, lambda: fetch(['a'])[0]), 'stale')
+        self.assertNotIn('a', cache.entries)
+
+    def test_coalescing(self):
+        cache = ResponseCache()
+        started = threading.Event()
+        release = threading.Event()
+        fetched = []
+
+        def slow_fetch(keys):
+            fetched.extend(keys)
+            started.set()
+            release.wait(WAIT)
+            return ['slow {}'.format(key) for key in keys]
+
+        results = {}
+        first = threading.Thread(target=lambda: results.update(first=cache.call_many(['a'], 0, slow_fetch)))
+        first.start()
+        self.assertTrue(started.wait(WAIT))
+
+        # A second request for the same command waits for the first, even
+        # though nothing is kept
+        second = threading.Thread(target=lambda: results.update(second=cache.call_many(['a', 'b'], 0, Fetcher())))
+        second.start()
+        for attempt in range(100):
+            if cache.coalesced:
+                break
+            time.sleep(0.01)
+        release.set()
+        first.join(WAIT)
+        second.join(WAIT)
+
+        self.assertEqual(fetched, ['a'])
+        self.assertEqual(results['first'], ['slow a'])
+        self.assertEqual(results['second'], ['slow a', 'response b'])
+        self.assertEqual((cache.coalesced, cache.misses), (1, 2))
+        self.assertEqual(cache.in_flight, {})
+
+    def test_error_passed_to_waiters(self):
+        cache = ResponseCache()
+        started = threading.Event()
+        release = threading.Event()
+
+        def failing_fetch(keys):
+            started.set()
+            release.wait(WAIT)
+            raise OSError('session lost')
+
+        errors = []
+
+        def request(fetch):
+            try:
+                cache.call_many(['a'], 5.0, fetch)
+            except OSError as e:
+                errors.append(e)
+
+        first = threading.Thread(target=request, args=(failing_fetch,))
+        first.start()
+        self.assertTrue(started.wait(WAIT))
+        second = threading.Thread(target=request, args=(Fetcher(),))
+        second.start()
+        for attempt in range(100):
+            if cache.coalesced:
+                break
+            time.sleep(0.01)
+        release.set()
+        first.join(WAIT)
+        second.join(WAIT)
+
+        self.assertEqual(len(errors), 2)
+        self.assertEqual(cache.in_flight, {})
+        # The next request sends the command again
+        self.assertEqual(cache.call_many(['a'], 5.0, Fetcher()), ['response a'])
+
+    def test_short_fetch(self):
+        cache = ResponseCache()
+        started = threading.Event()
+        release = threading.Event()
+
+        def short_fetch(keys):
+            started.set()
+            release.wait(WAIT)
+            return ['response {}'.format(key) for key in keys[:-1]]
+
+        errors = []
+
+        def request(keys, fetch):
+            try:
+                cache.call_many(keys, 5.0, fetch)
+            except ValueError as e:
+                errors.append(e)
+
+        first = threading.Thread(target=request, args=(['a', 'b'], short_fetch))
+        first.start()
+        self.assertTrue(started.wait(WAIT))
+        # Waits for 'b', which the short fetch never answers
+        second = threading.Thread(target=request, args=(['b'], Fetcher()))
+        second.start()
+        for attempt in range(100):
+            if cache.coalesced:
+                break
+            time.sleep(0.01)
+        release.set()
+        first.join(WAIT)
+        second.join(WAIT)
+
+        self.assertFalse(second.is_alive())
+        self.assertEqual(len(errors), 2)
+        self.assertEqual(cache.in_flight, {})
+        # Nothing of the short batch is kept
+        self.assertEqual(len(cache.entries), 0)
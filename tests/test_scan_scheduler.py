@@ -0,0 +1,72 @@
+# File: test_scan_scheduler.py
+# Date: 2026-10-17
+#
+# Description:
+# Tests of ScanScheduler: per-item periods, backoff of failing items, the
+# jitter tolerance of a scan cycle, and resets.
+
+import unittest
+
+from scan_scheduler import ScanScheduler
+
+class ScanSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = ScanScheduler(max_period = 60.0)
+
+    def test_new_items_are_due(self):
+        self.assertTrue(self.scheduler.due('193.101', now = 100.0))
+
+    def test_period(self):
+        self.assertEqual(self.scheduler.schedule('193.101', 10.0, now = 100.0), 10.0)
+        self.assertFalse(self.scheduler.due('193.101', now = 109.9))
+        self.assertTrue(self.scheduler.due('193.101', now = 110.0))
+        # Other items have their own period
+        self.assertTrue(self.scheduler.due('193.102', now = 100.0))
+
+    def test_backoff(self):
+        periods = [self.scheduler.schedule('193.101', 5.0, ok = False, now = 100.0)
+                for attempt in range(5)]
+        self.assertEqual(periods, [10.0, 20.0, 40.0, 60.0, 60.0])
+
+        # A good read goes back to the normal period
+        self.assertEqual(self.scheduler.schedule('193.101', 5.0, ok = True, now = 100.0), 5.0)
+        self.assertEqual(self.scheduler.schedule('193.101', 5.0, ok = False, now = 100.0), 10.0)
+
+    def test_backoff_factor(self):
+        scheduler = ScanScheduler(max_period = 100.0, backoff = 3.0)
+        self.assertEqual(scheduler.schedule('a', 1.0, ok = False, now = 0.0), 3.0)
+        self.assertEqual(scheduler.schedule('a', 1.0, ok = False, now = 0.0), 9.0)
+
+    def test_cycle_tolerance(self):
+        # An item with the same period as the scan is read every cycle,
+        # even when the cycle comes a little early
+        self.scheduler.begin_cycle(now = 100.0)
+        self.scheduler.schedule('uptime', 1.0, now = 100.0)
+        self.scheduler.begin_cycle(now = 100.95)
+        self.assertTrue(self.scheduler.due('uptime', now = 100.95))
+        # but not at a cycle that comes well before it is due
+        self.scheduler.schedule('uptime', 1.0, now = 100.95)
+        self.scheduler.begin_cycle(now = 101.4)
+        self.assertFalse(self.scheduler.due('uptime', now = 101.4))
+
+    def test_no_tolerance_before_second_cycle(self):
+        self.scheduler.begin_cycle(now = 100.0)
+        self.assertEqual(self.scheduler.tolerance, 0.0)
+        self.scheduler.schedule('uptime', 1.0, now = 100.0)
+        self.assertFalse(self.scheduler.due('uptime', now = 100.9))
+
+    def test_reset(self):
+        for key in ('193.101', '193.102'):
+            self.scheduler.schedule(key, 10.0, ok = False, now = 100.0)
+        self.scheduler.reset('193.101')
+        self.assertTrue(self.scheduler.due('193.101', now = 100.0))
+        self.assertFalse(self.scheduler.due('193.102', now = 100.0))
+        # The failure count is cleared too
+        self.assertEqual(self.scheduler.schedule('193.101', 10.0, ok = False, now = 100.0), 20.0)
+
+        self.scheduler.reset()
+        self.assertTrue(self.scheduler.due('193.102', now = 100.0))
+        self.assertEqual(self.scheduler.failures, {})
+        # Resetting an item that was never scheduled is fine
+        self.scheduler.reset('193.103')
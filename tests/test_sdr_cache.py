@@ -0,0 +1,65 @@
+# File: test_sdr_cache.py
+# Date: 2026-10-17
+#
+# Description:
+# Tests of SDRCache: entries are matched by change stamp, and saves for
+# different MCHs made at the same time keep each other's entries.
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import mtca_core
+from sdr_cache import SDRCache
+
+# Saves made by each thread
+SAVES = 50
+
+class SDRCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix='mtca_sdr_cache_')
+        self.cache = SDRCache(os.path.join(self.dir, 'sdr_cache.json'))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_stamp(self):
+        self.cache.save('mch1', '1-2', fru_list = [['AMC1', '193.101']], sdrs = [b'\x01\x02'])
+        entry = self.cache.load('mch1', '1-2')
+        self.assertEqual(entry['fru_list'], [['AMC1', '193.101']])
+        self.assertEqual(entry['sdrs'], ['0102'])
+        # The repository has changed since
+        self.assertIsNone(self.cache.load('mch1', '1-3'))
+        self.assertIsNone(self.cache.load('mch2', '1-2'))
+        self.assertIsNone(self.cache.load('mch1', None))
+
+    def test_concurrent_saves(self):
+        start = threading.Barrier(2)
+
+        def save(host):
+            start.wait()
+            for index in range(SAVES):
+                self.cache.save(host, str(index), fru_list = [[host, '193.101']])
+
+        threads = [threading.Thread(target=save, args=(host,)) for host in ('mch1', 'mch2')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for host in ('mch1', 'mch2'):
+            entry = self.cache.load(host, str(SAVES - 1))
+            self.assertIsNotNone(entry, host)
+            self.assertEqual(entry['fru_list'], [[host, '193.101']])
+        # No temporary files are left behind
+        self.assertEqual(os.listdir(self.dir), ['sdr_cache.json'])
+
+    def test_shared_by_sessions(self):
+        crate = mtca_core.get_crate('sdr-cache-test')
+        try:
+            self.assertIs(crate.mch_comms.sdr_cache, mtca_core.SDR_CACHE)
+        finally:
+            del mtca_core._crates['sdr-cache-test']
@@ -0,0 +1,94 @@
+# File: test_sdr_convert.py
+# Date: 2026-10-17
+#
+# Description:
+# Tests of SDRConverter: the bulk NumPy conversion must give the same value
+# as SDRRecord.convert for every raw reading, number format and
+# linearization, and keep the latest value of every sensor.
+
+import math
+import unittest
+
+import numpy
+
+from ipmi_lan import (SDRRecord, SDR_FULL_SENSOR, EVENT_TYPE_THRESHOLD,
+        ANALOG_UNSIGNED, ANALOG_1S_COMPLEMENT, ANALOG_2S_COMPLEMENT, ANALOG_NONE)
+from sdr_convert import SDRConverter
+
+def analog_record(record_id, m = 1, b = 0, b_exp = 0, r_exp = 0,
+        analog_format = ANALOG_UNSIGNED, linearization = 0):
+    record = SDRRecord(record_id, SDR_FULL_SENSOR)
+    record.event_type = EVENT_TYPE_THRESHOLD
+    record.analog_format = analog_format
+    record.m = m
+    record.b = b
+    record.b_exp = b_exp
+    record.r_exp = r_exp
+    record.linearization = linearization
+    return record
+
+# Conversion factors seen on MTCA cards, and every number format and
+# linearization
+RECORDS = [
+    analog_record(1, m = 6, r_exp = -2)                          # 12 V, 0.06 V/bit
+    ,analog_record(2, m = 1, b = 5, b_exp = 1, analog_format = ANALOG_2S_COMPLEMENT)
+    ,analog_record(3, m = 3, b = -20, r_exp = -1, analog_format = ANALOG_1S_COMPLEMENT)
+    ,analog_record(4, m = -2, b = 300, r_exp = 0)
+    ,analog_record(5, m = 40, b = 0)                             # fan, RPM
+] + [
+    analog_record(10 + code, m = 1, b = -100, r_exp = -2, linearization = code)
+    for code in range(1, 12)
+]
+
+def same(a, b):
+    return (math.isnan(a) and math.isnan(b)) or abs(a - b) <= 1e-9 * max(1.0, abs(a))
+
+class SDRConverterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.converter = SDRConverter(RECORDS)
+
+    def test_same_as_scalar_conversion(self):
+        for raw in range(256):
+            indices = list(range(len(RECORDS)))
+            values = self.converter.convert(indices, [raw] * len(RECORDS))
+            for record, value in zip(RECORDS, values):
+                expected = record.convert(raw)
+                self.assertTrue(same(value, expected),
+                        'record {} raw {}: {} != {}'.format(record.record_id, raw, value, expected))
+
+    def test_signed_formats(self):
+        index = self.converter.index
+        values = self.converter.convert(
+                [index[2], index[2], index[3], index[3]], [0xf6, 0x0a, 0xff, 0x80])
+        # 2's complement: -10 and 10, plus 50
+        self.assertEqual(list(values[:2]), [40.0, 60.0])
+        # 1's complement: 0xff is -0, and 0x80 is -127
+        self.assertAlmostEqual(values[2], -2.0)
+        self.assertAlmostEqual(values[3], (3 * -127 - 20) / 10.0)
+
+    def test_bad_linearization_is_nan(self):
+        index = self.converter.index
+        # ln and 1/x of 0, and the square root of a negative number
+        values = self.converter.convert([index[11], index[17], index[20]], [100, 100, 0])
+        self.assertTrue(numpy.isnan(values).all())
+
+    def test_only_analog_sensors(self):
+        discrete = analog_record(99, analog_format = ANALOG_NONE)
+        converter = SDRConverter(RECORDS + [discrete])
+        self.assertEqual(len(converter), len(RECORDS))
+        self.assertNotIn(99, converter.index)
+
+    def test_values_kept(self):
+        self.assertTrue(numpy.isnan(self.converter.values).all())
+        index = self.converter.index
+        self.converter.convert([index[1], index[5]], [200, 50])
+        self.converter.convert([index[5]], [60])
+        self.assertAlmostEqual(self.converter.values[index[1]], 12.0)
+        self.assertEqual(self.converter.values[index[5]], 2400.0)
+        self.assertTrue(numpy.isnan(self.converter.values[index[4]]))
+
+    def test_empty(self):
+        converter = SDRConverter([])
+        self.assertEqual(len(converter), 0)
+        self.assertEqual(len(converter.convert([], [])), 0)
@@ -0,0 +1,184 @@
+# File: test_sel_reader.py
+# Date: 2026-10-17
+#
+# Description:
+# Tests of the SEL record decoding, and of SELReader against a scripted SEL:
+# starting at the end of the log, clears, overwritten records, and reads
+# capped at MAX_ENTRIES_PER_READ.
+
+import struct
+import unittest
+
+from ipmi_lan import IPMIError
+from sel_reader import (SELReader, decode_sel_entry, NETFN_STORAGE,
+        CMD_GET_SEL_INFO, CMD_GET_SEL_ENTRY, SEL_FIRST_ENTRY, SEL_LAST_ENTRY,
+        CC_NOT_PRESENT, SEL_SYSTEM_EVENT, EVENT_TYPE_THRESHOLD,
+        SENSOR_TYPE_FRU_HOT_SWAP, MAX_ENTRIES_PER_READ)
+
+def sel_record(record_id, sensor_number = 5, sensor_type = 0x02,
+        event_type = EVENT_TYPE_THRESHOLD, offset = 9, asserted = True,
+        generator = 0x7a, lun = 0, channel = 7, data = (0, 0),
+        record_type = SEL_SYSTEM_EVENT):
+    """
+    16 byte SEL record
+    """
+
+    return (struct.pack('<HBI', record_id, record_type, 1000 + record_id)
+            + bytes([generator | 0x01, (channel << 4) | lun, 0x04, sensor_type,
+                sensor_number, (0 if asserted else 0x80) | event_type,
+                0x50 | offset, data[0], data[1]]))
+
+class ScriptedSEL():
+    """
+    SEL request callable: answers Get SEL Info and Get SEL Entry from a
+    list of records
+    """
+
+    def __init__(self):
+        self.records = []
+        self.addition = 0
+        self.erase = 0
+        self.next_id = 1
+        self.requests = []
+
+    def add(self, count = 1):
+        for index in range(count):
+            self.records.append(sel_record(self.next_id))
+            self.next_id += 1
+        self.addition += 1
+
+    def clear(self):
+        self.records = []
+        self.erase += 1
+
+    def ids(self):
+        return [struct.unpack('<H', record[0:2])[0] for record in self.records]
+
+    def __call__(self, netfn, cmd, data):
+        self.requests.append(cmd)
+        if netfn != NETFN_STORAGE:
+            raise IPMIError('unexpected network function 0x{:02x}'.format(netfn))
+        if cmd == CMD_GET_SEL_INFO:
+            return (b'\x51' + struct.pack('<HHII', len(self.records), 1000,
+                    self.addition, self.erase) + b'\x02')
+        if cmd == CMD_GET_SEL_ENTRY:
+            record_id = struct.unpack('<HHBB', data)[1]
+            ids = self.ids()
+            if record_id == SEL_FIRST_ENTRY and ids:
+                index = 0
+            elif record_id == SEL_LAST_ENTRY and ids:
+                index = len(ids) - 1
+            elif record_id in ids:
+                index = ids.index(record_id)
+            else:
+                raise IPMIError('record 0x{:04x} not present'.format(record_id), CC_NOT_PRESENT)
+            next_id = ids[index + 1] if index + 1 < len(ids) else SEL_LAST_ENTRY
+            return struct.pack('<H', next_id) + self.records[index]
+        raise IPMIError('unexpected command 0x{:02x}'.format(cmd))
+
+
+class DecodeSELEntryTest(unittest.TestCase):
+
+    def test_threshold(self):
+        event = decode_sel_entry(sel_record(0x0102, sensor_number = 5, offset = 9, lun = 1))
+        self.assertEqual(event.record_id, 0x0102)
+        self.assertEqual(event.timestamp, 1000 + 0x0102)
+        # The generator's software ID bit is dropped
+        self.assertEqual(event.sensor_key, (0x7a, 1, 5))
+        self.assertEqual(event.channel, 7)
+        self.assertEqual(event.threshold, 'ucr')
+        self.assertTrue(event.asserted)
+        self.assertIsNone(event.fru_state)
+        self.assertEqual(event.description(), 'Upper Critical going high asserted')
+
+    def test_deasserted(self):
+        event = decode_sel_entry(sel_record(1, offset = 2, asserted = False))
+        self.assertFalse(event.asserted)
+        self.assertEqual(event.event_type, EVENT_TYPE_THRESHOLD)
+        self.assertEqual(event.description(), 'Lower Critical going low deasserted')
+
+    def test_fru_hot_swap(self):
+        event = decode_sel_entry(sel_record(1, sensor_type = SENSOR_TYPE_FRU_HOT_SWAP,
+                event_type = 0x6f, offset = 4, data = (0x03, 0)))
+        self.assertEqual(event.fru_state, 4)
+        self.assertIsNone(event.threshold)
+        self.assertEqual(event.description(), 'M3 -> M4 (Active)')
+
+    def test_not_decoded(self):
+        # OEM records and short records
+        self.assertIsNone(decode_sel_entry(sel_record(1, record_type = 0xc0)))
+        self.assertIsNone(decode_sel_entry(sel_record(1)[:15]))
+
+
+class SELReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sel = ScriptedSEL()
+        self.sel.add(3)
+        self.reader = SELReader(self.sel)
+
+    def read_ids(self):
+        return [event.record_id for event in self.reader.read()]
+
+    def test_starts_at_end(self):
+        # Old events are not replayed
+        self.assertEqual(self.read_ids(), [])
+        self.assertEqual(self.reader.last_id, 3)
+        self.assertEqual(self.sel.requests, [CMD_GET_SEL_INFO, CMD_GET_SEL_ENTRY])
+
+        self.sel.add(2)
+        self.assertEqual(self.read_ids(), [4, 5])
+
+        # Nothing new takes one command
+        del self.sel.requests[:]
+        self.assertEqual(self.read_ids(), [])
+        self.assertEqual(self.sel.requests, [CMD_GET_SEL_INFO])
+
+    def test_empty_log(self):
+        self.sel.clear()
+        self.assertEqual(self.read_ids(), [])
+        self.assertIsNone(self.reader.last_id)
+        self.sel.add(2)
+        self.assertEqual(self.read_ids(), [4, 5])
+
+    def test_cleared(self):
+        self.read_ids()
+        # Erased and refilled with as many records as before
+        self.sel.clear()
+        self.sel.add(4)
+        self.assertEqual(self.read_ids(), [4, 5, 6, 7])
+        self.assertEqual(self.read_ids(), [])
+
+    def test_fewer_entries(self):
+        self.read_ids()
+        # Some MCHs clear the log without moving the erase stamp
+        self.sel.records = []
+        self.sel.add(1)
+        self.assertEqual(self.read_ids(), [4])
+
+    def test_last_record_overwritten(self):
+        self.read_ids()
+        # The log wraps and the last record read is gone, with the number
+        # of entries unchanged
+        self.sel.records = []
+        self.sel.add(3)
+        self.assertEqual(self.read_ids(), [4, 5, 6])
+        self.assertIn(CMD_GET_SEL_ENTRY, self.sel.requests)
+
+    def test_capped_reads_carry_on(self):
+        self.read_ids()
+        self.sel.add(MAX_ENTRIES_PER_READ + 5)
+        first = self.read_ids()
+        self.assertEqual(first, list(range(4, 4 + MAX_ENTRIES_PER_READ)))
+        # The rest come on the next read, although the SEL info hasn't
+        # changed since
+        self.assertEqual(self.read_ids(), list(range(4 + MAX_ENTRIES_PER_READ,
+                9 + MAX_ENTRIES_PER_READ)))
+        self.assertEqual(self.read_ids(), [])
+
+    def test_restart(self):
+        self.read_ids()
+        self.sel.add(2)
+        self.reader.restart()
+        self.assertEqual(self.read_ids(), [])
+        self.assertEqual(self.reader.last_id, 5)
@@ -0,0 +1,261 @@
+# File: test_sensor_parser.py
+# Date: 2026-10-17
+#
+# Description:
+# Checks that SdrEntityParser, as used by FRU.update_sensors, gives the same
+# sensor values, units, validity and card alarm level as the inline parsing
+# loop that FRU.read_sensors used before it, for 'sdr entity' output of NAT
+# and Vadatech crates (tests/fixtures/sdr_entity). The fixtures include
+# 'ns' rows with 'No Reading', on sensors we do and don't know about, and
+# the Hot Swap rows of both vendors.
+#
+# Run as a script to time both parsers on the fixtures:
+#   python tests/test_sensor_parser.py --repeat 20000
+
+import argparse
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from conftest import FIXTURE_DIR
+
+import mtca_core
+from mtca_core import (SENSOR_NAMES, DIGITAL_SENSORS, EGU, ALARM_LEVELS,
+        ALARM_STATES, HOT_SWAP_NORMAL_STS, HOT_SWAP_NO_VALUE_NORMAL_STS,
+        HOT_SWAP_NORMAL_VALUE, HOT_SWAP_OK, HOT_SWAP_FAULT,
+        IPMITOOL_SHELL_PROMPT, MIN_GOOD_IPMI_MSG_LEN, SDR_ENTITY_PARSER)
+
+SDR_ENTITY_DIR = os.path.join(FIXTURE_DIR, 'sdr_entity')
+
+def load_fixture(name):
+    with open(os.path.join(SDR_ENTITY_DIR, name)) as f:
+        return f.read()
+
+FIXTURES = sorted(os.listdir(SDR_ENTITY_DIR))
+
+class LegacyFRU():
+    """
+    Sensor parsing of FRU.read_sensors before SdrEntityParser, with the
+    sensors kept as dicts
+    """
+
+    def __init__(self):
+        self.sensors = {}
+        self.comms_ok = False
+        self.alarm_level = ALARM_STATES.index('UNSET')
+
+    def set_sensors_invalid(self):
+        for sensor in self.sensors.values():
+            sensor['valid'] = False
+
+    def read_sensors(self, result):
+        # Check if we got a good response from ipmitool
+        if len(result) < MIN_GOOD_IPMI_MSG_LEN \
+            or result.find('Error') >= 0:
+            self.comms_ok = False
+            max_alarm_level = ALARM_STATES.index('NON_RECOVERABLE')
+        else:
+            self.comms_ok = True
+            max_alarm_level = ALARM_STATES.index('NO_ALARM')
+
+            for line in result.splitlines():
+                try:
+                    if not IPMITOOL_SHELL_PROMPT in line:
+                        line_strip = [x.strip() for x in line.split('|')]
+                        sensor_name, sensor_id, status, fru_id, val = line_strip
+
+                        if sensor_name in SENSOR_NAMES.keys():
+                            sensor_type = SENSOR_NAMES[sensor_name]
+
+                            if sensor_type in DIGITAL_SENSORS:
+                                egu = ''
+                                if sensor_type == 'HOT_SWAP':
+                                    if status in HOT_SWAP_NORMAL_STS:
+                                        if status == HOT_SWAP_NO_VALUE_NORMAL_STS:
+                                            value = HOT_SWAP_OK
+                                        else:
+                                            if val in HOT_SWAP_NORMAL_VALUE:
+                                                value = HOT_SWAP_OK
+                                            else:
+                                                value = HOT_SWAP_FAULT
+                                    else:
+                                        value = HOT_SWAP_FAULT
+                            else:
+                                value, egu = val.split(' ', 1)
+
+                            if not sensor_type in self.sensors.keys():
+                                self.sensors[sensor_type] = {'name': sensor_name}
+
+                            sensor = self.sensors[sensor_type]
+                            sensor['value'] = float(value)
+                            sensor['valid'] = True
+
+                            if egu in EGU.keys():
+                                sensor['egu'] = EGU[egu]
+                            else:
+                                sensor['egu'] = egu
+
+                        if sensor_name in SENSOR_NAMES.keys():
+                            status = status.strip()
+                            if status in ALARM_LEVELS.keys():
+                                alarm_level = ALARM_LEVELS[status]
+                                if alarm_level > max_alarm_level:
+                                    # Special case to ignore normal state of Hot Swap sensor
+                                    if (sensor_name.strip() == 'Hot Swap'
+                                            and status == 'lnc'):
+                                        pass
+                                    else:
+                                        max_alarm_level = alarm_level
+
+                except ValueError:
+                    # Assume that this is due to the card being pulled
+                    self.comms_ok = False
+                    max_alarm_level = ALARM_STATES.index('NON_RECOVERABLE')
+                    self.set_sensors_invalid()
+
+        self.alarm_level = max_alarm_level
+
+    def state(self):
+        # The old loop made the Sensor before converting the value, so a
+        # sensor whose first row was 'No Reading' was left with no value or
+        # units. FRU.update_sensors makes no sensor until it has a reading.
+        return (self.comms_ok, self.alarm_level, dict(
+                (sensor_type, (sensor['name'], sensor['value'], sensor['egu'], sensor['valid']))
+                for sensor_type, sensor in self.sensors.items()
+                if 'value' in sensor))
+
+
+def new_fru(crate, index):
+    """
+    Make a FRU on a crate that isn't connected. Thresholds are not under
+    test, so the FRU doesn't read them.
+    """
+
+    fru = mtca_core.FRU('193.{}'.format(101 + index), 'test', index + 1, 193, crate)
+    fru.set_alarms = lambda name: None
+    return fru
+
+def fru_state(fru):
+    return (fru.comms_ok, fru.alarm_level, dict(
+            (sensor_type, (sensor.name, sensor.value, sensor.egu, sensor.valid))
+            for sensor_type, sensor in fru.sensors.items()))
+
+
+class SensorParserTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.crate = mtca_core.get_crate('sensor-parser-test')
+
+    @classmethod
+    def tearDownClass(cls):
+        del mtca_core._crates['sensor-parser-test']
+
+    def compare(self, name):
+        result = load_fixture(name)
+        legacy = LegacyFRU()
+        legacy.read_sensors(result)
+        fru = new_fru(self.crate, FIXTURES.index(name))
+        fru.update_sensors(result)
+        self.assertEqual(fru_state(fru), legacy.state(), name)
+        return fru
+
+    def test_same_as_legacy(self):
+        for name in FIXTURES:
+            self.compare(name)
+
+    def test_same_as_legacy_after_update(self):
+        # A card that reads fine, then has a sensor with no reading
+        legacy = LegacyFRU()
+        fru = new_fru(self.crate, 10)
+        for name in ('nat_amc.txt', 'nat_amc_pulled.txt', 'nat_amc.txt'):
+            result = load_fixture(name)
+            legacy.read_sensors(result)
+            fru.update_sensors(result)
+            self.assertEqual(fru_state(fru), legacy.state(), name)
+
+    def test_nat(self):
+        fru = self.compare('nat_amc.txt')
+        self.assertTrue(fru.comms_ok)
+        self.assertEqual(fru.alarm_level, ALARM_STATES.index('NON_CRITICAL'))
+        self.assertEqual(fru.sensors['12V0'].value, 12.13)
+        self.assertEqual(fru.sensors['12V0'].egu, 'V')
+        self.assertEqual(fru.sensors['TEMP_FPGA'].egu, 'C')
+        self.assertEqual(fru.sensors['HOT_SWAP'].value, HOT_SWAP_OK)
+        # 'IPMB-L Status' is not a sensor we know about, so its 'No
+        # Reading' doesn't count
+        self.assertEqual(len(fru.sensors), 8)
+
+    def test_no_reading(self):
+        # A sensor we know about with no reading marks the card as pulled.
+        # The sensors before it are invalid, those after it are not.
+        fru = self.compare('nat_amc_pulled.txt')
+        self.assertFalse(fru.comms_ok)
+        self.assertEqual(fru.alarm_level, ALARM_STATES.index('NON_RECOVERABLE'))
+        self.assertFalse(fru.sensors['12V0'].valid)
+        self.assertTrue(fru.sensors['TEMP_INLET'].valid)
+        self.assertNotIn('3V3', fru.sensors)
+        legacy = LegacyFRU()
+        legacy.read_sensors(load_fixture('nat_amc_pulled.txt'))
+        self.assertNotIn('value', legacy.sensors['3V3'])
+
+        fru = self.compare('vadatech_cu.txt')
+        self.assertFalse(fru.comms_ok)
+        self.assertFalse(fru.sensors['FAN3'].valid)
+        self.assertTrue(fru.sensors['FAN5'].valid)
+
+    def test_hot_swap(self):
+        # NAT reports the normal state as 'lnc', which is not an alarm...
+        fru = self.compare('nat_pm.txt')
+        self.assertEqual(fru.sensors['HOT_SWAP'].value, HOT_SWAP_OK)
+        self.assertEqual(fru.sensors['HOT_SWAP'].alarm_level, 0)
+        self.assertEqual(fru.alarm_level, ALARM_STATES.index('CRITICAL'))
+
+        # ...but only for a sensor named 'Hot Swap'
+        fru = self.compare('vadatech_amc.txt')
+        self.assertEqual(fru.sensors['HOT_SWAP'].value, HOT_SWAP_OK)
+        self.assertEqual(fru.sensors['HOT_SWAP'].alarm_level, ALARM_LEVELS['lnc'])
+
+    def test_bad_response(self):
+        for result in ('', 'Error: Unable to establish IPMI v2 / RMCP+ session\n' * 2):
+            legacy = LegacyFRU()
+            legacy.read_sensors(result)
+            fru = new_fru(self.crate, 11)
+            fru.update_sensors(result)
+            self.assertEqual(fru_state(fru), legacy.state())
+            self.assertFalse(fru.comms_ok)
+
+
+def time_parser(parse, results, repeat):
+    start = time.time()
+    for index in range(repeat):
+        for result in results:
+            parse(result)
+    return (time.time() - start) / (repeat * len(results))
+
+def main():
+    # Get the arguments
+    parser = argparse.ArgumentParser(description = 'Time the sdr entity parsers')
+    parser.add_argument('--repeat', type=int, default=10000, help='times each fixture is parsed')
+
+    args = parser.parse_args()
+
+    results = [load_fixture(name) for name in FIXTURES]
+    crate = mtca_core.get_crate('sensor-parser-benchmark')
+    fru = new_fru(crate, 0)
+
+    legacy = time_parser(lambda result: LegacyFRU().read_sensors(result), results, args.repeat)
+    parse = time_parser(SDR_ENTITY_PARSER.parse, results, args.repeat)
+    update = time_parser(fru.update_sensors, results, args.repeat)
+
+    print('{} responses of {} lines on average'.format(len(results),
+            sum(len(result.splitlines()) for result in results) / float(len(results))))
+    print('legacy read_sensors:   {:7.1f} us'.format(legacy * 1e6))
+    print('SdrEntityParser.parse: {:7.1f} us ({:.1f}x)'.format(parse * 1e6, legacy / parse))
+    print('FRU.update_sensors:    {:7.1f} us ({:.1f}x)'.format(update * 1e6, legacy / update))
+    mtca_core.stop()
+
+if __name__ == '__main__':
+    main()
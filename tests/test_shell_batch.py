@@ -0,0 +1,242 @@
+# File: test_shell_batch.py
+# Date: 2026-10-17
+#
+# Description:
+# Tests and latency benchmark of MCH_comms.shell_batch against a scripted
+# ipmitool shell (script/ipmitool_replay.py). The replay answers each
+# command after its recorded time, so the prompt counting, the split of
+# the output into responses, the per-command timing and the handling of
+# a command that times out in the middle of a batch all run against a
+# real shell process.
+#
+# Run as a script to print the latency of each command for a range of
+# batch sizes:
+#   python tests/test_shell_batch.py --cards 2 6 12 --latency 0.005
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from conftest import SCRIPT_DIR
+
+import mtca_core
+
+# Command that takes longer than the whole batch is allowed
+SLOW_FRU = '193.103'
+SLOW_TIME = 3.0
+
+# Time allowed for each 'sdr entity' during the tests (s)
+TEST_ENTITY_TIMEOUT = 0.3
+
+def entity_response(fru_id):
+    return '12 V PP          | 30h | ok  | {} | 12.03 Volts\n'.format(fru_id)
+
+def write_recording(path, cards, latency, slow = True):
+    """
+    Write a recording of a crate whose cards answer 'sdr entity' after
+    the given latency, except SLOW_FRU which takes SLOW_TIME
+
+    Args:
+        path (str): recording file
+        cards (int): number of AMCs
+        latency (float): time taken by each command (s)
+        slow (bool, optional): include the slow card
+
+    Returns:
+        list of FRU IDs
+    """
+
+    fru_ids = ['193.{}'.format(101 + card) for card in range(cards)]
+    with open(path, 'w') as f:
+        f.write(json.dumps({'command': 'mc info', 'response': 'Device ID : 3\n', 'time': 0.0}) + '\n')
+        for fru_id in fru_ids:
+            f.write(json.dumps({
+                'command': 'sdr entity {}'.format(fru_id)
+                ,'response': entity_response(fru_id)
+                ,'time': SLOW_TIME if slow and fru_id == SLOW_FRU else latency
+            }) + '\n')
+    return fru_ids
+
+class ReplayShell():
+    """
+    Crate session to a replayed ipmitool shell
+    """
+
+    def __init__(self, cards, latency, slow = True):
+        self.dir = tempfile.mkdtemp(prefix='mtca_shell_')
+        os.symlink(os.path.join(SCRIPT_DIR, 'ipmitool_replay.py'),
+                os.path.join(self.dir, 'ipmitool'))
+        recording = os.path.join(self.dir, 'recording.jsonl')
+        self.fru_ids = write_recording(recording, cards, latency, slow)
+        os.environ['IPMITOOL'] = self.dir
+        os.environ['IPMITOOL_REPLAY'] = recording
+        os.environ.pop('IPMITOOL_REPLAY_LATENCY', None)
+        os.environ['IPMITOOL_REPLAY_SPEED'] = '1'
+
+        self.crate = mtca_core.get_crate('replay-{}'.format(self.dir))
+        self.crate.host = 'replay'
+        self.crate.user = ''
+        self.crate.password = ''
+        self.mch_comms = self.crate.mch_comms
+        self.mch_comms.backend = mtca_core.BACKEND_SHELL
+        if not self.mch_comms.ipmitool_shell_connect():
+            raise RuntimeError('could not start the replayed shell')
+
+    def close(self):
+        self.mch_comms.close_session()
+        del mtca_core._crates['replay-{}'.format(self.dir)]
+        shutil.rmtree(self.dir)
+
+    def batch(self, fru_ids):
+        return self.mch_comms.shell_batch([['sdr', 'entity', fru_id] for fru_id in fru_ids])
+
+def command_latency(stats):
+    """
+    Get the mean latency and count of each command type
+
+    Args:
+        stats (CommsStats): crate statistics
+
+    Returns:
+        dict of (mean latency (s), count), keyed by command name
+    """
+
+    return dict((name, (histogram.mean(), histogram.count))
+            for name, histogram in stats.commands.items())
+
+def benchmark(cards, latency, batches):
+    """
+    Time batches of 'sdr entity' commands, one per card
+
+    Args:
+        cards (int): number of AMCs
+        latency (float): time taken by each command (s)
+        batches (int): number of batches
+
+    Returns:
+        dict of results
+    """
+
+    shell = ReplayShell(cards, latency, slow = False)
+    try:
+        start = time.time()
+        for index in range(batches):
+            results, timed_out = shell.batch(shell.fru_ids)
+            if timed_out is not None or not all(results):
+                raise RuntimeError('batch {} incomplete'.format(index))
+        elapsed = time.time() - start
+        mean, count = command_latency(shell.crate.stats)['sdr entity']
+        return {
+            'cards': cards
+            ,'latency': latency
+            ,'batch': elapsed / batches
+            ,'command': mean
+            ,'overhead': mean - latency
+            ,'commands': count
+        }
+    finally:
+        shell.close()
+
+
+class ShellBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.timeouts = dict(mtca_core.COMMAND_TIMEOUTS)
+        mtca_core.COMMAND_TIMEOUTS[('sdr', 'entity')] = TEST_ENTITY_TIMEOUT
+        self.shell = ReplayShell(5, 0.02)
+
+    def tearDown(self):
+        self.shell.close()
+        mtca_core.COMMAND_TIMEOUTS.clear()
+        mtca_core.COMMAND_TIMEOUTS.update(self.timeouts)
+
+    def test_responses_in_order(self):
+        fru_ids = [fru_id for fru_id in self.shell.fru_ids if fru_id != SLOW_FRU]
+        results, timed_out = self.shell.batch(fru_ids)
+        self.assertIsNone(timed_out)
+        self.assertEqual(results, [entity_response(fru_id) for fru_id in fru_ids])
+
+    def test_per_command_latency(self):
+        fru_ids = [fru_id for fru_id in self.shell.fru_ids if fru_id != SLOW_FRU]
+        for index in range(3):
+            results, timed_out = self.shell.batch(fru_ids)
+            self.assertIsNone(timed_out)
+        mean, count = command_latency(self.shell.crate.stats)['sdr entity']
+        print('sdr entity: {} commands, {:.1f} ms mean'.format(count, mean * 1000))
+        self.assertEqual(count, 3 * len(fru_ids))
+        # Each command is timed from the prompt before it to the prompt
+        # after it, so it takes at least the replayed latency, and much
+        # less than the time for the whole batch
+        self.assertGreaterEqual(mean, 0.02)
+        self.assertLess(mean, 0.02 * len(fru_ids))
+
+    def test_timeout_in_the_middle(self):
+        start = time.time()
+        results, timed_out = self.shell.batch(self.shell.fru_ids)
+        elapsed = time.time() - start
+
+        # The commands before the slow one are answered, the slow one is
+        # empty, and the ones after it weren't run
+        self.assertEqual(timed_out, 2)
+        self.assertEqual(results[:2], [entity_response(fru_id) for fru_id in self.shell.fru_ids[:2]])
+        self.assertEqual(results[2], '')
+        self.assertEqual(results[3:], [None, None])
+        # The batch is given the sum of its commands' timeouts
+        self.assertLess(elapsed, SLOW_TIME)
+        self.assertGreaterEqual(elapsed, TEST_ENTITY_TIMEOUT * len(self.shell.fru_ids) - 0.05)
+        self.assertEqual(self.shell.mch_comms.timeouts, 1)
+        self.assertTrue(self.shell.mch_comms.connected)
+
+        # While the shell is still busy with the slow command, nothing of
+        # the next request has started
+        results, timed_out = self.shell.batch(['193.101'])
+        self.assertEqual(results, [None])
+        self.assertEqual(self.shell.mch_comms.timeouts, 2)
+
+        # Once it has finished, the late output of both earlier requests
+        # is dropped and the session carries on with the next request
+        time.sleep(SLOW_TIME)
+        results, timed_out = self.shell.batch(['193.104', '193.101'])
+        self.assertIsNone(timed_out)
+        self.assertEqual(results, [entity_response('193.104'), entity_response('193.101')])
+        self.assertEqual(self.shell.mch_comms.timeouts, 0)
+        self.assertEqual(self.shell.crate.stats.timeouts, 2)
+
+    def test_read_frus_one_response_per_fru(self):
+        # A FRU listed twice is read once, and gets its response each time
+        fru_ids = ['193.101', '193.102', '193.101']
+        frus = [mtca_core.FRU(fru_id, 'test', index + 1, 193, self.shell.crate)
+                for index, fru_id in enumerate(fru_ids)]
+        results = self.shell.mch_comms.read_frus(frus)
+        self.assertEqual(results, [entity_response(fru_id) for fru_id in fru_ids])
+        mean, count = command_latency(self.shell.crate.stats)['sdr entity']
+        self.assertEqual(count, 2)
+
+
+def main():
+    # Get the arguments
+    parser = argparse.ArgumentParser(description = 'Time shell_batch against a replayed ipmitool shell')
+    parser.add_argument('--cards', type=int, nargs='+', default=[2, 6, 12], help='crate sizes')
+    parser.add_argument('--latency', type=float, nargs='+', default=[0.0, 0.005], help='time per command (s)')
+    parser.add_argument('--batches', type=int, default=20, help='batches per case')
+
+    args = parser.parse_args()
+
+    print('{:>5s} {:>9s} {:>10s} {:>12s} {:>12s}'.format(
+            'cards', 'latency', 'batch', 'per command', 'overhead'))
+    for latency in args.latency:
+        for cards in args.cards:
+            result = benchmark(cards, latency, args.batches)
+            print('{:5d} {:7.1f}ms {:8.1f}ms {:10.2f}ms {:10.2f}ms'.format(
+                    cards, latency * 1000, result['batch'] * 1000,
+                    result['command'] * 1000, result['overhead'] * 1000))
+    mtca_core.stop()
+
+if __name__ == '__main__':
+    main()
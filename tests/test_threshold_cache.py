@@ -0,0 +1,62 @@
+# File: test_threshold_cache.py
+# Date: 2026-10-17
+#
+# Description:
+# Tests of ThresholdCache: entries survive a save, and forgotten card types
+# and sensors are read from the MCH again.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from threshold_cache import ThresholdCache
+
+FAN = {'lolo': 500.0, 'low': 1000.0, 'high': 3500.0, 'hihi': 4000.0}
+TEMP = {'high': 70.0, 'hihi': 85.0}
+
+class ThresholdCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix='mtca_threshold_cache_')
+        self.path = os.path.join(self.dir, 'threshold_cache.json')
+        self.cache = ThresholdCache(self.path)
+        self.cache.put('NAT-CU', 'Fan 1', FAN)
+        self.cache.put('NAT-CU', 'Temp 1', TEMP)
+        self.cache.put('NAT-PM', 'Temp 1', TEMP)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_saved(self):
+        self.cache.save()
+        cache = ThresholdCache(self.path)
+        self.assertEqual(cache.get('NAT-CU', 'Fan 1'), FAN)
+        self.assertIsNone(cache.get('NAT-CU', 'Fan 2'))
+        self.assertIsNone(cache.get('AMC', 'Fan 1'))
+
+    def test_forget_sensor(self):
+        self.cache.forget('NAT-CU', 'Fan 1')
+        self.assertIsNone(self.cache.get('NAT-CU', 'Fan 1'))
+        self.assertEqual(self.cache.get('NAT-CU', 'Temp 1'), TEMP)
+
+    def test_forget_card_type(self):
+        self.cache.forget('NAT-CU')
+        self.assertIsNone(self.cache.get('NAT-CU', 'Fan 1'))
+        self.assertIsNone(self.cache.get('NAT-CU', 'Temp 1'))
+        self.assertEqual(self.cache.get('NAT-PM', 'Temp 1'), TEMP)
+
+    def test_forget_is_saved(self):
+        self.cache.save()
+        self.cache.forget('NAT-CU', 'Fan 1')
+        self.cache.save()
+        cache = ThresholdCache(self.path)
+        self.assertIsNone(cache.get('NAT-CU', 'Fan 1'))
+        self.assertEqual(cache.get('NAT-CU', 'Temp 1'), TEMP)
+
+    def test_forget_unknown(self):
+        self.cache.save()
+        # Nothing to write
+        self.cache.forget('AMC')
+        self.cache.forget('NAT-CU', 'Fan 2')
+        self.assertFalse(self.cache.changed)
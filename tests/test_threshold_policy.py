@@ -0,0 +1,127 @@
+# File: test_threshold_policy.py
+# Date: 2026-10-17
+#
+# Description:
+# Tests of the threshold policy: rule matching and overrides, tolerances,
+# threshold_changes, and the errors of load_policy.
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from conftest import SCRIPT_DIR
+from mtca_core import BUS_IDS
+from threshold_policy import (ThresholdPolicy, PolicyError, load_policy,
+        threshold_changes, DEFAULT_TOLERANCE)
+
+RULES = [
+    {'sensor': '.*Fan', 'thresholds': {'lcr': 500, 'lnc': 1000, 'unc': 3500, 'ucr': 4000}}
+    ,{'bus': 'cu', 'fru': 'CU2', 'sensor': 'Fan 1', 'thresholds': {'ucr': 4500}, 'tolerance': 50}
+    ,{'bus': 'pm', 'sensor': r'Ch[0-9][0-9] Current', 'thresholds': {'unc': 2.9, 'ucr': 3.0}}
+]
+
+def same_within(tolerance):
+    return lambda threshold, wanted, value: abs(wanted - value) <= tolerance
+
+class ThresholdPolicyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = ThresholdPolicy(RULES, BUS_IDS)
+
+    def test_matching(self):
+        self.assertEqual(self.policy.thresholds(BUS_IDS['cu'], 'CU1', 'Fan 2'),
+                {'lcr': 500.0, 'lnc': 1000.0, 'unc': 3500.0, 'ucr': 4000.0})
+        # Names are matched from the start
+        self.assertEqual(self.policy.thresholds(BUS_IDS['pm'], 'PM1', 'Ch01 Current'),
+                {'unc': 2.9, 'ucr': 3.0})
+        self.assertEqual(self.policy.thresholds(BUS_IDS['pm'], 'PM1', 'Total Ch01 Current'), {})
+        # The bus has to match too
+        self.assertEqual(self.policy.thresholds(BUS_IDS['amc'], 'AMC1', 'Ch01 Current'), {})
+        # A card with no name only matches rules without a card pattern
+        self.assertEqual(self.policy.thresholds(BUS_IDS['cu'], None, 'Fan 1')['ucr'], 4000.0)
+
+    def test_later_rules_override(self):
+        self.assertEqual(self.policy.thresholds(BUS_IDS['cu'], 'CU2', 'Fan 1'),
+                {'lcr': 500.0, 'lnc': 1000.0, 'unc': 3500.0, 'ucr': 4500.0})
+
+    def test_tolerance(self):
+        # Given by the rule that sets the threshold
+        self.assertEqual(self.policy.tolerance(BUS_IDS['cu'], 'CU2', 'Fan 1', 'ucr', 4500.0), 50.0)
+        # By default a fraction of the threshold
+        self.assertAlmostEqual(self.policy.tolerance(BUS_IDS['cu'], 'CU2', 'Fan 1', 'lcr', 500.0),
+                500.0 * DEFAULT_TOLERANCE)
+        self.assertAlmostEqual(self.policy.tolerance(BUS_IDS['cu'], 'CU1', 'Fan 1', 'ucr', 4000.0),
+                4000.0 * DEFAULT_TOLERANCE)
+        self.assertAlmostEqual(self.policy.tolerance(BUS_IDS['pm'], 'PM1', 'Temp', 'ucr', -20.0),
+                20.0 * DEFAULT_TOLERANCE)
+
+    def test_threshold_changes(self):
+        wanted = {'lcr': 500.0, 'lnc': 1000.0, 'unc': 3500.0, 'ucr': 4000.0}
+        current = {'lcr': 500.0, 'lnc': 1008.0, 'unc': 3000.0, 'unr': 5000.0}
+        # 'ucr' can't be read, so it is set. 'unr' isn't in the policy, so
+        # it is left alone.
+        self.assertEqual(threshold_changes(wanted, current, same_within(10.0)),
+                {'unc': 3500.0, 'ucr': 4000.0})
+        self.assertEqual(threshold_changes(wanted, current, same_within(0.0)),
+                {'lnc': 1000.0, 'unc': 3500.0, 'ucr': 4000.0})
+        self.assertEqual(threshold_changes({}, current, same_within(0.0)), {})
+
+    def test_threshold_changes_with_policy_tolerance(self):
+        wanted = self.policy.thresholds(BUS_IDS['cu'], 'CU2', 'Fan 1')
+        current = {'lcr': 504.0, 'lnc': 1011.0, 'unc': 3500.0, 'ucr': 4460.0}
+        changes = threshold_changes(wanted, current,
+                lambda threshold, value, found: abs(value - found) <= self.policy.tolerance(
+                    BUS_IDS['cu'], 'CU2', 'Fan 1', threshold, value))
+        self.assertEqual(changes, {'lnc': 1000.0})
+
+    def test_bad_rules(self):
+        for rule, message in (
+                ({'bus': 'vme'}, 'unknown bus'),
+                ({'sensor': '('}, 'bad pattern'),
+                ({'thresholds': {'hihi': 1}}, 'unknown threshold'),
+                ({'thresholds': {'ucr': 'high'}}, 'bad value'),
+                ({'senor': 'Fan'}, 'unknown rule fields')):
+            with self.assertRaises(PolicyError) as context:
+                ThresholdPolicy([{'sensor': 'Fan'}, rule], BUS_IDS)
+            self.assertIn('rule 2', str(context.exception))
+            self.assertIn(message, str(context.exception))
+
+
+class LoadPolicyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix='mtca_policy_')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, text):
+        path = os.path.join(self.dir, 'policy.json')
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def test_load(self):
+        policy = load_policy(self.write(json.dumps({'rules': RULES})), BUS_IDS)
+        self.assertEqual(len(policy.rules), 3)
+
+    def test_default(self):
+        policy = load_policy(None, BUS_IDS, RULES)
+        self.assertEqual(len(policy.rules), 3)
+        self.assertEqual(load_policy(None, BUS_IDS).rules, [])
+
+    def test_errors(self):
+        for text in ('{"rules": [', '[]', '{"rules": {}}', '{"rules": [{"bus": "vme"}]}'):
+            path = self.write(text)
+            with self.assertRaises(PolicyError) as context:
+                load_policy(path, BUS_IDS)
+            self.assertIn(path, str(context.exception))
+        with self.assertRaises(PolicyError):
+            load_policy(os.path.join(self.dir, 'missing.json'), BUS_IDS)
+
+    def test_shipped_policy(self):
+        # The policy mtca_provision.py uses by default
+        policy = load_policy(os.path.join(SCRIPT_DIR, 'mch_thresholds.json'), BUS_IDS)
+        self.assertTrue(policy.rules)